@@ -1,6 +1,6 @@
 {
     'name': 'PayMongo Payment Provider',
-    'version': '19.0.1.0.0',
+    'version': '19.0.1.2.0',
     'category': 'Accounting/Payment Providers',
     'summary': 'PayMongo payment provider (QRPH)',
     'description': """
@@ -17,13 +17,21 @@ Integrate PayMongo Checkout with Odoo Payments.
         'payment',        # REQUIRED
         'website',        # Needed for redirect / return routes
         'account',        # Invoices + currency
+        'account_payment',  # Provider journals + invoice_ids on transactions
     ],
     'data': [
+        'security/ir.model.access.csv',
         'views/payment_paymongo_templates.xml',      # redirect_form template (if you added it)
         'data/payment_method_data.xml',              # create method (inactive)
         'data/payment_provider_data.xml',            # create provider (disabled by default)
         'data/payment_provider_method_data.xml',     # link provider <-> method
+        'data/ir_cron_data.xml',
         'views/payment_provider_views.xml',
+        'views/paymongo_webhook_archive_views.xml',
+        'views/account_move_views.xml',
+        'views/paymongo_refund_batch_views.xml',
+        'wizard/paymongo_provisioning_wizard_views.xml',
+        'wizard/paymongo_payout_import_wizard_views.xml',
     ],
     'assets': {
         # No frontend JS needed for hosted checkout (redirect-based)
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# payment_paymongo/benchmarks/paymongo_bench.py
+"""Throughput benchmarks for the PayMongo webhook and checkout paths.
+
+Webhook delivery is driven from the command line against a running Odoo server:
+
+    python paymongo_bench.py webhook --url http://localhost:8069 --secret whsec_... \\
+        --events 2000 --concurrency 16
+
+A local stand-in for the PayMongo API can be started on its own, with injected latency and
+errors, and used by pointing the `payment_paymongo.api_url` system parameter at it:
+
+    python paymongo_bench.py mock-server --port 8765 --latency 0.08 --error-rate 0.01
+
+The checkout, line-item and inbox stages need the ORM and are run from `odoo-bin shell`:
+
+    >>> from odoo.addons.payment_paymongo.benchmarks import paymongo_bench as bench
+    >>> bench.print_report(bench.bench_checkout(env, tx, iterations=200, latency=0.05))
+    >>> bench.print_report(bench.bench_line_items(env, tx))
+    >>> bench.print_report(bench.bench_line_item_sizes(env, sizes=(1000, 10000)))
+    >>> bench.print_report(bench.bench_inbox_drain(env))
+    >>> bench.print_report(bench.bench_event_parsing())
+
+Every function returns a list of `Stats`, one per stage, reported as p50/p95/p99 latency and
+throughput. The checkout, line-item and inbox benchmarks roll back everything they write.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urllib_request
+from urllib.error import HTTPError, URLError
+
+
+# === REPORTING === #
+
+class Stats:
+    """Latency samples of one benchmark stage."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.samples = []
+        self.errors = 0
+        self.wall_time = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds, error=False):
+        with self._lock:
+            self.samples.append(seconds)
+            self.errors += error
+
+    def measure(self, func, *args, **kwargs):
+        """Call `func`, record its duration and return its result (None if it raised)."""
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:  # noqa: BLE001
+            self.add(time.perf_counter() - start, error=True)
+            return None
+        self.add(time.perf_counter() - start)
+        return result
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    @property
+    def throughput(self):
+        wall_time = self.wall_time or sum(self.samples)
+        return len(self.samples) / wall_time if wall_time else 0.0
+
+    def as_row(self):
+        return (
+            self.stage, len(self.samples), self.errors,
+            self.percentile(50) * 1000, self.percentile(95) * 1000, self.percentile(99) * 1000,
+            self.throughput,
+        )
+
+
+def print_report(stats_list):
+    header = f"{'stage':<20}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}"
+    print(header)
+    print('-' * len(header))
+    for stats in stats_list:
+        stage, count, errors, p50, p95, p99, throughput = stats.as_row()
+        print(f"{stage:<20}{count:>8}{errors:>8}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}{throughput:>10.1f}")
+
+
+# === WEBHOOK === #
+
+def make_event(webhook_secret, reference=None, event_type='checkout_session.payment.paid',
+               livemode=False, amount=10000):
+    """Build a synthetic PayMongo event and its `Paymongo-Signature` header.
+
+    The header follows the `t=`/`te=`/`li=` scheme checked by `_verify_paymongo_signature`:
+    `te` (test mode) or `li` (live mode) is the HMAC-SHA256 of `"{t}.{raw_body}"`.
+
+    :return: The raw body and the signature header.
+    :rtype: tuple
+    """
+    reference = reference or f'BENCH-{uuid.uuid4().hex[:12]}'
+    session_id = f'cs_{uuid.uuid4().hex[:24]}'
+    body = json.dumps({
+        'data': {
+            'id': f'evt_{uuid.uuid4().hex[:24]}',
+            'type': 'event',
+            'attributes': {
+                'type': event_type,
+                'livemode': livemode,
+                'data': {
+                    'id': session_id,
+                    'type': 'checkout_session',
+                    'attributes': {
+                        'reference_number': reference,
+                        'metadata': {'odoo_tx_ref': reference, 'paymongo_ref': reference},
+                        'payments': [{
+                            'id': f'pay_{uuid.uuid4().hex[:24]}',
+                            'attributes': {'amount': amount, 'currency': 'PHP', 'status': 'paid'},
+                        }],
+                    },
+                },
+            },
+        },
+    }).encode()
+    timestamp = str(int(time.time()))
+    signature = hmac.new(
+        webhook_secret.encode(), timestamp.encode() + b'.' + body, hashlib.sha256
+    ).hexdigest()
+    header = f"t={timestamp},te={'' if livemode else signature},li={signature if livemode else ''}"
+    return body, header
+
+
+def bench_webhook(base_url, webhook_secret, events=1000, concurrency=8, reference=None,
+                  livemode=False):
+    """Deliver signed synthetic events to `/payment/paymongo/webhook` and time each delivery.
+
+    Events are generated (and signed) before the clock starts so that only the server is measured.
+    """
+    url = base_url.rstrip('/') + '/payment/paymongo/webhook'
+    payloads = [make_event(webhook_secret, reference, livemode=livemode) for _i in range(events)]
+    stats = Stats('webhook')
+
+    def deliver(payload):
+        body, header = payload
+        req = urllib_request.Request(url, data=body, method='POST', headers={
+            'Content-Type': 'application/json', 'Paymongo-Signature': header,
+        })
+        with urllib_request.urlopen(req, timeout=30) as response:
+            response.read()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda payload: stats.measure(deliver, payload), payloads))
+    stats.wall_time = time.perf_counter() - start
+    return [stats]
+
+
+def bench_inbox_drain(env, batch_size=None):
+    """Time the processing of the pending inbox events by the cron, then roll it back."""
+    Event = env['paymongo.webhook.event'].sudo()
+    stats = Stats('inbox_drain')
+    savepoint = env.cr.savepoint()
+    try:
+        pending = Event.search_count([('state', '=', 'pending')])
+        start = time.perf_counter()
+        Event._cron_process_pending(batch_size=batch_size or max(pending, 1), auto_commit=False)
+        elapsed = time.perf_counter() - start
+        stats.samples = [elapsed / pending] * pending if pending else []
+        stats.wall_time = elapsed
+    finally:
+        savepoint.close(rollback=True)
+        env.invalidate_all()
+    return [stats]
+
+
+def _walk_event_dict(payment_data):
+    """Read the event fields the way each hook did before `PaymongoEvent`: one walk per hook."""
+    # Logging and enqueueing in the controller.
+    envelope = payment_data.get('data') or {}
+    event_attrs = envelope.get('attributes') or {}
+    values = [envelope.get('id'), event_attrs.get('type'), event_attrs.get('livemode')]
+    # `_extract_reference`, `_search_by_reference`, `_extract_amount_data` and `_apply_updates`.
+    for _hook in range(4):
+        event_attrs = ((payment_data.get('data') or {}).get('attributes') or {})
+        resource = event_attrs.get('data') or {}
+        resource_attrs = resource.get('attributes') or {}
+        metadata = resource_attrs.get('metadata') or {}
+        payments = resource_attrs.get('payments') or []
+        values += [
+            resource.get('id'),
+            metadata.get('odoo_tx_ref') or resource_attrs.get('reference_number'),
+            payments and (payments[0].get('attributes') or {}).get('amount'),
+        ]
+    return values
+
+
+def bench_event_parsing(iterations=20000):
+    """Compare the repeated dict walks of the event envelope with a single `PaymongoEvent` parse.
+
+    Both stages read the same fields as the webhook endpoint and the processing hooks do for one
+    event; the JSON decoding is excluded since it happens once either way.
+    """
+    from odoo.addons.payment_paymongo.utils import PaymongoEvent  # noqa: PLC0415
+
+    payloads = [json.loads(make_event('whsec_bench')[0]) for _i in range(100)]
+    dict_walk, parsed = Stats('dict_walk'), Stats('parsed_event')
+
+    def read_parsed(payment_data):
+        event = PaymongoEvent.parse(payment_data, strict=True)
+        values = [event.event_id, event.event_type, event.livemode]
+        for _hook in range(4):
+            event = PaymongoEvent.parse(event)  # No-op, as in each hook.
+            values += [event.resource_id, event.reference, event.amount_minor]
+        return values
+
+    for stats, func in ((dict_walk, _walk_event_dict), (parsed, read_parsed)):
+        start = time.perf_counter()
+        for index in range(iterations):
+            stats.measure(func, payloads[index % len(payloads)])
+        stats.wall_time = time.perf_counter() - start
+    return [dict_walk, parsed]
+
+
+# === CHECKOUT === #
+
+class MockPaymongoServer:
+    """Local stand-in for the PayMongo API with injectable latency and error rate.
+
+    Every request is answered with a new checkout session shaped like PayMongo's
+    `POST /v1/checkout_sessions` response. A share of the requests (`error_rate`) fails with a 500,
+    and the responses queued with `fail_next` are served first. The number of distinct client
+    connections is recorded to check keep-alive reuse.
+    """
+
+    def __init__(self, port=0, latency=0.0, error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.connections = set()
+        self.scripted = []  # [(status, headers)], served before the regular responses
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _respond(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                with server._lock:
+                    server.requests += 1
+                    server.connections.add(self.client_address)
+                    scripted = server.scripted.pop(0) if server.scripted else None
+                if server.latency:
+                    time.sleep(server.latency)
+                if scripted:
+                    status, headers = scripted
+                    self._respond(status, {'errors': [{'detail': "Scripted error"}]}, headers)
+                    return
+                if random.random() < server.error_rate:
+                    self._respond(500, {'errors': [{'detail': "Injected error"}]})
+                    return
+                session_id = f'cs_{uuid.uuid4().hex[:24]}'
+                self._respond(200, {'data': {'id': session_id, 'attributes': {
+                    'checkout_url': f'https://checkout.paymongo.test/{session_id}',
+                    'payment_intent': {'id': f'pi_{uuid.uuid4().hex[:24]}'},
+                }}})
+
+            do_GET = do_POST = _handle
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def fail_next(self, status, count=1, retry_after=None):
+        """Answer the next `count` requests with `status`, optionally with a `Retry-After`."""
+        headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+        with self._lock:
+            self.scripted += [(status, headers)] * count
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def bench_line_items(env, tx, iterations=20):
+    """Time `_paymongo_build_line_items` and the full payload preparation of a transaction.
+
+    Use a transaction linked to large invoices (e.g. 1k and 10k lines) to compare builders.
+    """
+    line_items, payload = Stats('line_items'), Stats('payload')
+    savepoint = env.cr.savepoint()
+    try:
+        for _i in range(iterations):
+            env.invalidate_all()  # Measure cold reads, as in a fresh request.
+            line_items.measure(tx._paymongo_build_line_items)
+            env.invalidate_all()
+            payload.measure(tx._paymongo_prepare_checkout_session_payload)
+    finally:
+        savepoint.close(rollback=True)
+        env.invalidate_all()
+    return [line_items, payload]
+
+
+def make_line_item_transaction(env, line_count, product_count=50):
+    """Create a posted PHP invoice of `line_count` taxed lines and a PayMongo transaction for it.
+
+    The lines cycle over `product_count` products so that compaction by product has something to
+    group. Nothing is rolled back here; see `bench_line_item_sizes`.
+
+    :return: The transaction.
+    :rtype: payment.transaction
+    """
+    from odoo.fields import Command  # noqa: PLC0415
+
+    company = env.company
+    provider = env['payment.provider'].search(
+        [('code', '=', 'paymongo'), ('company_id', '=', company.id)], limit=1
+    )
+    if not provider:
+        raise ValueError("Create a PayMongo provider in the current company first.")
+    currency = env.ref('base.PHP')
+    currency.active = True
+    tax = env['account.tax'].create({
+        'name': "Bench VAT 12%",
+        'amount': 12.0,
+        'type_tax_use': 'sale',
+        'company_id': company.id,
+    })
+    products = env['product.product'].create([
+        {'name': f"Bench product {index}", 'list_price': 10.0 + index}
+        for index in range(product_count)
+    ])
+    partner = env['res.partner'].create({'name': "Bench customer"})
+    invoice = env['account.move'].create({
+        'move_type': 'out_invoice',
+        'partner_id': partner.id,
+        'currency_id': currency.id,
+        'invoice_line_ids': [Command.create({
+            'product_id': products[index % product_count].id,
+            'quantity': 1 + index % 3,
+            'price_unit': products[index % product_count].list_price,
+            'tax_ids': [Command.set(tax.ids)],
+        }) for index in range(line_count)],
+    })
+    invoice.action_post()
+    return invoice._paymongo_create_transaction(provider=provider)
+
+
+def bench_line_item_sizes(env, sizes=(1000, 10000), iterations=5):
+    """Run `bench_line_items` on generated invoices of each size, then roll them back."""
+    stats_list = []
+    savepoint = env.cr.savepoint()
+    try:
+        for size in sizes:
+            tx = make_line_item_transaction(env, size)
+            for stats in bench_line_items(env, tx, iterations=iterations):
+                stats.stage = f'{stats.stage}_{size}'
+                stats_list.append(stats)
+    finally:
+        savepoint.close(rollback=True)
+        env.invalidate_all()
+    return stats_list
+
+
+def bench_checkout(env, tx, iterations=100, latency=0.0, error_rate=0.0):
+    """Time the checkout path of a transaction against a local PayMongo stand-in.
+
+    The stored checkout session is cleared before each render so that every iteration creates a
+    new session, like a first click on "Pay" does.
+    """
+    ICP = env['ir.config_parameter'].sudo()
+    api_call, render = Stats('api_call'), Stats('render')
+    previous_url = ICP.get_param('payment_paymongo.api_url')
+    savepoint = env.cr.savepoint()
+    with MockPaymongoServer(latency=latency, error_rate=error_rate) as server:
+        try:
+            ICP.set_param('payment_paymongo.api_url', server.url)
+            payload = tx._paymongo_prepare_checkout_session_payload()
+            start = time.perf_counter()
+            for _i in range(iterations):
+                api_call.measure(
+                    tx._send_api_request, 'POST', 'v1/checkout_sessions', json=payload
+                )
+            api_call.wall_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _i in range(iterations):
+                tx.write({
+                    'state': 'draft',
+                    'paymongo_checkout_url': False,
+                    'paymongo_checkout_expires_at': False,
+                })
+                render.measure(tx._get_specific_rendering_values, {})
+                if tx.state == 'error':
+                    render.errors += 1
+            render.wall_time = time.perf_counter() - start
+        finally:
+            savepoint.close(rollback=True)
+            env.invalidate_all()
+            ICP.set_param('payment_paymongo.api_url', previous_url or False)
+        print(f"mock server: {server.requests} requests over {len(server.connections)} connections")
+    return [api_call, render]
+
+
+# === COMMAND LINE === #
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    webhook = subparsers.add_parser('webhook', help="Deliver signed events to a running server.")
+    webhook.add_argument('--url', default='http://localhost:8069')
+    webhook.add_argument('--secret', required=True, help="The provider's webhook secret.")
+    webhook.add_argument('--events', type=int, default=1000)
+    webhook.add_argument('--concurrency', type=int, default=8)
+    webhook.add_argument('--reference', help="Target an existing transaction reference.")
+    webhook.add_argument('--livemode', action='store_true')
+
+    mock = subparsers.add_parser('mock-server', help="Run a local PayMongo API stand-in.")
+    mock.add_argument('--port', type=int, default=8765)
+    mock.add_argument('--latency', type=float, default=0.0, help="Seconds added per request.")
+    mock.add_argument('--error-rate', type=float, default=0.0)
+
+    args = parser.parse_args()
+    if args.command == 'webhook':
+        try:
+            print_report(bench_webhook(
+                args.url, args.secret, args.events, args.concurrency, args.reference,
+                args.livemode,
+            ))
+        except (HTTPError, URLError) as error:
+            parser.exit(1, f"{error}\n")
+    else:
+        with MockPaymongoServer(args.port, args.latency, args.error_rate) as server:
+            print(f"PayMongo stand-in listening on {server.url}, press Ctrl+C to stop")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == '__main__':
+    main()
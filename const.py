@@ -1 +1,94 @@
+API_URL = 'https://api.paymongo.com'
+
 DEFAULT_PAYMENT_METHOD_CODES = {'qrph'}
+
+# Webhook inbox: the endpoint only stores verified events, a cron drains them in batches.
+WEBHOOK_BATCH_SIZE = 50
+WEBHOOK_MAX_ATTEMPTS = 6
+WEBHOOK_RETRY_BASE_DELAY = 30  # seconds, doubled after each failed attempt
+WEBHOOK_RETRY_MAX_DELAY = 3600  # seconds
+WEBHOOK_EVENT_RETENTION_DAYS = 30
+WEBHOOK_TIMESTAMP_TOLERANCE = 300  # seconds, 0 disables the check
+WEBHOOK_REPLAY_CACHE_SIZE = 2048
+WEBHOOK_LOG_SAMPLE_RATE = 0.0  # share of full payloads logged at INFO level
+WEBHOOK_STORED_HEADERS = ('Paymongo-Signature', 'Content-Type', 'User-Agent')
+WEBHOOK_LOCK_RETRY_DELAY = 5  # seconds, when the transaction is busy in another worker
+
+# The state transitions driven by webhook events, applied in this order. Of several events of one
+# transaction driving the same transition, only the latest one is processed.
+WEBHOOK_EVENT_PRECEDENCE = {
+    'checkout_session.payment.paid': 3,
+    'payment.paid': 3,
+    'payment.failed': 2,
+    'checkout_session.payment.failed': 2,
+    'checkout_session.expired': 1,
+}
+
+# Audit archive of every verified notification, compressed with zstd when available.
+WEBHOOK_ARCHIVE_RETENTION_DAYS = 400
+WEBHOOK_ARCHIVE_REPLAY_BATCH_SIZE = 500
+WEBHOOK_ARCHIVE_ZSTD_LEVEL = 9
+WEBHOOK_ARCHIVE_ZLIB_LEVEL = 6
+
+# Outbound API calls go through a pooled keep-alive session per worker.
+HTTP_POOL_SIZE = 10
+HTTP_MAX_RETRIES = 2
+HTTP_BACKOFF_FACTOR = 0.5  # seconds
+HTTP_CONNECT_TIMEOUT = 5  # seconds
+HTTP_READ_TIMEOUT = 20  # seconds
+HTTP_MAX_RETRY_AFTER = 10  # seconds, longer Retry-After values are capped
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+API_MAX_WORKERS = 4  # concurrent requests of background jobs
+
+# Circuit breaker: open after enough failures in a window, probe again after the cooldown.
+CIRCUIT_FAILURE_THRESHOLD = 5  # failures
+CIRCUIT_FAILURE_RATE = 0.5  # share of failed requests since the first failure of the window
+CIRCUIT_WINDOW = 60  # seconds
+CIRCUIT_COOLDOWN = 30  # seconds
+CIRCUIT_STATE_VALUES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+# Cluster-wide token bucket per secret key; 0 calls per second disables the limiter.
+RATE_LIMIT_PER_SECOND = 10.0
+RATE_LIMIT_BURST = 20.0  # tokens
+RATE_LIMIT_INTERACTIVE_RESERVE = 0.25  # share of the bucket background jobs cannot take
+RATE_LIMIT_INTERACTIVE_WAIT = 2.0  # seconds a checkout waits for a token at most
+RATE_LIMIT_BACKGROUND_WAIT = 30.0  # seconds a job waits for a token at most
+
+# Reconciliation of pending transactions whose webhook was missed.
+RECONCILE_BATCH_SIZE = 200
+RECONCILE_MIN_AGE = 10  # minutes since the last state change before polling
+RECONCILE_MAX_AGE = 72  # hours after which transactions are no longer polled
+
+# Checkout sessions are reused on re-render until they expire.
+CHECKOUT_SESSION_TTL = 60  # minutes
+QRPH_CODE_TTL = 30  # minutes, QR Ph codes of the direct mode cannot be paid afterwards
+PRECREATE_BATCH_SIZE = 50  # invoices whose checkout is created per chunk, in the background
+
+# Line items beyond this count are compacted ('product', 'account' or 'none').
+LINE_ITEM_LIMIT = 100
+LINE_ITEM_COMPACTION = 'product'
+
+# Keys whose values are never written to the logs.
+LOG_REDACTED_KEYS = {
+    'billing', 'address', 'email', 'phone', 'name', 'line1', 'line2', 'city', 'postal_code',
+    'state', 'client_key',
+}
+
+# Sweeper of abandoned transactions.
+SWEEP_CHUNK_SIZE = 1000
+SWEEP_GRACE_PERIOD = 30  # minutes after the session expiry, for late webhooks
+SWEEP_MAX_AGE = 48  # hours, for transactions that never got a checkout session
+SWEEP_REMOTE_LIMIT = 200  # expired sessions checked on PayMongo per run
+
+# Import of payout and balance transaction reports into bank statements.
+PAYOUT_IMPORT_CHUNK_SIZE = 1000  # rows
+
+# Refunds, sent in batches through the concurrent request pool.
+REFUND_BATCH_SIZE = 100  # refunds sent per chunk, committed together
+REFUND_RESOLVE_DELAY = 15  # minutes after which a refund still being sent was interrupted
+
+# JSON status polling of the return page.
+STATUS_FINAL_STATES = ('authorized', 'done', 'cancel', 'error')
+STATUS_CACHE_TTL = 1.0  # seconds
+STATUS_FINAL_CACHE_TTL = 300  # seconds
+STATUS_CACHE_SIZE = 10000
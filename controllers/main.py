@@ -1,16 +1,27 @@
 # payment_paymongo/controllers/main.py
-import hmac
-import hashlib
-import pprint
+import functools
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
 
 from werkzeug.exceptions import Forbidden
 
 from odoo import http
 from odoo.http import request
-from odoo.tools import consteq
+from odoo.tools import SQL, consteq
 
 from odoo.addons.payment import utils as payment_utils
 from odoo.addons.payment.logging import get_payment_logger
+from odoo.addons.payment_paymongo import const, metrics
+from odoo.addons.payment_paymongo.utils import (
+    LazyPayload,
+    PaymongoEvent,
+    compute_signature,
+    get_config_param,
+)
 
 _logger = get_payment_logger(__name__)
 
@@ -18,90 +29,361 @@ _logger = get_payment_logger(__name__)
 class PayMongoController(http.Controller):
     _webhook_url = '/payment/paymongo/webhook'
     _return_url = '/payment/paymongo/return'
+    _status_url = '/payment/paymongo/status'
+    _qr_url = '/payment/paymongo/qr'
+    _pay_url = '/payment/paymongo/pay'
 
     @http.route(_return_url, type='http', methods=['GET'], auth='public')
     def paymongo_return(self, tx_ref=None, access_token=None, result=None, **kwargs):
         """User returns from PayMongo hosted checkout.
         Keep it lightweight: set draft -> pending, rely on webhook to confirm final state.
+        The user then waits on a minimal page that polls `_status_url` instead of the full
+        `/payment/status` page. No webhook follows a cancelled checkout, so the user is sent to
+        `/payment/status` right away instead.
         """
-        tx_sudo = request.env['payment.transaction'].sudo().search([
-            ('provider_code', '=', 'paymongo'),
-            ('reference', '=', tx_ref),
-            ('state', '=', 'draft'),
-        ], limit=1)
-        if tx_sudo and access_token and payment_utils.check_access_token(access_token, tx_ref, tx_sudo.amount):
+        result_label = result if result in ('success', 'cancel') else 'other'
+        with metrics.timer('return', result=result_label) as stage:
+            # The reference alone hits its unique index; the provider is checked afterwards.
+            tx_sudo = request.env['payment.transaction'].sudo().search(
+                [('reference', '=', tx_ref or '')], limit=1
+            )
+            if not (
+                tx_sudo.provider_code == 'paymongo'
+                and access_token
+                and payment_utils.check_access_token(access_token, tx_ref, tx_sudo.amount)
+            ):
+                stage['outcome'] = 'ignored'
+                return request.redirect('/payment/status')
+            if result == 'cancel':
+                return request.redirect('/payment/status')
+            if tx_sudo.state == 'draft':
+                tx_sudo._set_pending()
+        return request.render('payment_paymongo.status_page', {
+            'status_url': f'{self._status_url}?'
+                          f'{urlencode({"tx_ref": tx_ref, "access_token": access_token})}',
+            'state': tx_sudo.state,
+        })
+
+    @http.route(_qr_url, type='http', methods=['GET'], auth='public')
+    def paymongo_qr(self, tx_ref=None, access_token=None, **kwargs):
+        """Show the QR Ph code of a direct mode transaction and wait for its payment.
+
+        An expired code is replaced by a new one when the page is reloaded. The page polls
+        `_status_url` like the return page does and moves on once the payment is confirmed.
+        """
+        tx_sudo = request.env['payment.transaction'].sudo().search(
+            [('reference', '=', tx_ref or '')], limit=1
+        )
+        if not (
+            tx_sudo.provider_code == 'paymongo'
+            and access_token
+            and payment_utils.check_access_token(access_token, tx_ref, tx_sudo.amount)
+            and tx_sudo.state in ('draft', 'pending')
+        ):
+            return request.redirect('/payment/status')
+        qr_image = tx_sudo._paymongo_get_qr_image()
+        if not qr_image:
+            return request.redirect('/payment/status')
+        if tx_sudo.state == 'draft':
             tx_sudo._set_pending()
-        return request.redirect('/payment/status')
+        return request.render('payment_paymongo.qr_page', {
+            'qr_image': qr_image,
+            'amount': tx_sudo.amount,
+            'currency': tx_sudo.currency_id,
+            'reference': tx_sudo.reference,
+            'expires_at': tx_sudo.paymongo_checkout_expires_at,
+            'status_url': f'{self._status_url}?'
+                          f'{urlencode({"tx_ref": tx_ref, "access_token": access_token})}',
+            'state': tx_sudo.state,
+        })
+
+    @http.route(f'{_pay_url}/<int:move_id>', type='http', methods=['GET'], auth='public')
+    def paymongo_pay(self, move_id, access_token=None, **kwargs):
+        """Redirect to the PayMongo checkout of an invoice, as linked by the payment link wizard.
+
+        The transaction and checkout session are usually pre-created in the background when the
+        invoice is posted; if they are missing or have expired, they are created here.
+        """
+        if not (access_token and payment_utils.check_access_token(access_token, move_id)):
+            raise Forbidden()
+        move_sudo = request.env['account.move'].sudo().browse(move_id).exists()
+        if not move_sudo:
+            raise Forbidden()
+        if move_sudo.payment_state not in ('not_paid', 'partial'):
+            return request.redirect(move_sudo.get_portal_url())
+        with metrics.timer('pay_link') as stage:
+            tx_sudo = move_sudo._paymongo_get_payment_transaction()
+            payment_url = tx_sudo._paymongo_get_payment_url()
+            if not payment_url:
+                stage['outcome'] = 'failed'
+                return request.redirect(move_sudo.get_portal_url())
+        return request.redirect(payment_url, local=False)
+
+    @http.route(_status_url, type='http', methods=['GET'], auth='public')
+    def paymongo_status(self, tx_ref=None, access_token=None, **kwargs):
+        """Return the state of a transaction as JSON.
+
+        The request is answered at once; the waiting page polls it every few seconds. Each read is
+        a single lookup on the unique reference index, in a fresh cursor so that changes committed
+        by the webhook worker are visible, and is cached for a short while to absorb concurrent
+        polls.
+
+        This deliberately does not long-poll. Holding the request until the webhook flips the state
+        would pin an ordinary prefork HTTP worker per waiting customer, and Odoo's gevent worker
+        only serves the bus websocket, which this standalone page does not load. A cached poll
+        costs less than a held worker, and the customer sees the final state at most one poll
+        interval after the webhook.
+        """
+        tx_data = self._get_transaction_status(tx_ref)
+        if not (
+            tx_data and access_token
+            and payment_utils.check_access_token(access_token, tx_ref, tx_data['amount'])
+        ):
+            raise Forbidden()
+
+        return request.make_json_response({
+            'reference': tx_ref,
+            'state': tx_data['state'],
+            'final': tx_data['state'] in const.STATUS_FINAL_STATES,
+        }, headers=[('Cache-Control', 'no-store')])
 
-    @http.route(_webhook_url, type='http', methods=['POST'], auth='public', csrf=False)
-    def paymongo_webhook(self):
-        """Process the payment data sent by PayMongo to the webhook.
+    @staticmethod
+    def _get_transaction_status(reference):
+        """Read the state and amount of a transaction, through a short-lived per-worker cache.
 
-        Odoo-core pattern:
-        - parse JSON payload
-        - locate tx via _search_by_reference()
-        - verify webhook signature using tx.provider_id credentials
-        - tx._process(...)
+        :param str reference: The reference of the transaction.
+        :return: The `state` and `amount` of the transaction, or None if it does not exist.
+        :rtype: dict
         """
-        raw_body = request.httprequest.data  # IMPORTANT: raw body used for signature verification
-        signature_header = request.httprequest.headers.get('Paymongo-Signature')
+        if not reference:
+            return None
+        now = time.monotonic()
+        cached = _status_cache.get(reference)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        with request.env.registry.cursor() as cr:
+            cr.execute(SQL(
+                "SELECT state, amount FROM payment_transaction WHERE reference = %s", reference
+            ))
+            row = cr.fetchone()
+        tx_data = row and {'state': row[0], 'amount': float(row[1])}
+        if tx_data:
+            ttl = const.STATUS_FINAL_CACHE_TTL if row[0] in const.STATUS_FINAL_STATES \
+                else const.STATUS_CACHE_TTL
+            if len(_status_cache) >= const.STATUS_CACHE_SIZE:
+                _status_cache.clear()
+            _status_cache[reference] = (now + ttl, tx_data)
+        return tx_data
+
+    @http.route('/payment/paymongo/metrics', type='http', methods=['GET'], auth='user')
+    def paymongo_metrics(self):
+        """Expose the hot-path metrics of all workers in the Prometheus text format."""
+        if not request.env.user._is_system():
+            raise Forbidden()
+        return request.make_response(
+            request.env['paymongo.metric'].sudo()._render(),
+            headers=[('Content-Type', 'text/plain; version=0.0.4')],
+        )
+
+    @http.route(
+        [_webhook_url, f'{_webhook_url}/<int:provider_id>'],
+        type='http', methods=['POST'], auth='public', csrf=False,
+    )
+    def paymongo_webhook(self, provider_id=None):
+        """Verify the notification sent by PayMongo and store it in the webhook inbox.
+
+        The signature is checked first, against the cached webhook secrets and before the body is
+        parsed or the database is queried, so that forged requests cost next to nothing. Webhooks
+        registered with the URL of their provider (see `paymongo_webhook_url`) are only checked
+        against the secret of that provider. The event
+        is then only persisted here; the transaction lookup and `tx._process` are run by the
+        `paymongo.webhook.event` cron so that HTTP workers are released right away.
+
+        Signed events that are malformed are acknowledged but dropped: a redelivery would not make
+        them any better.
+        """
+        start = time.perf_counter()
+        raw_body = request.httprequest.get_data()  # IMPORTANT: raw body used for signature verification
+        signature_parts = self._parse_signature_header(
+            request.httprequest.headers.get('Paymongo-Signature')
+        )
+        with metrics.timer('signature') as stage:
+            provider_id = self._verify_paymongo_signature(signature_parts, raw_body, provider_id)
+            stage['outcome'] = 'valid' if provider_id else 'invalid'
+            stage['provider'] = provider_id
+        if not provider_id:
+            _logger.warning("Received PayMongo webhook with invalid signature.")
+            self._archive_rejected(raw_body)
+            raise Forbidden()
+        signature = signature_parts.get('li') or signature_parts.get('te')
+        if _seen_signatures.is_known(signature):
+            _logger.info("Ignored replayed PayMongo webhook.")
+            return request.make_json_response(['accepted'], status=200)
 
         data = request.get_json_data()
-        _logger.info("Notification received from PayMongo with data:\n%s", pprint.pformat(data))
-
-        tx_sudo = request.env['payment.transaction'].sudo()._search_by_reference('paymongo', data)
-        if tx_sudo:
-            # Verify signature using the transaction's provider configuration (core pattern).
-            if not self._verify_paymongo_signature(
-                signature_header,
-                raw_body,
-                tx_sudo.provider_id.paymongo_webhook_secret,
-                data,
-            ):
-                _logger.warning("Received PayMongo webhook with invalid signature.")
-                raise Forbidden()
+        self._log_payload(data)
+        archive_model_sudo = request.env['paymongo.webhook.archive'].sudo()
+        try:
+            event = PaymongoEvent.parse(data, strict=True)
+        except ValueError as error:
+            _logger.warning("Dropped malformed PayMongo webhook: %s", error)
+            archive_model_sudo._archive(
+                raw_body, 'malformed', provider_id, PaymongoEvent.parse(data)
+            )
+            metrics.inc(
+                'paymongo_webhook_events_total', provider=provider_id, outcome='malformed'
+            )
+            return request.make_json_response(['accepted'], status=200)
+
+        archive_model_sudo._archive(raw_body, 'valid', provider_id, event)
+
+        # PayMongo redelivers events: acknowledge known ones without touching the transaction.
+        event_model_sudo = request.env['paymongo.webhook.event'].sudo()
+        duplicate = event_model_sudo._is_known_event(event.event_id)
+        if not duplicate:
+            provider_sudo = request.env['payment.provider'].sudo().browse(provider_id)
+            event_model_sudo._enqueue(provider_sudo, raw_body, request.httprequest.headers, event)
+        # Only remember the signature once the event is stored for good: if this request fails,
+        # PayMongo's redelivery must not be dropped as a replay.
+        request.env.cr.postcommit.add(functools.partial(_seen_signatures.add, signature))
 
-            # Keep your existing minimal shape to avoid changing _apply_updates()
-            tx_sudo._process('paymongo', data)
+        metrics.inc(
+            'paymongo_webhook_events_total', provider=provider_id, event_type=event.event_type,
+            outcome='duplicate' if duplicate else 'queued',
+        )
+        if _logger.isEnabledFor(logging.INFO):
+            _logger.info(
+                "PayMongo event %s type=%s ref=%s livemode=%s amount=%s %s in %.1fms",
+                event.event_id, event.event_type, event.reference or event.paymongo_reference,
+                event.livemode, event.amount_minor,
+                'ignored (duplicate)' if duplicate else 'queued',
+                (time.perf_counter() - start) * 1000,
+            )
 
         # Always acknowledge (same as other providers)
         return request.make_json_response(['accepted'], status=200)
 
-    def _verify_paymongo_signature(self, header, raw_body: bytes, webhook_secret: str, payload_json: dict) -> bool:
-        """Verify PayMongo webhook signature.
+    @staticmethod
+    def _log_payload(data):
+        """Log the full redacted payload at DEBUG level, or for a sample of the events.
+
+        :param dict data: The event envelope.
+        :return: None
+        """
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("Notification received from PayMongo with data:\n%s", LazyPayload(data))
+            return
+        sample_rate = get_config_param(
+            request.env, 'webhook_log_sample_rate', const.WEBHOOK_LOG_SAMPLE_RATE
+        )
+        if sample_rate and random.random() < sample_rate:
+            _logger.info("Notification received from PayMongo with data:\n%s", LazyPayload(data))
+
+    @staticmethod
+    def _archive_rejected(raw_body):
+        """Archive a notification whose signature is invalid, if enabled.
+
+        The request is about to fail, so the archive row is written in its own cursor. This is
+        off by default (`payment_paymongo.archive_invalid_webhooks`) since it lets anyone write
+        to the database.
+
+        :param bytes raw_body: The raw request body.
+        :return: None
+        """
+        if not get_config_param(request.env, 'archive_invalid_webhooks', False):
+            return
+        with request.env.registry.cursor() as cr:
+            env = request.env(cr=cr, su=True)
+            env['paymongo.webhook.archive']._archive(raw_body, 'invalid')
+
+    @staticmethod
+    def _parse_signature_header(header):
+        """Split the `Paymongo-Signature` header into its `t`, `te` and `li` parts.
+
+        :param str header: The raw header value.
+        :return: The header parts.
+        :rtype: dict
+        """
+        parts = {}
+        for p in (header or '').split(','):
+            if '=' in p:
+                k, v = p.split('=', 1)
+                parts[k.strip()] = v.strip()
+        return parts
+
+    def _verify_paymongo_signature(self, signature_parts, raw_body: bytes, provider_id=None):
+        """Verify PayMongo webhook signature and return the id of the signing provider.
 
         PayMongo-Signature header contains:
         - t=<timestamp>
         - te=<test signature>
         - li=<live signature>
 
+        Only one of `te`/`li` is set depending on the mode of the event, so the non-empty one is
+        checked, without parsing the body, against the webhook secret of the given provider or
+        else of every PayMongo provider in that mode. Events whose timestamp is outside the
+        configured tolerance are rejected.
+
         Signed payload is: "{t}.{raw_body}"
         HMAC SHA-256 with webhook_secret.
+
+        :param dict signature_parts: The parsed signature header.
+        :param bytes raw_body: The raw request body.
+        :param int provider_id: The provider named in the webhook URL, if any.
+        :return: The id of the signing provider, or None if the signature is invalid.
+        :rtype: int
         """
-        if not header or not webhook_secret:
-            return False
+        t = signature_parts.get('t')
+        their_sig = signature_parts.get('li') or signature_parts.get('te')
+        if not t or not their_sig:
+            return None
 
-        parts = {}
-        for p in header.split(','):
-            if '=' in p:
-                k, v = p.split('=', 1)
-                parts[k.strip()] = v.strip()
+        tolerance = get_config_param(
+            request.env, 'webhook_timestamp_tolerance', const.WEBHOOK_TIMESTAMP_TOLERANCE
+        )
+        try:
+            if tolerance and abs(time.time() - int(t)) > tolerance:
+                return None
+        except ValueError:
+            return None
 
-        t = parts.get('t')
-        te = parts.get('te')
-        li = parts.get('li')
+        livemode = bool(signature_parts.get('li'))
+        for candidate_id, webhook_secret in (
+            request.env['payment.provider'].sudo()._paymongo_get_webhook_secrets(livemode)
+        ):
+            if provider_id and candidate_id != provider_id:
+                continue
+            computed = compute_signature(webhook_secret, t, raw_body)
+            if consteq(computed, their_sig):
+                return candidate_id
+        return None
 
-        livemode = payload_json.get('data', {}).get('attributes', {}).get('livemode')
-        their_sig = li if livemode else te
 
-        if not t or not their_sig:
+class _SignatureReplayCache:
+    """Small per-worker LRU of recently accepted signatures, to drop replayed requests early."""
+
+    def __init__(self, size):
+        self._size = size
+        self._signatures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_known(self, signature):
+        """Return whether the signature was already accepted."""
+        with self._lock:
+            if signature in self._signatures:
+                self._signatures.move_to_end(signature)
+                return True
             return False
 
-        signed_payload = (t + ".").encode("utf-8") + (raw_body or b"")
-        computed = hmac.new(
-            webhook_secret.encode("utf-8"),
-            signed_payload,
-            hashlib.sha256,
-        ).hexdigest()
+    def add(self, signature):
+        """Remember an accepted signature."""
+        with self._lock:
+            self._signatures[signature] = True
+            self._signatures.move_to_end(signature)
+            if len(self._signatures) > self._size:
+                self._signatures.popitem(last=False)
+
 
-        return consteq(computed, their_sig)
+_seen_signatures = _SignatureReplayCache(const.WEBHOOK_REPLAY_CACHE_SIZE)
+_status_cache = {}  # {reference: (expiry, {'state': ..., 'amount': ...})}
@@ -0,0 +1,168 @@
+# payment_paymongo/metrics.py
+"""Counters and latency histograms of the PayMongo hot paths.
+
+Samples are first aggregated in memory by each worker process, then flushed as deltas into the
+`paymongo.metric` table, which holds the totals of the whole cluster: cron workers flush after
+each job and HTTP workers at most every `FLUSH_INTERVAL` seconds, after a request. The
+`/payment/paymongo/metrics` route renders that table in the Prometheus text format, so that every
+scrape sees the same series whichever worker serves it.
+"""
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FLUSH_INTERVAL = 10  # seconds, between two flushes of an HTTP worker
+
+_lock = threading.Lock()
+_counters = {}  # {(name, labels): value}, not flushed yet
+_gauges = {}  # {(name, labels): value}, not flushed yet
+_histograms = {}  # {(name, labels): [bucket_counts, sum, count]}, not flushed yet
+_last_flush = time.monotonic()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(
+        (key, str(value)) for key, value in labels.items() if value is not None
+    ))
+
+
+def inc(name, value=1, **labels):
+    """Increment a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    """Set the current value of a gauge."""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, seconds, **labels):
+    """Record a duration in a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * len(DURATION_BUCKETS), 0.0, 0]
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                histogram[0][index] += 1
+        histogram[1] += seconds
+        histogram[2] += 1
+
+
+@contextmanager
+def timer(stage, **labels):
+    """Time the enclosed block as a stage of the PayMongo integration.
+
+    The yielded dict can be used to set the `outcome` label (or any other label) from within the
+    block; it defaults to `ok`, or to `error` if the block raises.
+    """
+    context = {'outcome': 'ok', **labels}
+    start = time.perf_counter()
+    try:
+        yield context
+    except Exception:
+        context['outcome'] = 'error'
+        raise
+    finally:
+        observe(
+            'paymongo_stage_duration_seconds', time.perf_counter() - start, stage=stage, **context
+        )
+
+
+def format_labels(labels):
+    """Render label pairs in the Prometheus text format, e.g. `{stage="process",le="0.5"}`.
+
+    :param tuple labels: The `(key, value)` pairs of the labels.
+    :return: The rendered labels, or an empty string if there are none.
+    :rtype: str
+    """
+    if not labels:
+        return ''
+    values = ','.join(
+        '{}="{}"'.format(key, value.replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in labels
+    )
+    return '{' + values + '}'
+
+
+def is_flush_due():
+    """Return whether this worker has not flushed its samples for `FLUSH_INTERVAL` seconds."""
+    return time.monotonic() - _last_flush >= FLUSH_INTERVAL
+
+
+def drain():
+    """Take the samples aggregated by this worker since its last flush.
+
+    Histograms are split into their `_bucket`, `_sum` and `_count` series, which are summed like
+    counters; gauges are set to their last value.
+
+    :return: The `(family, kind, name, labels, value)` of each series, `labels` being rendered
+             with `format_labels`.
+    :rtype: list
+    """
+    global _last_flush
+    with _lock:
+        counters, gauges, histograms = dict(_counters), dict(_gauges), dict(_histograms)
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+        _last_flush = time.monotonic()
+
+    samples = [
+        (name, 'counter', name, format_labels(labels), value)
+        for (name, labels), value in counters.items()
+    ]
+    samples += [
+        (name, 'gauge', name, format_labels(labels), value)
+        for (name, labels), value in gauges.items()
+    ]
+    for (name, labels), (buckets, total, count) in histograms.items():
+        for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+            samples.append((
+                name, 'histogram', f'{name}_bucket',
+                format_labels(labels + (('le', str(bound)),)), bucket_count,
+            ))
+        samples.append((
+            name, 'histogram', f'{name}_bucket', format_labels(labels + (('le', '+Inf'),)), count
+        ))
+        samples.append((name, 'histogram', f'{name}_sum', format_labels(labels), total))
+        samples.append((name, 'histogram', f'{name}_count', format_labels(labels), count))
+    return samples
+
+
+_LE_PATTERN = re.compile(r',?le="([^"]*)"')
+
+
+def _sort_key(sample):
+    _family, _kind, name, labels, _value = sample
+    match = _LE_PATTERN.search(labels)
+    if not match:
+        return name, labels, 0.0
+    le = float('inf') if match[1] == '+Inf' else float(match[1])
+    return name, _LE_PATTERN.sub('', labels), le
+
+
+def render(samples):
+    """Render series in the Prometheus text exposition format.
+
+    :param list samples: The `(family, kind, name, labels, value)` of each series.
+    :return: The metrics.
+    :rtype: str
+    """
+    samples_by_family = {}
+    for sample in samples:
+        samples_by_family.setdefault((sample[0], sample[1]), []).append(sample)
+    lines = []
+    for (family, kind), family_samples in sorted(samples_by_family.items()):
+        lines.append(f'# TYPE {family} {kind}')
+        lines += [
+            f'{name}{labels} {value}'
+            for _family, _kind, name, labels, value in sorted(family_samples, key=_sort_key)
+        ]
+    return '\n'.join(lines) + '\n'
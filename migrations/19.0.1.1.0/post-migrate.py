@@ -0,0 +1,26 @@
+# payment_paymongo/migrations/19.0.1.1.0/post-migrate.py
+
+
+def migrate(cr, version):
+    """Backfill the indexed PayMongo identifiers of existing transactions.
+
+    The sanitized reference mirrors `_paymongo_sanitize_reference`; checkout session ids are taken
+    from `provider_reference`, where they were stored until now.
+    """
+    cr.execute(r"""
+        UPDATE payment_transaction tx
+           SET paymongo_reference = COALESCE(NULLIF(LEFT(BTRIM(regexp_replace(
+                   regexp_replace(BTRIM(tx.reference), '[^A-Za-z0-9_-]+', '-', 'g'),
+                   '-{2,}', '-', 'g'
+               ), '-'), 60), ''), 'odoo'),
+               paymongo_checkout_session_id = CASE
+                   WHEN tx.provider_reference LIKE 'cs\_%' THEN tx.provider_reference
+               END,
+               paymongo_payment_id = CASE
+                   WHEN tx.provider_reference LIKE 'pay\_%' THEN tx.provider_reference
+               END
+          FROM payment_provider provider
+         WHERE provider.id = tx.provider_id
+           AND provider.code = 'paymongo'
+           AND tx.paymongo_reference IS NULL
+    """)
@@ -0,0 +1,15 @@
+# payment_paymongo/migrations/19.0.1.2.0/post-migrate.py
+
+
+def migrate(cr, version):
+    """Move the archived webhook bodies to the raw `compressed_body` column.
+
+    They were stored base64-encoded by the former `body` binary field, whose column is dropped
+    with the field once the upgrade completes.
+    """
+    cr.execute("""
+        UPDATE paymongo_webhook_archive
+           SET compressed_body = decode(convert_from(body, 'UTF8'), 'base64')
+         WHERE body IS NOT NULL
+           AND compressed_body IS NULL
+    """)
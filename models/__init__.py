@@ -1,3 +1,12 @@
 from . import models
 from . import payment_provider
 from . import payment_transaction
+from . import paymongo_webhook_event
+from . import paymongo_rate_bucket
+from . import paymongo_metric
+from . import paymongo_webhook_archive
+from . import account_move
+from . import paymongo_refund_batch
+from . import paymongo_refund_batch_line
+from . import ir_cron
+from . import ir_http
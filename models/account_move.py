@@ -0,0 +1,317 @@
+# payment_paymongo/models/account_move.py
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from odoo import _, api, fields, models
+from odoo.exceptions import ValidationError
+from odoo.fields import Command
+from odoo.tools import SQL
+from odoo.tools.urls import urljoin
+
+from odoo.addons.payment import utils as payment_utils
+from odoo.addons.payment.logging import get_payment_logger
+from odoo.addons.payment_paymongo import const, metrics
+from odoo.addons.payment_paymongo.controllers.main import PayMongoController
+
+_logger = get_payment_logger(__name__)
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    # Checkouts pre-created in the background, see `_cron_paymongo_precreate_checkouts`.
+    paymongo_transaction_id = fields.Many2one(
+        string="PayMongo Transaction",
+        comodel_name='payment.transaction',
+        readonly=True,
+        copy=False,
+        index='btree_not_null',
+    )
+    paymongo_checkout_queued_at = fields.Datetime(
+        string="PayMongo Checkout Queued At", readonly=True, copy=False, index='btree_not_null'
+    )
+
+    def _post(self, soft=True):
+        posted = super()._post(soft=soft)
+        # Only queue the checkouts: posting never waits on the PayMongo API.
+        posted._paymongo_queue_checkouts()
+        return posted
+
+    def action_paymongo_pay(self):
+        """Create one PayMongo payment for the selected invoices and open it."""
+        tx_sudo = self._paymongo_create_transaction()
+        payment_url = tx_sudo._paymongo_get_payment_url()
+        if not payment_url:
+            raise ValidationError(
+                tx_sudo.state_message or _("The PayMongo payment could not be created.")
+            )
+        return {'type': 'ir.actions.act_url', 'url': payment_url, 'target': 'new'}
+
+    def _paymongo_create_transaction(self, provider=None):
+        """Create a single PayMongo transaction paying all these invoices at once.
+
+        The transaction is linked to every invoice, so that once it is paid the payment
+        post-processing of `account_payment` creates one payment and reconciles it against all the
+        invoices with a single `reconcile` call. Its checkout session lists one item per invoice.
+
+        :param payment.provider provider: The PayMongo provider to use, by default the first one
+                                          available in the company of the invoices.
+        :return: The created transaction.
+        :rtype: payment.transaction
+        :raise ValidationError: If the invoices cannot be paid together.
+        """
+        if not self:
+            raise ValidationError(_("Select at least one invoice to pay."))
+        if any(
+            move.move_type != 'out_invoice'
+            or move.state != 'posted'
+            or move.payment_state not in ('not_paid', 'partial')
+            for move in self
+        ):
+            raise ValidationError(_(
+                "Only posted customer invoices that are not paid yet can be paid with PayMongo."
+            ))
+        partner = self.commercial_partner_id
+        if len(partner) > 1:
+            raise ValidationError(_("The invoices paid together must belong to the same customer."))
+        if len(self.company_id) > 1:
+            raise ValidationError(_("The invoices paid together must belong to the same company."))
+        currency = self.currency_id
+        if len(currency) > 1 or currency.name != 'PHP':
+            raise ValidationError(_("PayMongo Checkout (QRPH) currently supports PHP only."))
+
+        if provider:
+            provider_sudo = provider.sudo()
+        else:
+            provider_sudo = self.env['payment.provider'].sudo().search([
+                ('code', '=', 'paymongo'),
+                ('state', 'in', ('enabled', 'test')),
+                ('company_id', '=', self.company_id.id),
+            ], limit=1)
+        if not provider_sudo:
+            raise ValidationError(_("No PayMongo provider is available for this company."))
+        payment_method = provider_sudo.payment_method_ids.filtered(
+            lambda method: method.code in const.DEFAULT_PAYMENT_METHOD_CODES
+        )[:1]
+
+        tx_model_sudo = self.env['payment.transaction'].sudo()
+        prefix = self[0].name if len(self) == 1 else f'{self[0].name}+{len(self) - 1}'
+        return tx_model_sudo.create({
+            'provider_id': provider_sudo.id,
+            'payment_method_id': payment_method.id,
+            'reference': tx_model_sudo._compute_reference(provider_sudo.code, prefix=prefix),
+            'amount': sum(self.mapped('amount_residual')),
+            'currency_id': currency.id,
+            'partner_id': partner.id,
+            'invoice_ids': [Command.set(self.ids)],
+            'operation': 'online_redirect',
+        })
+
+    def _paymongo_get_pay_url(self):
+        """Return the payment link of the invoice, to be shared with the customer.
+
+        The link opens the PayMongo checkout of the invoice directly, using the checkout
+        pre-created when the invoice was posted if it is still valid. It is offered by the payment
+        link wizard of invoices whose company pre-creates checkouts.
+
+        :return: The absolute URL of the payment link.
+        :rtype: str
+        """
+        self.ensure_one()
+        access_token = payment_utils.generate_access_token(self.id)
+        return urljoin(
+            self.get_base_url(),
+            f'{PayMongoController._pay_url}/{self.id}?{urlencode({"access_token": access_token})}',
+        )
+
+    def _paymongo_get_precreate_providers(self):
+        """Return the providers pre-creating checkouts, by company of these invoices.
+
+        :return: The provider of each company that has one.
+        :rtype: dict
+        """
+        providers_sudo = self.env['payment.provider'].sudo().search([
+            ('code', '=', 'paymongo'),
+            ('state', 'in', ('enabled', 'test')),
+            ('paymongo_precreate_checkout', '=', True),
+            ('company_id', 'in', self.company_id.ids),
+        ])
+        providers_by_company = {}
+        for provider_sudo in providers_sudo:
+            providers_by_company.setdefault(provider_sudo.company_id, provider_sudo)
+        return providers_by_company
+
+    def _paymongo_queue_checkouts(self):
+        """Queue the pre-creation of the checkout of these invoices, when it is enabled.
+
+        Only unpaid PHP customer invoices of companies whose PayMongo provider pre-creates
+        checkouts are queued, and only if they have no reusable transaction yet.
+
+        :return: None
+        """
+        moves = self.filtered(lambda move: (
+            move.move_type == 'out_invoice'
+            and move.state == 'posted'
+            and move.payment_state in ('not_paid', 'partial')
+            and move.currency_id.name == 'PHP'
+            and not move.paymongo_checkout_queued_at
+        ))
+        if not moves:
+            return
+        providers_by_company = moves._paymongo_get_precreate_providers()
+        moves = moves.filtered(lambda move: (
+            move.company_id in providers_by_company
+            and not move._paymongo_get_reusable_transaction(with_checkout=True)
+        ))
+        if moves:
+            moves.sudo().paymongo_checkout_queued_at = fields.Datetime.now()
+            self.env.ref('payment_paymongo.cron_precreate_checkouts')._trigger()
+
+    def _paymongo_get_reusable_transaction(self, with_checkout=False):
+        """Return the pre-created transaction of the invoice if it can still be used to pay it.
+
+        :param bool with_checkout: Whether the transaction must also have a valid checkout session
+                                   (in hosted mode).
+        :return: The transaction, if reusable.
+        :rtype: payment.transaction
+        """
+        self.ensure_one()
+        tx_sudo = self.sudo().paymongo_transaction_id
+        if not (
+            tx_sudo.state in ('draft', 'pending')
+            and tx_sudo.invoice_ids == self
+            and self.currency_id.compare_amounts(tx_sudo.amount, self.amount_residual) == 0
+        ):
+            return tx_sudo.browse()
+        if (
+            with_checkout
+            and tx_sudo.provider_id.paymongo_checkout_mode == 'hosted'
+            and not tx_sudo._paymongo_has_valid_checkout_session()
+        ):
+            return tx_sudo.browse()
+        return tx_sudo
+
+    def _paymongo_get_payment_transaction(self):
+        """Return the transaction paying the invoice, reusing the pre-created one if possible.
+
+        :return: The transaction.
+        :rtype: payment.transaction
+        """
+        self.ensure_one()
+        tx_sudo = self._paymongo_get_reusable_transaction()
+        if not tx_sudo:
+            provider_sudo = self._paymongo_get_precreate_providers().get(self.company_id)
+            tx_sudo = self._paymongo_create_transaction(provider=provider_sudo)
+            self.sudo().paymongo_transaction_id = tx_sudo
+        return tx_sudo
+
+    @api.model
+    def _cron_paymongo_precreate_checkouts(self, batch_size=None, auto_commit=True):
+        """Create the queued transactions and checkout sessions of invoices, chunk by chunk.
+
+        Invoices are claimed with `FOR UPDATE SKIP LOCKED`, unqueued and given their transaction,
+        then committed so that the invoices are no longer locked while PayMongo is called. The
+        checkout sessions of a chunk are created through the concurrent request pool of the
+        provider, which bounds the concurrency and takes background rate-limit tokens, so that bulk
+        invoice runs leave room for the checkouts of customers. Invoices whose checkout could not
+        be created are not queued again: their payment link creates it on the first click instead.
+
+        :param int batch_size: The number of invoices handled per chunk.
+        :param bool auto_commit: Whether to commit after each chunk.
+        :return: None
+        """
+        batch_size = batch_size or const.PRECREATE_BATCH_SIZE
+        while moves := self._paymongo_claim_queued_checkouts(batch_size):
+            moves.paymongo_checkout_queued_at = False
+            with metrics.timer('checkout_precreate'):
+                txs_by_provider = moves._paymongo_precreate_transactions()
+                if auto_commit:
+                    self.env.cr.commit()  # Release the invoices before calling PayMongo.
+                self._paymongo_precreate_checkout_sessions(txs_by_provider)
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()  # Keep the cache from growing with the queue.
+
+    @api.model
+    def _paymongo_claim_queued_checkouts(self, limit):
+        """Lock and return the next queued invoices, skipping those claimed by other workers.
+
+        :param int limit: The maximum number of invoices to claim.
+        :return: The claimed invoices.
+        :rtype: account.move
+        """
+        self.env.cr.execute(SQL(
+            """
+            SELECT id
+              FROM account_move
+             WHERE paymongo_checkout_queued_at IS NOT NULL
+          ORDER BY paymongo_checkout_queued_at, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+            """,
+            limit,
+        ))
+        return self.browse(row[0] for row in self.env.cr.fetchall())
+
+    def _paymongo_precreate_transactions(self):
+        """Create the transactions of these invoices, or reuse their pre-created ones.
+
+        :return: The transactions of the hosted mode that still need a checkout session, by
+                 provider.
+        :rtype: dict
+        """
+        providers_by_company = self._paymongo_get_precreate_providers()
+        txs_by_provider = defaultdict(lambda: self.env['payment.transaction'].sudo())
+        for move in self:
+            provider_sudo = providers_by_company.get(move.company_id)
+            if not provider_sudo or move.payment_state not in ('not_paid', 'partial'):
+                continue
+            tx_sudo = move._paymongo_get_reusable_transaction()
+            if not tx_sudo:
+                try:
+                    with self.env.cr.savepoint():
+                        tx_sudo = move._paymongo_create_transaction(provider=provider_sudo)
+                except ValidationError as error:
+                    _logger.warning("Could not pre-create the checkout of %s: %s", move.name, error)
+                    continue
+                move.sudo().paymongo_transaction_id = tx_sudo
+            if (
+                tx_sudo.provider_id.paymongo_checkout_mode == 'hosted'
+                and not tx_sudo._paymongo_has_valid_checkout_session()
+            ):
+                txs_by_provider[tx_sudo.provider_id] |= tx_sudo
+        # QR Ph codes of the direct mode expire too soon to be worth creating in advance.
+        return txs_by_provider
+
+    @api.model
+    def _paymongo_precreate_checkout_sessions(self, txs_by_provider):
+        """Create the checkout sessions of the given transactions, concurrently per provider.
+
+        :param dict txs_by_provider: The transactions, by provider.
+        :return: None
+        """
+        for provider_sudo, txs_sudo in txs_by_provider.items():
+            # Transactions being paid right now create their own session.
+            txs_sudo = txs_sudo._paymongo_lock('precreate')
+            try:
+                results = provider_sudo._paymongo_send_concurrent_requests([
+                    (
+                        'POST',
+                        'v1/checkout_sessions',
+                        tx_sudo._paymongo_prepare_checkout_session_payload(),
+                    )
+                    for tx_sudo in txs_sudo
+                ])
+            except ValidationError as error:
+                _logger.warning(
+                    "Checkout sessions of provider %s not pre-created: %s", provider_sudo.id, error
+                )
+                continue
+            for tx_sudo, (checkout, error) in zip(txs_sudo, results):
+                if error:
+                    _logger.warning(
+                        "Could not pre-create the checkout session of %s: %s",
+                        tx_sudo.reference, error,
+                    )
+                    continue
+                tx_sudo._paymongo_save_checkout_session(checkout)
@@ -0,0 +1,15 @@
+# payment_paymongo/models/ir_http.py
+from odoo import models
+from odoo.http import request
+
+from odoo.addons.payment_paymongo import metrics
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = 'ir.http'
+
+    @classmethod
+    def _post_dispatch(cls, response):
+        super()._post_dispatch(response)
+        if metrics.is_flush_due():
+            request.env['paymongo.metric'].sudo()._flush()
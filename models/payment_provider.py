@@ -1,7 +1,18 @@
 # payment_paymongo/models/payment_provider.py
-from odoo import api, fields, models
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+
+from odoo import _, api, fields, models, tools
+from odoo.fields import Command
+from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+from odoo.tools.urls import urljoin
 from odoo.addons.payment.logging import get_payment_logger
-from odoo.addons.payment_paymongo import const
+from odoo.addons.payment_paymongo import const, metrics
+from odoo.addons.payment_paymongo.controllers.main import PayMongoController
+from odoo.addons.payment_paymongo.utils import get_config_param, get_http_session
 
 
 _logger = get_payment_logger(__name__)
@@ -23,6 +34,73 @@ class PaymentProvider(models.Model):
         copy=False,
         groups='base.group_system',
     )
+    paymongo_checkout_mode = fields.Selection(
+        string="PayMongo Checkout Mode",
+        help="Hosted: redirect the customer to the PayMongo checkout page.\n"
+             "Direct: create the QR Ph code server-side and show it on this website.",
+        selection=[('hosted', "Hosted Checkout"), ('direct', "Direct QR Ph")],
+        default='hosted',
+        required_if_provider='paymongo',
+    )
+    paymongo_webhook_url = fields.Char(
+        string="PayMongo Webhook URL",
+        help="The URL to register as webhook in the PayMongo dashboard. It names the provider, so "
+             "that notifications are checked against its secret only.",
+        compute='_compute_paymongo_webhook_url',
+    )
+    paymongo_precreate_checkout = fields.Boolean(
+        string="Pre-create Checkout Sessions",
+        help="Create the transaction and checkout session of PHP invoices in the background when "
+             "they are posted, so that their payment link opens the checkout page right away.",
+    )
+
+    # Circuit breaker around outbound API calls, shared by all workers through these columns.
+    paymongo_circuit_state = fields.Selection(
+        string="PayMongo API Circuit",
+        selection=[
+            ('closed', "Closed"),
+            ('open', "Open"),
+            ('half_open', "Half-open"),
+        ],
+        default='closed',
+        readonly=True,
+        copy=False,
+        help="Open when PayMongo is failing: API calls then fail fast until a probe succeeds.",
+    )
+    paymongo_circuit_opened_at = fields.Datetime(
+        string="PayMongo Circuit Opened At", readonly=True, copy=False
+    )
+    paymongo_circuit_window_start = fields.Datetime(readonly=True, copy=False)
+    paymongo_circuit_requests = fields.Integer(readonly=True, copy=False)
+    paymongo_circuit_failures = fields.Integer(
+        string="PayMongo Recent Failures", readonly=True, copy=False
+    )
+
+    def _compute_feature_support_fields(self):
+        super()._compute_feature_support_fields()
+        self.filtered(lambda p: p.code == 'paymongo').update({
+            'support_refund': 'partial',
+        })
+
+    def _compute_paymongo_webhook_url(self):
+        for provider in self:
+            provider.paymongo_webhook_url = provider.id and urljoin(
+                provider.get_base_url(), f'{PayMongoController._webhook_url}/{provider.id}'
+            )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        providers = super().create(vals_list)
+        if self.env.context.get('paymongo_defer_provider_hooks'):
+            return providers  # Run once by `_paymongo_provision`.
+        if any(provider.code == 'paymongo' for provider in providers):
+            self.env.registry.clear_cache()  # Invalidate the cached webhook secrets.
+        return providers
+
+    def unlink(self):
+        if any(provider.code == 'paymongo' for provider in self):
+            self.env.registry.clear_cache()  # Invalidate the cached webhook secrets.
+        return super().unlink()
 
     def _get_supported_currencies(self):
         supported = super()._get_supported_currencies()
@@ -34,7 +112,9 @@ class PaymentProvider(models.Model):
     def _build_request_url(self, endpoint, **kwargs):
         if self.code != 'paymongo':
             return super()._build_request_url(endpoint, **kwargs)
-        return f"https://api.paymongo.com/{endpoint.lstrip('/')}"
+        # The base URL can be pointed at a local stand-in for benchmarks.
+        api_url = get_config_param(self.env, 'api_url', const.API_URL)
+        return f"{api_url.rstrip('/')}/{endpoint.lstrip('/')}"
 
     def _build_request_auth(self, **kwargs):
         """PayMongo uses HTTP Basic auth with the secret key."""
@@ -42,6 +122,336 @@ class PaymentProvider(models.Model):
             return super()._build_request_auth(**kwargs)
         return (self.paymongo_secret_key, '')  # username=secret_key, password blank
 
+    def _send_api_request(
+        self, method, endpoint, *, params=None, data=None, json=None,
+        paymongo_priority='interactive', **kwargs
+    ):
+        """Send the request through the pooled keep-alive session of the worker.
+
+        Same contract as the generic implementation, but TLS connections to PayMongo are reused
+        across requests and transient failures are retried with a jittered backoff. Calls are
+        subject to the circuit breaker and to the rate limit of the secret key.
+
+        :param str paymongo_priority: `interactive` for calls a user is waiting on, `background`
+                                      for jobs; background calls yield to interactive ones.
+        """
+        if self.code != 'paymongo':
+            return super()._send_api_request(
+                method, endpoint, params=params, data=data, json=json, **kwargs
+            )
+
+        self.ensure_one()
+        url = self._build_request_url(endpoint, **kwargs)
+        headers = self._build_request_headers(method, endpoint, json, **kwargs)
+        auth = self._build_request_auth(**kwargs)
+        session, timeout = self._paymongo_get_http_session()
+        self._paymongo_circuit_check()
+        self._paymongo_acquire_rate_token(paymongo_priority)
+        try:
+            response = session.request(
+                method, url, params=params, data=data, json=json, headers=headers, auth=auth,
+                timeout=timeout,
+            )
+        except requests.exceptions.RequestException:
+            self._paymongo_circuit_record(failures=1)
+            _logger.warning("Unable to reach endpoint at %s", url)
+            raise ValidationError(_("Could not establish the connection to the API."))
+
+        if self._paymongo_is_outage_response(response):
+            self._paymongo_circuit_record(failures=1)
+        else:
+            self._paymongo_circuit_record(successes=1)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            error_message = self._parse_response_error(response)
+            _logger.warning(
+                "Invalid API request at %s with data:\n%s\nError: %s", url, json or data,
+                error_message,
+            )
+            raise ValidationError(
+                _("The communication with the API failed. Details: %s", error_message)
+            )
+        return self._parse_response_content(response, **kwargs)
+
+    def _paymongo_get_http_session(self):
+        """Return the pooled HTTP session of the worker and the request timeout.
+
+        :return: The session and the `(connect, read)` timeout.
+        :rtype: tuple
+        """
+        session = get_http_session(
+            get_config_param(self.env, 'http_pool_size', const.HTTP_POOL_SIZE),
+            get_config_param(self.env, 'http_max_retries', const.HTTP_MAX_RETRIES),
+            get_config_param(self.env, 'http_backoff_factor', const.HTTP_BACKOFF_FACTOR),
+        )
+        timeout = (
+            get_config_param(self.env, 'http_connect_timeout', const.HTTP_CONNECT_TIMEOUT),
+            get_config_param(self.env, 'http_read_timeout', const.HTTP_READ_TIMEOUT),
+        )
+        return session, timeout
+
+    def _paymongo_send_concurrent_requests(self, request_args, with_outcome=False):
+        """Send several API requests in parallel through a bounded thread pool.
+
+        Everything that touches the ORM (URL, headers, auth, error parsing) is done in the calling
+        thread; the pool threads only perform the HTTP I/O on the pooled session.
+
+        Requests are background calls with respect to the rate limit.
+
+        With `with_outcome`, the outcome of each request is returned too, for the callers of
+        non-idempotent requests that must tell a rejected request from one that may have been
+        processed:
+
+        - `ok`: PayMongo answered with a success.
+        - `rejected`: PayMongo refused the request, which was not processed.
+        - `unsent`: the request never reached PayMongo (rate limit) or was turned away with a 429.
+        - `unknown`: the connection failed or PayMongo answered with a 5xx; the request may have
+          been processed.
+
+        :param list request_args: The `(method, endpoint, json_payload)` of each request.
+        :param bool with_outcome: Whether to return the outcome of each request.
+        :return: The `(response_content, error_message)` of each request, in the same order, or
+                 their `(response_content, error_message, outcome)` with `with_outcome`.
+        :rtype: list
+        """
+        self.ensure_one()
+        self._paymongo_circuit_check()
+        session, timeout = self._paymongo_get_http_session()
+        auth = self._build_request_auth()
+        prepared = [
+            (
+                method,
+                self._build_request_url(endpoint),
+                self._build_request_headers(method, endpoint, payload),
+                payload,
+            )
+            for method, endpoint, payload in request_args
+        ]
+
+        def send(args):
+            method, url, headers, payload = args
+            try:
+                return session.request(
+                    method, url, json=payload, headers=headers, auth=auth, timeout=timeout
+                )
+            except requests.exceptions.RequestException as error:
+                return error
+
+        # Requests are dispatched as rate-limit tokens are granted; once the limiter gives up, the
+        # remaining requests are not sent and are reported as failed, with the `unsent` outcome.
+        max_workers = get_config_param(self.env, 'api_max_workers', const.API_MAX_WORKERS)
+        futures = []
+        rate_limit_error = None
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for args in prepared:
+                try:
+                    self._paymongo_acquire_rate_token('background')
+                except ValidationError as error:
+                    rate_limit_error = str(error)
+                    break
+                futures.append(executor.submit(send, args))
+        responses = [future.result() for future in futures]
+
+        failures = sum(
+            isinstance(response, Exception) or self._paymongo_is_outage_response(response)
+            for response in responses
+        )
+        self._paymongo_circuit_record(successes=len(responses) - failures, failures=failures)
+
+        results = []
+        for (_method, url, _headers, _payload), response in zip(prepared, responses):
+            if isinstance(response, Exception):
+                _logger.warning("Unable to reach endpoint at %s: %s", url, response)
+                results.append(
+                    (None, _("Could not establish the connection to the API."), 'unknown')
+                )
+            elif response.status_code == 429:
+                results.append((None, self._parse_response_error(response), 'unsent'))
+            elif response.status_code >= 500:
+                results.append((None, self._parse_response_error(response), 'unknown'))
+            elif not response.ok:
+                results.append((None, self._parse_response_error(response), 'rejected'))
+            else:
+                results.append((response.json(), None, 'ok'))
+        results += [(None, rate_limit_error, 'unsent')] * (len(prepared) - len(responses))
+        if not with_outcome:
+            return [(content, error) for content, error, _outcome in results]
+        return results
+
+    def _paymongo_acquire_rate_token(self, priority='interactive'):
+        """Wait for the cluster-wide rate limit of the secret key to allow one more call.
+
+        :param str priority: `interactive` or `background`.
+        :return: None
+        :raise ValidationError: If the rate limit did not allow the call in time.
+        """
+        self.ensure_one()
+        self.env['paymongo.rate.bucket'].sudo()._acquire(
+            self.sudo().paymongo_secret_key, priority=priority
+        )
+
+    # === CIRCUIT BREAKER === #
+
+    @api.model
+    def _paymongo_is_outage_response(self, response):
+        """Return whether the response denotes an unavailable API rather than a bad request."""
+        return response.status_code == 429 or response.status_code >= 500
+
+    def _paymongo_circuit_check(self):
+        """Fail fast while the circuit is open; let a single probe through once it cools down.
+
+        The state is read from the request cursor; the transition to half-open is committed in a
+        separate cursor, and only the worker whose update succeeds sends the probe.
+
+        :return: None
+        :raise ValidationError: If the circuit is open.
+        """
+        self.ensure_one()
+        self.env.cr.execute(SQL(
+            "SELECT paymongo_circuit_state, paymongo_circuit_opened_at"
+            " FROM payment_provider WHERE id = %s",
+            self.id,
+        ))
+        state, opened_at = self.env.cr.fetchone()
+        if state in (None, 'closed'):
+            return
+
+        cooldown = get_config_param(self.env, 'circuit_cooldown', const.CIRCUIT_COOLDOWN)
+        now = fields.Datetime.now()
+        if opened_at and opened_at + timedelta(seconds=cooldown) <= now:
+            # Open and cooled down, or half-open with a probe that never reported back.
+            with self.env.registry.cursor() as cr:
+                cr.execute(SQL(
+                    """
+                    UPDATE payment_provider
+                       SET paymongo_circuit_state = 'half_open', paymongo_circuit_opened_at = %s
+                     WHERE id = %s AND paymongo_circuit_opened_at = %s
+                 RETURNING id
+                    """,
+                    now, self.id, opened_at,
+                ))
+                if cr.fetchone():
+                    self._paymongo_circuit_notify('half_open')
+                    return
+
+        metrics.inc('paymongo_circuit_rejections_total', provider=self.id)
+        raise ValidationError(_(
+            "PayMongo is temporarily unavailable. Please try again in a few minutes."
+        ))
+
+    def _paymongo_circuit_record(self, successes=0, failures=0):
+        """Record the outcome of API calls and open or close the circuit accordingly.
+
+        Successes are not written while the circuit is closed and healthy, so the common path
+        costs no write. The failure rate is computed over the requests of the current window
+        since its first failure.
+
+        The counters are updated with a single atomic `UPDATE` in a separate cursor, and state
+        changes are made with a compare-and-set `UPDATE`, so that only one worker reports each
+        transition. Plain `UPDATE`s take a `FOR NO KEY UPDATE` lock, which does not conflict with
+        the `FOR KEY SHARE` lock the request cursor holds on the provider row once it has inserted
+        a transaction referencing it; `SELECT ... FOR UPDATE` would wait on it forever.
+
+        :param int successes: The number of calls that reached a healthy API.
+        :param int failures: The number of calls that failed with a connection error, 429 or 5xx.
+        :return: None
+        """
+        self.ensure_one()
+        provider_sudo = self.sudo()
+        if not failures and provider_sudo.paymongo_circuit_state == 'closed' \
+                and not provider_sudo.paymongo_circuit_failures:
+            return
+
+        now = fields.Datetime.now()
+        window = get_config_param(self.env, 'circuit_window', const.CIRCUIT_WINDOW)
+        threshold = get_config_param(
+            self.env, 'circuit_failure_threshold', const.CIRCUIT_FAILURE_THRESHOLD
+        )
+        max_rate = get_config_param(self.env, 'circuit_failure_rate', const.CIRCUIT_FAILURE_RATE)
+        new_state = None
+        with self.env.registry.cursor() as cr:
+            cr.execute(SQL(
+                """
+                UPDATE payment_provider
+                   SET paymongo_circuit_window_start = CASE WHEN %(expired)s THEN %(now)s
+                                                            ELSE paymongo_circuit_window_start END,
+                       paymongo_circuit_requests = CASE WHEN %(expired)s THEN 0
+                                                        ELSE COALESCE(paymongo_circuit_requests, 0)
+                                                   END + %(requests)s,
+                       paymongo_circuit_failures = CASE WHEN %(expired)s THEN 0
+                                                        ELSE COALESCE(paymongo_circuit_failures, 0)
+                                                   END + %(failures)s
+                 WHERE id = %(id)s
+             RETURNING COALESCE(paymongo_circuit_state, 'closed'), paymongo_circuit_requests,
+                       paymongo_circuit_failures
+                """,
+                expired=SQL(
+                    "(paymongo_circuit_window_start IS NULL"
+                    " OR paymongo_circuit_window_start <= %s)",
+                    now - timedelta(seconds=window),
+                ),
+                now=now,
+                requests=successes + failures,
+                failures=failures,
+                id=self.id,
+            ))
+            state, requests_count, failures_count = cr.fetchone()
+            if state == 'half_open':
+                new_state = 'open' if failures else 'closed'
+            elif state == 'closed' and failures_count >= threshold \
+                    and failures_count / requests_count >= max_rate:
+                new_state = 'open'
+            # An open circuit only changes state through the cooldown in _paymongo_circuit_check.
+
+            if new_state:
+                reset = new_state == 'closed'
+                cr.execute(SQL(
+                    """
+                    UPDATE payment_provider
+                       SET paymongo_circuit_state = %(new_state)s,
+                           paymongo_circuit_opened_at = CASE WHEN %(opened)s THEN %(now)s
+                                                             ELSE paymongo_circuit_opened_at END,
+                           paymongo_circuit_window_start = CASE WHEN %(reset)s THEN NULL
+                                                                ELSE paymongo_circuit_window_start
+                                                           END,
+                           paymongo_circuit_requests = CASE WHEN %(reset)s THEN 0
+                                                            ELSE paymongo_circuit_requests END,
+                           paymongo_circuit_failures = CASE WHEN %(reset)s THEN 0
+                                                            ELSE paymongo_circuit_failures END
+                     WHERE id = %(id)s
+                       AND COALESCE(paymongo_circuit_state, 'closed') = %(state)s
+                 RETURNING id
+                    """,
+                    new_state=new_state, opened=new_state == 'open', now=now, reset=reset,
+                    id=self.id, state=state,
+                ))
+                if not cr.fetchone():
+                    new_state = None  # Another worker changed the state first.
+        self.invalidate_recordset([
+            'paymongo_circuit_state', 'paymongo_circuit_opened_at', 'paymongo_circuit_failures',
+        ])
+        if new_state:
+            self._paymongo_circuit_notify(new_state)
+
+    def _paymongo_circuit_notify(self, state):
+        """Log and publish a state change of the circuit."""
+        log = _logger.warning if state == 'open' else _logger.info
+        log("PayMongo API circuit of provider %s is now %s.", self.id, state)
+        metrics.inc('paymongo_circuit_transitions_total', provider=self.id, state=state)
+
+    def action_paymongo_reset_circuit(self):
+        """Close the circuit manually, e.g. once PayMongo reports the incident as resolved."""
+        self.sudo().write({
+            'paymongo_circuit_state': 'closed',
+            'paymongo_circuit_opened_at': False,
+            'paymongo_circuit_window_start': False,
+            'paymongo_circuit_requests': 0,
+            'paymongo_circuit_failures': 0,
+        })
+        for provider in self:
+            provider._paymongo_circuit_notify('closed')
+
     def _parse_response_error(self, response):
         if self.code != 'paymongo':
             return super()._parse_response_error(response)
@@ -62,7 +472,14 @@ class PaymentProvider(models.Model):
         return super()._get_default_payment_method_codes()
 
     def _paymongo_ensure_inbound_method_line(self):
-        """Ensure an inbound account.payment.method.line exists for this provider's journal."""
+        """Ensure an inbound account.payment.method.line exists for these providers' journals.
+
+        All providers are handled at once: existing lines are fetched with one search and the
+        missing ones are created with one `create` call.
+        """
+        providers = self.filtered(lambda p: p.code == 'paymongo' and p.journal_id)
+        if not providers:
+            return
         PaymentMethodLine = self.env['account.payment.method.line']
 
         # Detect the provider link field on account.payment.method.line
@@ -73,50 +490,180 @@ class PaymentProvider(models.Model):
                 provider_field = candidate
                 break
 
-        for provider in self.filtered(lambda p: p.code == 'paymongo' and p.journal_id):
-            journal = provider.journal_id.with_company(provider.company_id)
-
-            inbound_lines = journal.inbound_payment_method_line_ids
-
+        inbound_lines = PaymentMethodLine.search_fetch(
+            [('journal_id', 'in', providers.journal_id.ids), ('payment_type', '=', 'inbound')],
+            ['journal_id'] + ([provider_field] if provider_field else []),
+        )
+        if provider_field:
             # If the line model supports a provider link field, check existing mapping
-            if provider_field:
-                existing = inbound_lines.filtered(lambda l: getattr(l, provider_field) == provider)
-                if existing:
-                    continue
-            else:
-                # If no provider field exists at all, we can't auto-link like payment_demo.
-                # In that case, only ensure an inbound line exists (manual), and stop here.
-                if inbound_lines:
-                    continue
-
-            # Get inbound manual payment method (safe)
-            manual_method = self.env.ref('account.account_payment_method_manual_in', raise_if_not_found=False)
-            if not manual_method:
-                manual_method = self.env['account.payment.method'].search([
-                    ('payment_type', '=', 'inbound'),
-                    ('code', '=', 'manual'),
-                ], limit=1)
+            covered = {(line.journal_id.id, line[provider_field].id) for line in inbound_lines}
+            missing = providers.filtered(lambda p: (p.journal_id.id, p.id) not in covered)
+        else:
+            # If no provider field exists at all, we can't auto-link like payment_demo.
+            # In that case, only ensure an inbound line exists (manual), one per journal.
+            covered_journal_ids = set(inbound_lines.journal_id.ids)
+            missing = self.browse()
+            for provider in providers:
+                if provider.journal_id.id not in covered_journal_ids:
+                    covered_journal_ids.add(provider.journal_id.id)
+                    missing |= provider
+        if not missing:
+            return
+
+        # Get inbound manual payment method (safe)
+        manual_method = self.env.ref('account.account_payment_method_manual_in', raise_if_not_found=False)
+        if not manual_method:
+            manual_method = self.env['account.payment.method'].search([
+                ('payment_type', '=', 'inbound'),
+                ('code', '=', 'manual'),
+            ], limit=1)
 
+        vals_list = []
+        for provider in missing:
             vals = {
                 'name': "PayMongo",
-                'journal_id': journal.id,
+                'journal_id': provider.journal_id.id,
                 'payment_method_id': manual_method.id,
                 'payment_type': 'inbound',
             }
             if provider_field:
                 vals[provider_field] = provider.id
-
-            PaymentMethodLine.create(vals)
+            vals_list.append(vals)
+        PaymentMethodLine.create(vals_list)
 
     def write(self, vals):
+        was_paymongo = any(provider.code == 'paymongo' for provider in self)
         res = super().write(vals)
+        if self.env.context.get('paymongo_defer_provider_hooks'):
+            return res  # Run once by `_paymongo_provision`.
         # When provider gets enabled or journal is set, ensure method line exists.
-        if any(k in vals for k in ('state', 'journal_id')):
-            self._paymongo_ensure_inbound_method_line()
-        return res
-
-    def write(self, vals):
-        res = super().write(vals)
         if any(k in vals for k in ('state', 'journal_id')) and self:
             self._paymongo_ensure_inbound_method_line()
+        if any(k in vals for k in ('code', 'state', 'paymongo_webhook_secret')) and (
+            was_paymongo or any(provider.code == 'paymongo' for provider in self)
+        ):
+            self.env.registry.clear_cache()  # Invalidate the cached webhook secrets.
         return res
+
+    @api.model
+    def _paymongo_provision(self, company_credentials):
+        """Create or update the PayMongo providers of many companies in a few queries.
+
+        Existing providers and bank journals are fetched with one search each; missing journals,
+        providers and inbound payment method lines are each created with a single `create` call.
+        Existing providers sharing the same values are updated with a single `write`, and their
+        per-company secrets with a single `UPDATE`. The hooks of `create` and `write` (inbound
+        payment method lines, cache of the webhook secrets) are run once at the end.
+
+        :param list company_credentials: One dict per company with the `company_id`, the
+                                         `paymongo_secret_key` and `paymongo_webhook_secret`, and
+                                         optionally the provider `state` (defaults to `test`).
+        :return: The provisioned providers.
+        :rtype: payment.provider
+        """
+        template = self.env.ref('payment_paymongo.payment_provider_paymongo')
+        company_ids = [values['company_id'] for values in company_credentials]
+        providers_by_company = {}
+        for provider in self.search(
+            [('code', '=', 'paymongo'), ('company_id', 'in', company_ids)], order='id'
+        ):
+            providers_by_company.setdefault(provider.company_id.id, provider)
+
+        # Use the first bank journal of each company, like the payment module does; create one
+        # for the companies that have none.
+        journals_by_company = {}
+        for journal in self.env['account.journal'].search_fetch(
+            [('company_id', 'in', company_ids), ('type', '=', 'bank')],
+            ['company_id'],
+            order='sequence, id',
+        ):
+            journals_by_company.setdefault(journal.company_id.id, journal.id)
+        missing_journal_companies = [
+            company_id for company_id in company_ids if company_id not in journals_by_company
+            and not providers_by_company.get(company_id, self).journal_id
+        ]
+        if missing_journal_companies:
+            journals = self.env['account.journal'].create([{
+                'name': "PayMongo",
+                'code': 'PMGO',
+                'type': 'bank',
+                'company_id': company_id,
+            } for company_id in missing_journal_companies])
+            journals_by_company.update(zip(missing_journal_companies, journals.ids))
+
+        create_vals_list = []
+        providers_by_vals = {}
+        secrets = []  # [(provider id, secret key, webhook secret)]
+        for values in company_credentials:
+            company_id = values['company_id']
+            vals = {'state': values.get('state') or 'test'}
+            provider = providers_by_company.get(company_id)
+            if provider:
+                if not provider.journal_id:
+                    vals['journal_id'] = journals_by_company[company_id]
+                key = tuple(sorted(vals.items()))
+                providers_by_vals[key] = providers_by_vals.get(key, self) | provider
+                secrets.append((
+                    provider.id, values['paymongo_secret_key'], values['paymongo_webhook_secret']
+                ))
+            else:
+                create_vals_list.append({
+                    **vals,
+                    'paymongo_secret_key': values['paymongo_secret_key'],
+                    'paymongo_webhook_secret': values['paymongo_webhook_secret'],
+                    'name': template.name,
+                    'code': 'paymongo',
+                    'company_id': company_id,
+                    'journal_id': journals_by_company[company_id],
+                    'redirect_form_view_id': template.redirect_form_view_id.id,
+                    'payment_method_ids': [Command.set(template.payment_method_ids.ids)],
+                    'image_128': template.image_128,
+                })
+
+        providers = self.with_context(paymongo_defer_provider_hooks=True).create(create_vals_list)
+        for key, existing_providers in providers_by_vals.items():
+            existing_providers.with_context(paymongo_defer_provider_hooks=True).write(dict(key))
+            providers |= existing_providers
+        if secrets:
+            self.env.cr.execute(SQL(
+                """
+                UPDATE payment_provider AS provider
+                   SET paymongo_secret_key = secrets.secret_key,
+                       paymongo_webhook_secret = secrets.webhook_secret,
+                       write_uid = %(uid)s,
+                       write_date = NOW() AT TIME ZONE 'UTC'
+                  FROM (VALUES %(values)s) AS secrets (id, secret_key, webhook_secret)
+                 WHERE provider.id = secrets.id
+                """,
+                uid=self.env.uid,
+                values=SQL(', ').join(SQL('(%s, %s, %s)', *row) for row in secrets),
+            ))
+            self.browse([row[0] for row in secrets]).invalidate_recordset([
+                'paymongo_secret_key', 'paymongo_webhook_secret', 'write_uid', 'write_date'
+            ])
+        providers = self.browse(providers.ids)
+        providers._paymongo_ensure_inbound_method_line()
+        self.env.registry.clear_cache()  # Invalidate the cached webhook secrets.
+        return providers
+
+    @api.model
+    @tools.ormcache('livemode')
+    def _paymongo_get_webhook_secrets(self, livemode):
+        """Return the webhook secrets of the PayMongo providers in the given mode.
+
+        Live events can only be signed by enabled providers and test events by providers in test
+        mode, so the other half is never tried. The result is cached per worker and invalidated
+        whenever a PayMongo provider is created, deleted or has its state or secret written.
+
+        :param bool livemode: Whether to return the secrets of the enabled providers rather than
+                              those of the providers in test mode.
+        :return: The `(provider_id, webhook_secret)` pairs.
+        :rtype: tuple
+        """
+        providers = self.sudo().search([
+            ('code', '=', 'paymongo'), ('state', '=', 'enabled' if livemode else 'test'),
+        ])
+        return tuple(
+            (provider.id, provider.paymongo_webhook_secret)
+            for provider in providers if provider.paymongo_webhook_secret
+        )
@@ -1,42 +1,289 @@
 # payment_paymongo/models/payment_transaction.py
 import re
-from odoo import models, _
+from datetime import timedelta, timezone
+from urllib.parse import urlencode
+
+from psycopg2.errors import SerializationFailure
+
+from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
+from odoo.fields import Domain
+from odoo.tools import SQL, float_round
 from odoo.tools.urls import urljoin
 
 from odoo.addons.payment import utils as payment_utils
 from odoo.addons.payment.logging import get_payment_logger
+from odoo.addons.payment_paymongo import const, metrics
 from odoo.addons.payment_paymongo.controllers.main import PayMongoController
+from odoo.addons.payment_paymongo.utils import PaymongoEvent, get_config_param
 
 _logger = get_payment_logger(__name__)
 
 class PaymentTransaction(models.Model):
     _inherit = 'payment.transaction'
 
+    # Indexed PayMongo identifiers, used to resolve webhooks with a single indexed lookup.
+    paymongo_reference = fields.Char(
+        string="PayMongo Reference", index='btree_not_null', readonly=True, copy=False
+    )
+    paymongo_checkout_session_id = fields.Char(
+        string="PayMongo Checkout Session", index='btree_not_null', readonly=True, copy=False
+    )
+    paymongo_payment_intent_id = fields.Char(
+        string="PayMongo Payment Intent", index='btree_not_null', readonly=True, copy=False
+    )
+    paymongo_payment_id = fields.Char(
+        string="PayMongo Payment", index='btree_not_null', readonly=True, copy=False
+    )
+    paymongo_refund_id = fields.Char(
+        string="PayMongo Refund", index='btree_not_null', readonly=True, copy=False
+    )
+    paymongo_checkout_url = fields.Char(string="PayMongo Checkout URL", readonly=True, copy=False)
+    paymongo_checkout_expires_at = fields.Datetime(
+        string="PayMongo Checkout Expiry", index='btree_not_null', readonly=True, copy=False
+    )
+    paymongo_qr_image = fields.Text(
+        string="PayMongo QR Code", help="The QR Ph image of the direct mode, as a data URI.",
+        readonly=True, copy=False,
+    )
+
     def _get_specific_rendering_values(self, processing_values):
         res = super()._get_specific_rendering_values(processing_values)
         if self.provider_code != 'paymongo':
             return res
 
-        payload = self._paymongo_prepare_checkout_session_payload()
+        if self.provider_id.paymongo_checkout_mode == 'direct':
+            if not self._paymongo_get_qr_image():
+                return {}
+            # The QR code is shown by this website: no page of PayMongo is loaded at all.
+            return {
+                'api_url': urljoin(self.provider_id.get_base_url(), PayMongoController._qr_url),
+                'url_params': self._paymongo_get_qr_page_params(),
+            }
+
+        checkout_url = self._paymongo_get_checkout_url()
+        if not checkout_url:
+            return {}
+
+        return {
+            'api_url': checkout_url,  # Odoo redirect template expects api_url
+        }
+
+    def _paymongo_get_payment_url(self):
+        """Return the URL where the customer pays the transaction, in either checkout mode.
+
+        :return: The checkout URL, or the URL of the QR page in direct mode; None if the session or
+                 the QR code could not be created.
+        :rtype: str
+        """
+        self.ensure_one()
+        if self.provider_id.paymongo_checkout_mode == 'direct':
+            if not self._paymongo_get_qr_image():
+                return None
+            return urljoin(
+                self.provider_id.get_base_url(),
+                f'{PayMongoController._qr_url}?{urlencode(self._paymongo_get_qr_page_params())}',
+            )
+        return self._paymongo_get_checkout_url()
+
+    def _paymongo_get_qr_page_params(self):
+        self.ensure_one()
+        return {
+            'tx_ref': self.reference,
+            'access_token': payment_utils.generate_access_token(self.reference, self.amount),
+        }
+
+    def _paymongo_get_checkout_url(self):
+        """Return the checkout URL of the transaction, creating a checkout session if needed.
+
+        Refreshes, back-button navigation and double clicks re-render the redirect form; the stored
+        session is reused as long as it has not expired. Concurrent renders are serialized on the
+        transaction row so that only one session is ever created.
+
+        :return: The checkout URL, or None if the session could not be created.
+        :rtype: str
+        """
+        self.ensure_one()
+        if self._paymongo_has_valid_checkout_session():
+            return self.paymongo_checkout_url
+
+        self.env.cr.execute(SQL(
+            "SELECT id FROM payment_transaction WHERE id = %s FOR UPDATE", self.id
+        ))
+        self.invalidate_recordset([
+            'provider_reference', 'paymongo_checkout_url', 'paymongo_checkout_expires_at',
+        ])
+        if self._paymongo_has_valid_checkout_session():
+            return self.paymongo_checkout_url
+
+        labels = {'provider': self.provider_id.id}
+        with metrics.timer('checkout_payload', **labels):
+            payload = self._paymongo_prepare_checkout_session_payload()
         try:
-            checkout = self._send_api_request('POST', 'v1/checkout_sessions', json=payload)
+            with metrics.timer('checkout_api', **labels):
+                checkout = self._send_api_request('POST', 'v1/checkout_sessions', json=payload)
         except ValidationError as e:
             self._set_error(str(e))
-            return {}
+            return None
+        return self._paymongo_save_checkout_session(checkout)
+
+    def _paymongo_save_checkout_session(self, checkout):
+        """Store a checkout session created for the transaction.
 
+        :param dict checkout: The `POST v1/checkout_sessions` response.
+        :return: The checkout URL, or None if the response does not carry one.
+        :rtype: str
+        """
+        self.ensure_one()
         # Store PayMongo checkout session id for traceability
         checkout_id = checkout.get('data', {}).get('id')
         if checkout_id:
             self.provider_reference = checkout_id
 
-        checkout_url = checkout.get('data', {}).get('attributes', {}).get('checkout_url')
+        checkout_attrs = checkout.get('data', {}).get('attributes', {}) or {}
+        checkout_url = checkout_attrs.get('checkout_url')
         if not checkout_url:
             self._set_error("PayMongo did not return a checkout_url.")
-            return {}
+            return None
+
+        ttl = get_config_param(self.env, 'checkout_session_ttl', const.CHECKOUT_SESSION_TTL)
+        self.write({
+            'paymongo_checkout_session_id': checkout_id,
+            'paymongo_payment_intent_id': (
+                (checkout_attrs.get('payment_intent') or {}).get('id')
+                or self.paymongo_payment_intent_id
+            ),
+            'paymongo_checkout_url': checkout_url,
+            'paymongo_checkout_expires_at': fields.Datetime.now() + timedelta(minutes=ttl),
+        })
+        return checkout_url
+
+    def _paymongo_has_valid_checkout_session(self):
+        """Return whether the stored checkout session can still be used to pay.
+
+        :return: Whether the session is reusable.
+        :rtype: bool
+        """
+        self.ensure_one()
+        return bool(
+            self.state in ('draft', 'pending')
+            and self.paymongo_checkout_url
+            and self.paymongo_checkout_expires_at
+            and self.paymongo_checkout_expires_at > fields.Datetime.now()
+        )
+
+    def _paymongo_get_qr_image(self):
+        """Return the QR Ph image of the transaction, creating a payment intent if needed.
+
+        In direct mode, a payment intent is created and a QR Ph payment method is attached to it
+        server-side; PayMongo answers with the QR code to scan. Like checkout sessions, the stored
+        code is reused until it expires and concurrent renders are serialized on the transaction
+        row.
+
+        :return: The QR code as a data URI, or None if it could not be created.
+        :rtype: str
+        """
+        self.ensure_one()
+        if self._paymongo_has_valid_qr_image():
+            return self.paymongo_qr_image
+
+        self.env.cr.execute(SQL(
+            "SELECT id FROM payment_transaction WHERE id = %s FOR UPDATE", self.id
+        ))
+        self.invalidate_recordset(['paymongo_qr_image', 'paymongo_checkout_expires_at'])
+        if self._paymongo_has_valid_qr_image():
+            return self.paymongo_qr_image
+
+        try:
+            with metrics.timer('qr_api', provider=self.provider_id.id):
+                intent = self._send_api_request(
+                    'POST', 'v1/payment_intents',
+                    json=self._paymongo_prepare_payment_intent_payload(),
+                )
+                intent_id = (intent.get('data') or {}).get('id')
+                payment_method = self._send_api_request(
+                    'POST', 'v1/payment_methods',
+                    json=self._paymongo_prepare_payment_method_payload(),
+                )
+                attached = self._send_api_request(
+                    'POST', f'v1/payment_intents/{intent_id}/attach',
+                    json={'data': {'attributes': {
+                        'payment_method': (payment_method.get('data') or {}).get('id'),
+                    }}},
+                )
+        except ValidationError as e:
+            self._set_error(str(e))
+            return None
 
+        next_action = ((attached.get('data') or {}).get('attributes') or {}).get('next_action')
+        qr_image = ((next_action or {}).get('code') or {}).get('image_url')
+        if not qr_image:
+            self._set_error("PayMongo did not return a QR code.")
+            return None
+
+        ttl = min(
+            get_config_param(self.env, 'checkout_session_ttl', const.CHECKOUT_SESSION_TTL),
+            const.QRPH_CODE_TTL,
+        )
+        self.write({
+            'provider_reference': intent_id,
+            'paymongo_payment_intent_id': intent_id,
+            'paymongo_qr_image': qr_image,
+            'paymongo_checkout_expires_at': fields.Datetime.now() + timedelta(minutes=ttl),
+        })
+        return qr_image
+
+    def _paymongo_has_valid_qr_image(self):
+        """Return whether the stored QR code can still be used to pay.
+
+        :return: Whether the QR code is reusable.
+        :rtype: bool
+        """
+        self.ensure_one()
+        return bool(
+            self.state in ('draft', 'pending')
+            and self.paymongo_qr_image
+            and self.paymongo_checkout_expires_at
+            and self.paymongo_checkout_expires_at > fields.Datetime.now()
+        )
+
+    def _paymongo_prepare_payment_intent_payload(self):
+        self.ensure_one()
+        currency = self.currency_id
+        if currency.name != 'PHP':
+            raise ValidationError(_("PayMongo Checkout (QRPH) currently supports PHP only."))
+        san_ref = self._paymongo_sanitize_reference(self.reference)
+        self.paymongo_reference = san_ref
         return {
-            'api_url': checkout_url,  # Odoo redirect template expects api_url
+            "data": {
+                "attributes": {
+                    "amount": payment_utils.to_minor_currency_units(self.amount, currency),
+                    "currency": currency.name,
+                    "payment_method_allowed": ["qrph"],
+                    "description": self.reference,
+                    "metadata": {
+                        "odoo_tx_ref": self.reference,
+                        "paymongo_ref": san_ref,
+                        "odoo_partner_id": str(self.partner_id.id),
+                    },
+                }
+            }
+        }
+
+    def _paymongo_prepare_payment_method_payload(self):
+        self.ensure_one()
+        billing = {
+            "name": self.partner_name or "",
+            "email": self.partner_email or None,
+            "phone": self.partner_phone or self.partner_id.phone or None,
+        }
+        return {
+            "data": {
+                "attributes": {
+                    "type": "qrph",
+                    "billing": {key: value for key, value in billing.items() if value},
+                }
+            }
         }
 
     def _paymongo_prepare_checkout_session_payload(self):
@@ -50,11 +297,17 @@ class PaymentTransaction(models.Model):
         success_url = f"{return_url}?tx_ref={self.reference}&access_token={access_token}&result=success"
         cancel_url = f"{return_url}?tx_ref={self.reference}&access_token={access_token}&result=cancel"
 
-        line_items = self._paymongo_build_line_items()
+        with metrics.timer('line_items', provider=self.provider_id.id):
+            line_items = self._paymongo_build_line_items()
         san_ref = self._paymongo_sanitize_reference(self.reference)
+        self.paymongo_reference = san_ref
 
         email = self.partner_email or ""
         send_email_receipt = bool(email)
+        # The session expires on PayMongo's side when the stored one stops being reused, see
+        # `_paymongo_save_checkout_session`.
+        ttl = get_config_param(self.env, 'checkout_session_ttl', const.CHECKOUT_SESSION_TTL)
+        expires_at = fields.Datetime.now() + timedelta(minutes=ttl)
 
         payload = {
             "data": {
@@ -63,6 +316,7 @@ class PaymentTransaction(models.Model):
                     "line_items": line_items,
                     "reference_number": san_ref,
                     "description": self.reference,
+                    "expires_at": int(expires_at.replace(tzinfo=timezone.utc).timestamp()),
 
                     "metadata": {
                         "odoo_tx_ref": self.reference,
@@ -110,115 +364,674 @@ class PaymentTransaction(models.Model):
         return payload
 
     def _paymongo_build_line_items(self):
-        """Build detailed items from invoices or sale orders."""
+        """Build detailed items from invoices or sale orders.
+
+        All lines of all documents are fetched in one query, with their product and account names
+        prefetched in batch. Items are built from the tax-included line totals. Transactions paying
+        several invoices get one item per invoice instead. When the number of items exceeds the
+        configured limit, they are compacted (see `_paymongo_compact_line_items` and
+        `_paymongo_compact_invoice_items`).
+
+        PayMongo charges the sum of the items, so when it differs from the transaction amount
+        (partial payments, down payments, global tax rounding), a single item of the transaction
+        amount is used instead.
+        """
         self.ensure_one()
         currency = self.currency_id
         if currency.name != 'PHP':
             raise ValidationError(_("PayMongo Checkout (QRPH) currently supports PHP only."))
 
-        items = []
+        if len(self.invoice_ids) > 1:
+            # Consolidated payment: one item per invoice, for its amount due, so that the session
+            # total matches the transaction amount even when some invoices are partially paid.
+            invoices = self.invoice_ids
+            items = [{
+                "name": invoice.name[:255],
+                "quantity": 1,
+                "amount": payment_utils.to_minor_currency_units(invoice.amount_residual, currency),
+                "currency": "PHP",
+                "description": (invoice.ref or invoice.invoice_origin or invoice.name)[:255],
+            } for invoice in invoices]
+            items = self._paymongo_compact_invoice_items(items)
+            return self._paymongo_check_line_items_total(items)
 
-        # Prefer invoices if available
+        # Prefer invoices if available, else fallback to sale orders
         if self.invoice_ids:
-            for inv in self.invoice_ids:
-                for line in inv.invoice_line_ids.filtered(lambda l: not l.display_type):
-                    qty = line.quantity or 1.0
-                    # PayMongo requires integer quantity; if fractional, flatten into qty=1
-                    if float(qty).is_integer():
-                        quantity = int(qty)
-                        unit_total = line.price_unit * (1 - (line.discount or 0.0) / 100.0)
-                        amount_minor = payment_utils.to_minor_currency_units(unit_total, currency)
-                    else:
-                        quantity = 1
-                        amount_minor = payment_utils.to_minor_currency_units(line.price_subtotal, currency)
-
-                    items.append({
-                        "name": (line.name or line.product_id.display_name or "Item")[:255],
-                        "quantity": max(quantity, 1),
-                        "amount": max(amount_minor, 0),
-                        "currency": "PHP",
-                        "description": (line.product_id.display_name or line.name or "")[:255],
-                        # "images": ["https://..."]  # optional; PayMongo allows 1 URL :contentReference[oaicite:12]{index=12}
-                    })
-
-        # Else, fallback to sale orders
-        elif self.sale_order_ids:
-            for so in self.sale_order_ids:
-                for line in so.order_line.filtered(lambda l: not l.display_type):
-                    qty = line.product_uom_qty or 1.0
-                    if float(qty).is_integer():
-                        quantity = int(qty)
-                        unit_total = line.price_unit * (1 - (line.discount or 0.0) / 100.0)
-                        amount_minor = payment_utils.to_minor_currency_units(unit_total, currency)
-                    else:
-                        quantity = 1
-                        amount_minor = payment_utils.to_minor_currency_units(line.price_subtotal, currency)
-
-                    items.append({
-                        "name": (line.name or line.product_id.display_name or "Item")[:255],
-                        "quantity": max(quantity, 1),
-                        "amount": max(amount_minor, 0),
-                        "currency": "PHP",
-                        "description": (line.product_id.display_name or line.name or "")[:255],
-                    })
+            lines = self.env['account.move.line'].search_fetch(
+                [('move_id', 'in', self.invoice_ids.ids), ('display_type', '=', 'product')],
+                ['name', 'product_id', 'account_id', 'quantity', 'price_total'],
+                order='move_id, sequence, id',
+            )
+            quantities = lines.mapped('quantity')
+            group_records = lines.mapped('account_id')
+        elif 'sale_order_ids' in self._fields and self.sale_order_ids:
+            lines = self.env['sale.order.line'].search_fetch(
+                [('order_id', 'in', self.sale_order_ids.ids), ('display_type', '=', False)],
+                ['name', 'product_id', 'product_uom_qty', 'price_total'],
+                order='order_id, sequence, id',
+            )
+            quantities = lines.mapped('product_uom_qty')
+            group_records = None
+        else:
+            lines = self.env['account.move.line']
+            quantities = []
+            group_records = None
 
-        # Absolute fallback: single line item = transaction total
-        if not items:
-            items = [{
-                "name": "eLGU Payment",
-                "quantity": 1,
-                "amount": payment_utils.to_minor_currency_units(self.amount, currency),
+        # Batch-compute the display names of all products (and accounts) at once.
+        lines.product_id.mapped('display_name')
+        if group_records is not None:
+            group_records.mapped('display_name')
+
+        # Convert all amounts to minor units in one pass, with the factor computed once.
+        factor = 10 ** currency.decimal_places
+        items = []
+        for line, qty in zip(lines, quantities):
+            total_minor = int(float_round(line.price_total * factor, precision_digits=0))
+            # PayMongo requires an integer quantity and unit amount; otherwise flatten to qty=1 so
+            # that the item total stays exact.
+            if qty > 0 and float(qty).is_integer() and total_minor % int(qty) == 0:
+                quantity, amount = int(qty), total_minor // int(qty)
+            else:
+                quantity, amount = 1, total_minor
+            product_name = line.product_id.display_name
+            items.append({
+                "name": (line.name or product_name or "Item")[:255],
+                "quantity": quantity,
+                "amount": amount,
                 "currency": "PHP",
-                "description": self.reference,
-            }]
+                "description": (product_name or line.name or "")[:255],
+                # "images": ["https://..."]  # optional; PayMongo allows 1 URL :contentReference[oaicite:12]{index=12}
+            })
+
+        items = self._paymongo_compact_line_items(items, lines)
+        return self._paymongo_check_line_items_total(items)
+
+    def _paymongo_check_line_items_total(self, items):
+        """Return the items if they add up to the transaction amount, else a single total item.
+
+        Items with a negative amount (e.g. discount lines) are not accepted by PayMongo and also
+        trigger the fallback.
+
+        :param list items: The line items.
+        :return: The items to send.
+        :rtype: list
+        """
+        self.ensure_one()
+        amount_minor = payment_utils.to_minor_currency_units(self.amount, self.currency_id)
+        if items and all(item['amount'] >= 0 for item in items) and sum(
+            item['quantity'] * item['amount'] for item in items
+        ) == amount_minor:
+            return items
+        if items:
+            _logger.info(
+                "PayMongo line items of %s do not add up to its amount; sending a single item.",
+                self.reference,
+            )
+        # Absolute fallback: single line item = transaction total
+        return [{
+            "name": "eLGU Payment",
+            "quantity": 1,
+            "amount": amount_minor,
+            "currency": "PHP",
+            "description": self.reference,
+        }]
+
+    def _paymongo_compact_invoice_items(self, items):
+        """Fold the smallest invoice items into one when there are more than PayMongo accepts.
+
+        Invoices have no product or account to group by: the largest amounts due keep their own
+        item, in their original order, and the others are summed into a single item. The total
+        amount is preserved.
+
+        :param list items: The line items, one per invoice.
+        :return: The compacted line items.
+        :rtype: list
+        """
+        limit = get_config_param(self.env, 'line_item_limit', const.LINE_ITEM_LIMIT)
+        if len(items) <= limit:
+            return items
+
+        largest = set(sorted(
+            range(len(items)), key=lambda index: items[index]['amount'], reverse=True
+        )[:limit - 1])
+        rest = [item for index, item in enumerate(items) if index not in largest]
+        return [item for index, item in enumerate(items) if index in largest] + [{
+            "name": _("Other invoices"),
+            "quantity": 1,
+            "amount": sum(item['amount'] for item in rest),
+            "currency": "PHP",
+            "description": _("%s invoice(s)", len(rest)),
+        }]
 
-        return items
+    def _paymongo_compact_line_items(self, items, lines):
+        """Group line items when there are more than PayMongo accepts in a checkout session.
+
+        Depending on the `payment_paymongo.line_item_compaction` parameter, items are grouped by
+        product (`product`), by income account (`account`, invoices only) or left as is (`none`).
+        If there are still too many groups, the smallest ones are folded into a single item. The
+        total amount is always preserved.
+
+        :param list items: The line items, in the same order as `lines`.
+        :param recordset lines: The source lines of the items.
+        :return: The compacted line items.
+        :rtype: list
+        """
+        limit = get_config_param(self.env, 'line_item_limit', const.LINE_ITEM_LIMIT)
+        mode = get_config_param(self.env, 'line_item_compaction', const.LINE_ITEM_COMPACTION)
+        if len(items) <= limit or mode not in ('product', 'account'):
+            return items
+
+        groups = {}  # {key: [label, total_minor, count]}
+        for item, line in zip(items, lines):
+            if mode == 'account' and 'account_id' in line._fields and line.account_id:
+                key, label = ('account', line.account_id.id), line.account_id.display_name
+            elif 'product_id' in line._fields and line.product_id:
+                key, label = ('product', line.product_id.id), line.product_id.display_name
+            else:
+                key, label = ('name', item['name']), item['name']
+            group = groups.setdefault(key, [label, 0, 0])
+            group[1] += item['quantity'] * item['amount']
+            group[2] += 1
+
+        grouped = sorted(groups.values(), key=lambda group: group[1], reverse=True)
+        if len(grouped) > limit:
+            rest = grouped[limit - 1:]
+            grouped = grouped[:limit - 1] + [[
+                _("Other items"), sum(group[1] for group in rest), sum(group[2] for group in rest),
+            ]]
+
+        return [{
+            "name": (label or "Item")[:255],
+            "quantity": 1,
+            "amount": total_minor,
+            "currency": "PHP",
+            "description": _("%s item(s)", count),
+        } for label, total_minor, count in grouped]
 
     @classmethod
     def _extract_reference(cls, provider_code, payment_data):
         if provider_code != 'paymongo':
             return super()._extract_reference(provider_code, payment_data)
 
-        event_attrs = payment_data.get('data', {}).get('attributes', {}) or {}
-        resource = event_attrs.get('data') or {}
-        resource_attrs = resource.get('attributes', {}) or {}
+        event = PaymongoEvent.parse(payment_data)
+        # The `reference_number` is sanitized; it might NOT match Odoo tx.reference, see
+        # _search_by_reference.
+        return event.reference or event.paymongo_reference or event.description or None
 
-        metadata = resource_attrs.get('metadata', {}) or {}
-        reference = metadata.get('odoo_tx_ref')
-        if reference:
-            return reference
+    def _search_by_reference(self, provider_code, payment_data):
+        """Resolve the transaction with indexed lookups on the known PayMongo identifiers.
 
-        reference = resource_attrs.get('reference_number')
-        if reference:
-            # This is sanitized; it might NOT match Odoo tx.reference
-            # If you decide to store san_ref in provider_reference instead, adjust accordingly.
-            return reference
+        The Odoo reference from the metadata and the checkout session, payment intent, payment and
+        refund ids are matched at once, so events that do not carry the Odoo reference are still
+        found; when several transactions match, the identifiers are trusted in that order. The
+        sanitized `reference_number` is not unique and is only used when nothing else matches.
+        """
+        if provider_code != 'paymongo':
+            return super()._search_by_reference(provider_code, payment_data)
+
+        identifiers = {
+            field_name: value
+            for field_name, value in self._paymongo_extract_identifiers(payment_data).items()
+            if value
+        }
+        sanitized_reference = identifiers.pop('paymongo_reference', None)
+        if not identifiers and not sanitized_reference:
+            _logger.warning("Received PayMongo data with no identifier.")
+            return self
 
-        reference = resource_attrs.get('description')
-        if reference:
-            return reference
+        tx = self.browse()
+        if identifiers:
+            txs = self.search(Domain.OR(
+                [(field_name, '=', value)] for field_name, value in identifiers.items()
+            )).filtered(lambda t: t.provider_code == 'paymongo')
+            for field_name, value in identifiers.items():  # In order of precedence.
+                tx = txs.filtered(lambda t: t[field_name] == value)[:1]
+                if tx:
+                    break
+        if not tx and sanitized_reference:
+            txs = self.search(
+                [('paymongo_reference', '=', sanitized_reference)], limit=2
+            ).filtered(lambda t: t.provider_code == 'paymongo')
+            if len(txs) > 1:
+                _logger.warning(
+                    "Several transactions match PayMongo reference %s; none was picked.",
+                    sanitized_reference,
+                )
+            else:
+                tx = txs
+        if not tx:
+            _logger.warning("No transaction found matching PayMongo data.")
+        return tx
 
-        return None
+    @api.model
+    def _paymongo_extract_identifiers(self, payment_data):
+        """Extract the transaction identifiers carried by a PayMongo event.
+
+        :param dict payment_data: The event envelope.
+        :return: The identifier values, keyed by the transaction field that stores them.
+        :rtype: dict
+        """
+        event = PaymongoEvent.parse(payment_data)
+        if event.refund_id:
+            # Refund events also carry the payment id, which identifies the refunded transaction.
+            return {'reference': event.reference, 'paymongo_refund_id': event.refund_id}
+        return {
+            'reference': event.reference,
+            'paymongo_reference': event.paymongo_reference,
+            'paymongo_checkout_session_id': event.session_id,
+            'paymongo_payment_intent_id': event.payment_intent_id,
+            'paymongo_payment_id': event.payment_id,
+        }
+
+    def _paymongo_save_identifiers(self, payment_data):
+        """Keep the PayMongo identifiers of an event indexed for later lookups (refunds, payouts).
+
+        Identifiers already set on the transaction are left untouched.
+
+        :param dict payment_data: The event envelope.
+        :return: None
+        """
+        identifiers = self._paymongo_extract_identifiers(payment_data)
+        self.write({
+            field_name: identifiers[field_name]
+            for field_name in ('paymongo_payment_intent_id', 'paymongo_payment_id')
+            if identifiers.get(field_name) and not self[field_name]
+        })
 
     def _apply_updates(self, payment_data):
         if self.provider_code != 'paymongo':
             return super()._apply_updates(payment_data)
 
-        event_attrs = (payment_data.get('data', {}) or {}).get('attributes', {}) or {}
-        event_type = event_attrs.get('type')
-        session = event_attrs.get('data') or {}
+        event = PaymongoEvent.parse(payment_data)
+        event_type = event.event_type
+
+        if event.refund_id:
+            self.paymongo_refund_id = event.refund_id
+            self.provider_reference = event.refund_id
+            self._paymongo_apply_refund_status(event.status)
+            return
 
         # Save checkout session id
-        self.provider_reference = session.get('id') or self.provider_reference
+        self.provider_reference = event.resource_id or self.provider_reference
 
-        if event_type == "checkout_session.payment.paid":
+        self._paymongo_save_identifiers(event)
+
+        if event_type in ("checkout_session.payment.paid", "payment.paid"):
             self._set_done()
         elif event_type in ("payment.failed", "checkout_session.payment.failed"):
             self._set_error(_("PayMongo reported a failed payment. Please try again."))
+        elif event_type == "checkout_session.expired":
+            self._set_canceled(_("The PayMongo checkout session expired."))
+        elif event_type == "payment.refunded":
+            # The refunds of the payment are listed in the event: confirm their transactions.
+            refund_txs = self.child_transaction_ids.filtered(
+                lambda tx: tx.paymongo_refund_id in event.refund_statuses
+            )
+            for refund_tx in refund_txs:
+                refund_tx._paymongo_apply_refund_status(
+                    event.refund_statuses[refund_tx.paymongo_refund_id]
+                )
         else:
             if self.state == "draft":
                 self._set_pending()
 
+    def _send_refund_request(self):
+        if self.provider_code != 'paymongo':
+            return super()._send_refund_request()
+
+        response = self.provider_id._send_api_request(
+            'POST', 'v1/refunds', json=self._paymongo_prepare_refund_payload()
+        )
+        self._paymongo_apply_refund_response(response)
+
+    def _paymongo_prepare_refund_payload(self, reason='requested_by_customer'):
+        """Prepare the `POST v1/refunds` payload of this refund transaction.
+
+        :param str reason: The PayMongo refund reason, see `paymongo.refund.batch.reason`.
+        :return: The request payload.
+        :rtype: dict
+        """
+        self.ensure_one()
+        source_tx = self.source_transaction_id
+        if not source_tx.paymongo_payment_id:
+            raise ValidationError(_(
+                "The PayMongo payment of transaction %s is unknown; it cannot be refunded.",
+                source_tx.reference,
+            ))
+        return {
+            "data": {
+                "attributes": {
+                    "amount": payment_utils.to_minor_currency_units(
+                        -self.amount, self.currency_id
+                    ),
+                    "payment_id": source_tx.paymongo_payment_id,
+                    "reason": reason,
+                    "notes": self.reference,
+                    "metadata": {"odoo_tx_ref": self.reference},
+                }
+            }
+        }
+
+    def _paymongo_apply_refund_response(self, response):
+        """Save the refund created by PayMongo and update the state of this refund transaction.
+
+        :param dict response: The `POST v1/refunds` response.
+        :return: None
+        """
+        self.ensure_one()
+        refund = response.get('data') or {}
+        self.write({
+            'paymongo_refund_id': refund.get('id'),
+            'provider_reference': refund.get('id'),
+        })
+        self._paymongo_apply_refund_status((refund.get('attributes') or {}).get('status'))
+
+    def _paymongo_apply_refund_status(self, status):
+        """Update the state of this refund transaction from the status of its PayMongo refund.
+
+        :param str status: The refund status: `pending`, `processing`, `succeeded` or `failed`.
+        :return: None
+        """
+        if status == 'succeeded':
+            self._set_done()
+        elif status == 'failed':
+            self._set_error(_("PayMongo could not process the refund."))
+        elif self.state == 'draft':
+            self._set_pending()
+
+    @api.model
+    def _cron_paymongo_reconcile_pending(self, batch_size=None, auto_commit=True):
+        """Poll PayMongo for stale draft/pending transactions whose webhook was missed.
+
+        Candidates are walked in id order from a cursor kept in the
+        `payment_paymongo.reconcile_cursor` system parameter, so that each run resumes where the
+        previous one stopped instead of polling the same transactions again; the cursor wraps
+        around once the end of the candidates is reached. The cursor is deliberately keyed on the
+        id rather than on `write_date` or `last_state_change`: those change while a transaction
+        waits (locks, saved identifiers, state updates of other workers), which would move it
+        behind the cursor, skipped until the next lap, or ahead of it, polled twice in one lap. The
+        id never changes, so each candidate is polled exactly once per lap, and new transactions,
+        having the highest ids, join the current lap. The checkout sessions of a batch are
+        fetched concurrently, and their results go through `_process` like a webhook would.
+        Transactions of the direct mode have no checkout session; their payment intent is polled
+        instead.
+
+        :param int batch_size: The number of transactions polled per run.
+        :param bool auto_commit: Whether to commit once the batch is processed.
+        :return: None
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        cursor = int(ICP.get_param('payment_paymongo.reconcile_cursor') or 0)
+        batch_size = batch_size or get_config_param(
+            self.env, 'reconcile_batch_size', const.RECONCILE_BATCH_SIZE
+        )
+        min_age = get_config_param(self.env, 'reconcile_min_age', const.RECONCILE_MIN_AGE)
+        max_age = get_config_param(self.env, 'reconcile_max_age', const.RECONCILE_MAX_AGE)
+        now = fields.Datetime.now()
+        txs_sudo = self.sudo().search([
+            ('provider_id.code', '=', 'paymongo'),
+            ('state', 'in', ('draft', 'pending')),
+            '|',
+            ('paymongo_checkout_session_id', '!=', False),
+            ('paymongo_payment_intent_id', '!=', False),
+            ('last_state_change', '<', now - timedelta(minutes=min_age)),
+            ('create_date', '>', now - timedelta(hours=max_age)),
+            ('id', '>', cursor),
+        ], order='id', limit=batch_size)
+
+        for provider_sudo, provider_txs_sudo in txs_sudo.grouped('provider_id').items():
+            try:
+                results = provider_sudo._paymongo_send_concurrent_requests([
+                    ('GET', f'v1/checkout_sessions/{tx.paymongo_checkout_session_id}', None)
+                    if tx.paymongo_checkout_session_id
+                    else ('GET', f'v1/payment_intents/{tx.paymongo_payment_intent_id}', None)
+                    for tx in provider_txs_sudo
+                ])
+            except ValidationError as error:  # The circuit is open.
+                _logger.warning(
+                    "Skipped polling PayMongo for provider %s: %s", provider_sudo.id, error
+                )
+                continue
+            for tx_sudo, (checkout, error) in zip(provider_txs_sudo, results):
+                if error:
+                    _logger.warning(
+                        "Could not poll the PayMongo checkout session of %s: %s",
+                        tx_sudo.reference, error,
+                    )
+                    continue
+                tx_sudo._paymongo_apply_checkout_session(checkout)
+
+        next_cursor = txs_sudo[-1].id if len(txs_sudo) == batch_size else 0
+        ICP.set_param('payment_paymongo.reconcile_cursor', next_cursor)
+        if auto_commit:
+            self.env.cr.commit()
+
+    def _paymongo_apply_checkout_session(self, checkout):
+        """Process a polled checkout session as if its webhook had been received.
+
+        Only final outcomes (paid or expired) are applied; sessions still awaiting payment are
+        left untouched. Payment intents of the direct mode are applied as a `payment.paid` event
+        once they have succeeded.
+
+        :param dict checkout: The `GET v1/checkout_sessions/<id>` (or, in direct mode,
+                              `GET v1/payment_intents/<id>`) response.
+        :return: Whether the transaction was updated.
+        :rtype: bool
+        """
+        self.ensure_one()
+        session = checkout.get('data') or {}
+        session_attrs = session.get('attributes') or {}
+        payments = session_attrs.get('payments') or []
+        if (session.get('id') or '').startswith('pi_'):
+            if session_attrs.get('status') != 'succeeded' or not payments:
+                return False
+            # The resource of `payment.paid` events is the payment itself.
+            event_type, session = 'payment.paid', payments[-1]
+        elif any((pay.get('attributes') or {}).get('status') == 'paid' for pay in payments):
+            event_type = 'checkout_session.payment.paid'
+        elif session_attrs.get('status') == 'expired':
+            event_type = 'checkout_session.expired'
+        else:
+            return False
+
+        payment_data = PaymongoEvent.parse({'data': {'id': None, 'attributes': {
+            'type': event_type,
+            'livemode': session_attrs.get('livemode'),
+            'data': session,
+        }}})
+        if not self._paymongo_lock('reconcile'):
+            return False  # A webhook of this transaction is being processed.
+        try:
+            with self.env.cr.savepoint():
+                self._process('paymongo', payment_data)
+        except Exception as error:  # noqa: BLE001
+            _logger.warning("Could not apply the PayMongo session of %s: %s", self.reference, error)
+            return False
+        return True
+
+    def _paymongo_lock(self, source):
+        """Lock these transactions until the end of the database transaction, skipping busy ones.
+
+        Transactions locked by another worker (a webhook, the reconciliation or a checkout creating
+        its session) are left out instead of waited for, and counted in the
+        `paymongo_transaction_lock_contention_total` metric. So are those changed since the
+        snapshot of the current database transaction, which cannot be locked without a
+        serialization failure.
+
+        :param str source: The caller, used as metric label.
+        :return: The locked transactions.
+        :rtype: payment.transaction
+        """
+        if not self:
+            return self
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute(SQL(
+                    "SELECT id FROM payment_transaction WHERE id IN %s FOR UPDATE SKIP LOCKED",
+                    tuple(self.ids),
+                ))
+                locked = self.browse([row[0] for row in self.env.cr.fetchall()])
+        except SerializationFailure:
+            locked = self.browse()
+        if busy_count := len(self) - len(locked):
+            metrics.inc('paymongo_transaction_lock_contention_total', busy_count, source=source)
+        locked.invalidate_recordset()
+        return locked
+
+    @api.model
+    def _cron_paymongo_expire_stale(self, chunk_size=None, auto_commit=True):
+        """Cancel abandoned PayMongo transactions.
+
+        Transactions that never got a checkout session nor a payment intent cannot have been paid;
+        they are canceled with set-based updates, one chunk per statement. Rows being processed by
+        a webhook are locked and thus skipped (`SKIP LOCKED`); they will be picked up by a later
+        run if they are still stale. Only the state is changed: unlike `_set_canceled`, no
+        post-processing is triggered, which is fine for transactions that never got paid.
+
+        Transactions whose session or QR code expired are checked on PayMongo first, see
+        `_paymongo_sweep_expired_sessions`: a paid session whose webhook was lost is confirmed
+        rather than canceled.
+
+        :param int chunk_size: The number of transactions canceled per statement.
+        :param bool auto_commit: Whether to commit after each chunk.
+        :return: None
+        """
+        providers = self.env['payment.provider'].sudo().search([('code', '=', 'paymongo')])
+        if not providers:
+            return
+        chunk_size = chunk_size or get_config_param(
+            self.env, 'sweep_chunk_size', const.SWEEP_CHUNK_SIZE
+        )
+        grace = get_config_param(self.env, 'sweep_grace_period', const.SWEEP_GRACE_PERIOD)
+        max_age = get_config_param(self.env, 'sweep_max_age', const.SWEEP_MAX_AGE)
+        now = fields.Datetime.now()
+        message = _("The PayMongo checkout session expired.")
+        while True:
+            try:
+                with self.env.cr.savepoint():
+                    self.env.cr.execute(SQL(
+                        """
+                        WITH stale AS (
+                            SELECT id
+                              FROM payment_transaction
+                             WHERE provider_id IN %(provider_ids)s
+                               AND state IN ('draft', 'pending')
+                               AND operation IS DISTINCT FROM 'refund'
+                               AND paymongo_checkout_session_id IS NULL
+                               AND paymongo_payment_intent_id IS NULL
+                               AND create_date < %(created_before)s
+                          ORDER BY id
+                             LIMIT %(limit)s
+                               FOR UPDATE SKIP LOCKED
+                        )
+                        UPDATE payment_transaction tx
+                           SET state = 'cancel',
+                               state_message = %(message)s,
+                               last_state_change = %(now)s,
+                               write_date = %(now)s,
+                               write_uid = %(uid)s
+                          FROM stale
+                         WHERE tx.id = stale.id
+                     RETURNING tx.id
+                        """,
+                        provider_ids=tuple(providers.ids),
+                        created_before=now - timedelta(hours=max_age),
+                        limit=chunk_size,
+                        message=message,
+                        now=now,
+                        uid=self.env.uid,
+                    ))
+                    rows = self.env.cr.fetchall()
+            except SerializationFailure:
+                # A webhook updated one of the rows after this transaction started; retry later.
+                _logger.info("Stopped expiring PayMongo transactions on a concurrent update.")
+                break
+            self.invalidate_model(['state', 'state_message', 'last_state_change'])
+            _logger.info("Expired %s stale PayMongo transactions.", len(rows))
+            if auto_commit:
+                self.env.cr.commit()
+            if len(rows) < chunk_size:
+                break
+
+        self._paymongo_sweep_expired_sessions(providers, now - timedelta(minutes=grace))
+        if auto_commit:
+            self.env.cr.commit()
+
+    @api.model
+    def _paymongo_sweep_expired_sessions(self, providers, expired_before):
+        """Settle the transactions whose checkout session or QR code expired before the given date.
+
+        The sessions (or, in direct mode, the payment intents) are fetched from PayMongo as
+        rate-limited background calls, up to `payment_paymongo.sweep_remote_limit` per run and
+        walked in id order from the `payment_paymongo.sweep_cursor` system parameter. Paid ones
+        are confirmed and the sessions PayMongo reports as expired are canceled, both through
+        `_process` like a webhook would. Sessions still open on PayMongo's side are expired there
+        first if the `payment_paymongo.sweep_expire_remote` parameter is set, and left untouched
+        otherwise. QR codes cannot be paid after their expiry, so unpaid intents are canceled.
+
+        :param payment.provider providers: The PayMongo providers.
+        :param datetime expired_before: The expiry before which sessions are settled.
+        :return: None
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        cursor = int(ICP.get_param('payment_paymongo.sweep_cursor') or 0)
+        limit = get_config_param(self.env, 'sweep_remote_limit', const.SWEEP_REMOTE_LIMIT)
+        expire_remote = get_config_param(self.env, 'sweep_expire_remote', False)
+        txs_sudo = self.sudo().search([
+            ('provider_id', 'in', providers.ids),
+            ('state', 'in', ('draft', 'pending')),
+            ('paymongo_checkout_expires_at', '<', expired_before),
+            ('id', '>', cursor),
+        ], order='id', limit=limit)
+
+        for provider_sudo, provider_txs_sudo in txs_sudo.grouped('provider_id').items():
+            try:
+                results = provider_sudo._paymongo_send_concurrent_requests([
+                    ('GET', f'v1/checkout_sessions/{tx.paymongo_checkout_session_id}', None)
+                    if tx.paymongo_checkout_session_id
+                    else ('GET', f'v1/payment_intents/{tx.paymongo_payment_intent_id}', None)
+                    for tx in provider_txs_sudo
+                ])
+                open_txs_sudo = self.sudo()
+                for tx_sudo, (resource, error) in zip(provider_txs_sudo, results):
+                    if error:
+                        _logger.warning(
+                            "Could not check the expired PayMongo session of %s: %s",
+                            tx_sudo.reference, error,
+                        )
+                        continue
+                    if tx_sudo._paymongo_apply_checkout_session(resource):
+                        continue  # Paid or expired, and processed as such.
+                    status = ((resource.get('data') or {}).get('attributes') or {}).get('status')
+                    if tx_sudo.paymongo_checkout_session_id:
+                        if status == 'active':
+                            open_txs_sudo |= tx_sudo
+                    elif status != 'succeeded' and tx_sudo._paymongo_lock('sweep'):
+                        tx_sudo._set_canceled(_("The PayMongo QR code expired."))
+
+                if open_txs_sudo and expire_remote:
+                    results = provider_sudo._paymongo_send_concurrent_requests([
+                        ('POST', f'v1/checkout_sessions/{tx.paymongo_checkout_session_id}/expire',
+                         None)
+                        for tx in open_txs_sudo
+                    ])
+                    for tx_sudo, (checkout, error) in zip(open_txs_sudo, results):
+                        if error:
+                            _logger.warning(
+                                "Could not expire the PayMongo checkout session of %s: %s",
+                                tx_sudo.reference, error,
+                            )
+                            continue
+                        tx_sudo._paymongo_apply_checkout_session(checkout)
+            except ValidationError as error:  # The circuit is open.
+                _logger.warning(
+                    "Skipped checking expired PayMongo sessions of provider %s: %s",
+                    provider_sudo.id, error,
+                )
+
+        next_cursor = txs_sudo[-1].id if len(txs_sudo) == limit else 0
+        ICP.set_param('payment_paymongo.sweep_cursor', next_cursor)
+
     def _paymongo_sanitize_reference(self, ref: str) -> str:
         """PayMongo reference_number allows only [A-Za-z0-9_-]."""
         ref = ref or ""
@@ -235,48 +1048,13 @@ class PaymentTransaction(models.Model):
         if self.provider_code != 'paymongo':
             return res
 
-        event_attrs = (payment_data.get('data', {}) or {}).get('attributes', {}) or {}
-        session = event_attrs.get('data') or {}
-        session_attrs = (session.get('attributes') or {})
-
-        # 1) Preferred: checkout_session.attributes.payments[0].attributes.amount
-        payments = session_attrs.get('payments') or []
-        if payments:
-            pay_attrs = payments[0].get('attributes') or {}
-            amount_minor = pay_attrs.get('amount')
-            currency = pay_attrs.get('currency') or self.currency_id.name
-            if amount_minor is not None:
-                return {
-                    "amount": self._paymongo_from_minor_currency_units(int(amount_minor)),
-                    "currency_code": currency,
-                    "precision_digits": self.currency_id.decimal_places,
-                }
-
-        # 2) Fallback: payment_intent.attributes.amount
-        pi = session_attrs.get('payment_intent') or {}
-        pi_attrs = pi.get('attributes') or {}
-        amount_minor = pi_attrs.get('amount')
-        if amount_minor is not None:
-            return {
-                "amount": self._paymongo_from_minor_currency_units(int(amount_minor)),
-                "currency_code": pi_attrs.get('currency') or self.currency_id.name,
-                "precision_digits": self.currency_id.decimal_places,
-            }
-
-        # 3) Fallback: sum line_items
-        line_items = session_attrs.get('line_items') or []
-        if line_items:
-            total_minor = 0
-            currency = self.currency_id.name
-            for li in line_items:
-                qty = int(li.get('quantity') or 1)
-                amt = int(li.get('amount') or 0)
-                total_minor += qty * amt
-                currency = li.get('currency') or currency
-
+        event = PaymongoEvent.parse(payment_data)
+        if event.amount_minor is not None:
+            amount = self._paymongo_from_minor_currency_units(event.amount_minor)
             return {
-                "amount": self._paymongo_from_minor_currency_units(total_minor),
-                "currency_code": currency,
+                # PayMongo refund amounts are positive; those of refund transactions are negative.
+                "amount": -amount if self.operation == 'refund' else amount,
+                "currency_code": event.currency or self.currency_id.name,
                 "precision_digits": self.currency_id.decimal_places,
             }
 
@@ -0,0 +1,93 @@
+# payment_paymongo/models/paymongo_metric.py
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+from odoo.addons.payment.logging import get_payment_logger
+from odoo.addons.payment_paymongo import const, metrics
+
+_logger = get_payment_logger(__name__)
+
+
+class PaymongoMetric(models.Model):
+    """Cluster-wide totals of the series recorded by `metrics`.
+
+    Each worker aggregates its samples in memory and adds them to these rows with a single upsert
+    per flush, in its own cursor, so that cron-side series (inbox processing, lock contention...)
+    and the HTTP series of every worker are scraped from one place.
+    """
+    _name = 'paymongo.metric'
+    _description = "PayMongo Metric"
+    _log_access = False
+
+    family = fields.Char(required=True, readonly=True)
+    kind = fields.Selection(
+        selection=[('counter', "Counter"), ('gauge', "Gauge"), ('histogram', "Histogram")],
+        required=True,
+        readonly=True,
+    )
+    name = fields.Char(required=True, readonly=True)
+    labels = fields.Char(readonly=True)
+    value = fields.Float(readonly=True)
+    updated_at = fields.Datetime(string="Updated At", readonly=True)
+
+    _series_uniq = models.Constraint(
+        'UNIQUE(name, labels)', "A metric series can only be stored once."
+    )
+
+    @api.model
+    def _flush(self):
+        """Add the samples aggregated by this worker since its last flush to the shared totals.
+
+        Metrics are best effort: the samples are dropped if they cannot be stored.
+
+        :return: None
+        """
+        samples = metrics.drain()
+        if not samples:
+            return
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute(SQL(
+                    """
+                    INSERT INTO paymongo_metric (family, kind, name, labels, value, updated_at)
+                         VALUES %s
+                    ON CONFLICT (name, labels) DO UPDATE
+                            SET value = CASE WHEN EXCLUDED.kind = 'gauge' THEN EXCLUDED.value
+                                             ELSE paymongo_metric.value + EXCLUDED.value END,
+                                updated_at = EXCLUDED.updated_at
+                    """,
+                    SQL(', ').join(
+                        SQL("(%s, %s, %s, %s, %s, NOW() AT TIME ZONE 'UTC')", *sample)
+                        for sample in samples
+                    ),
+                ))
+        except Exception as error:  # noqa: BLE001
+            _logger.warning("Could not store %s PayMongo metric samples: %s", len(samples), error)
+
+    @api.model
+    def _render(self):
+        """Render the shared totals, and the live circuit state of the providers.
+
+        The circuit state is read from the providers at render time rather than recorded as a
+        gauge, so that it is never stale.
+
+        :return: The metrics in the Prometheus text format.
+        :rtype: str
+        """
+        self._flush()
+        self.env.cr.execute(SQL(
+            "SELECT family, kind, name, COALESCE(labels, ''), value FROM paymongo_metric"
+        ))
+        samples = self.env.cr.fetchall()
+        providers = self.env['payment.provider'].sudo().search_fetch(
+            [('code', '=', 'paymongo')], ['paymongo_circuit_state']
+        )
+        samples += [
+            (
+                'paymongo_circuit_state', 'gauge', 'paymongo_circuit_state',
+                metrics.format_labels((('provider', str(provider.id)),)),
+                const.CIRCUIT_STATE_VALUES[provider.paymongo_circuit_state or 'closed'],
+            )
+            for provider in providers
+        ]
+        return metrics.render(samples)
@@ -0,0 +1,114 @@
+# payment_paymongo/models/paymongo_rate_bucket.py
+import hashlib
+import random
+import time
+
+from odoo import _, api, fields, models
+from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+
+from odoo.addons.payment.logging import get_payment_logger
+from odoo.addons.payment_paymongo import const, metrics
+from odoo.addons.payment_paymongo.utils import get_config_param
+
+_logger = get_payment_logger(__name__)
+
+
+class PaymongoRateBucket(models.Model):
+    """Token bucket limiting the outbound calls made with one PayMongo secret key.
+
+    Buckets live in PostgreSQL so that the limit holds across all workers and nodes. Tokens are
+    refilled lazily from the elapsed time and taken with a single conditional `UPDATE`, committed
+    in its own cursor so that the row lock is only held for the duration of that statement.
+    Background jobs cannot take the last `const.RATE_LIMIT_INTERACTIVE_RESERVE` share of the
+    bucket, which stays available to interactive checkouts.
+    """
+    _name = 'paymongo.rate.bucket'
+    _description = "PayMongo Rate Limit Bucket"
+
+    key = fields.Char(string="Key Hash", required=True, readonly=True)
+    tokens = fields.Float(readonly=True)
+    updated_at = fields.Datetime(string="Updated At", required=True, readonly=True)
+
+    _key_uniq = models.Constraint('UNIQUE(key)', "A rate limit bucket must be unique per key.")
+
+    @api.model
+    def _acquire(self, secret_key, priority='interactive'):
+        """Take one token from the bucket of the secret key, waiting a bounded time if empty.
+
+        :param str secret_key: The PayMongo secret key the call is made with.
+        :param str priority: `interactive` for calls a user is waiting on, `background` otherwise.
+        :return: None
+        :raise ValidationError: If no token became available in time.
+        """
+        rate = get_config_param(self.env, 'rate_limit_per_second', const.RATE_LIMIT_PER_SECOND)
+        if rate <= 0:
+            return  # Rate limiting disabled.
+        capacity = get_config_param(self.env, 'rate_limit_burst', const.RATE_LIMIT_BURST)
+        if priority == 'interactive':
+            floor = 0.0
+            max_wait = get_config_param(
+                self.env, 'rate_limit_interactive_wait', const.RATE_LIMIT_INTERACTIVE_WAIT
+            )
+        else:
+            floor = capacity * const.RATE_LIMIT_INTERACTIVE_RESERVE
+            max_wait = get_config_param(
+                self.env, 'rate_limit_background_wait', const.RATE_LIMIT_BACKGROUND_WAIT
+            )
+
+        key = hashlib.sha256((secret_key or '').encode()).hexdigest()
+        deadline = time.monotonic() + max_wait
+        waited = False
+        while True:
+            tokens = self._take_token(key, rate, capacity, floor)
+            if tokens is None:
+                break
+            # Sleep until the missing tokens should have been refilled, with some jitter.
+            delay = (1.0 + floor - tokens) / rate * random.uniform(1.0, 1.5)
+            if time.monotonic() + delay > deadline:
+                metrics.inc('paymongo_rate_limit_rejections_total', priority=priority)
+                raise ValidationError(_(
+                    "PayMongo is receiving too many requests. Please try again in a moment."
+                ))
+            waited = True
+            time.sleep(delay)
+        if waited:
+            metrics.inc('paymongo_rate_limit_waits_total', priority=priority)
+
+    @api.model
+    def _take_token(self, key, rate, capacity, floor):
+        """Refill the bucket and take a token if at least `floor` tokens would remain.
+
+        :return: None if a token was taken, else the number of tokens currently available.
+        :rtype: float
+        """
+        refilled = SQL(
+            "LEAST(%s, tokens + EXTRACT(EPOCH FROM (NOW() AT TIME ZONE 'UTC') - updated_at) * %s)",
+            capacity, rate,
+        )
+        with self.env.registry.cursor() as cr:
+            cr.execute(SQL(
+                """
+                INSERT INTO paymongo_rate_bucket (key, tokens, updated_at)
+                     VALUES (%s, %s, NOW() AT TIME ZONE 'UTC')
+                ON CONFLICT (key) DO NOTHING
+                """,
+                key, capacity,
+            ))
+            cr.execute(SQL(
+                """
+                UPDATE paymongo_rate_bucket
+                   SET tokens = %(refilled)s - 1,
+                       updated_at = NOW() AT TIME ZONE 'UTC'
+                 WHERE key = %(key)s
+                   AND %(refilled)s - 1 >= %(floor)s
+             RETURNING tokens
+                """,
+                refilled=refilled, key=key, floor=floor,
+            ))
+            if cr.fetchone():
+                return None
+            cr.execute(SQL(
+                "SELECT %s FROM paymongo_rate_bucket WHERE key = %s", refilled, key
+            ))
+            return cr.fetchone()[0]
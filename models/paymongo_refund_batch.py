@@ -0,0 +1,233 @@
+# payment_paymongo/models/paymongo_refund_batch.py
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+
+from odoo.addons.payment.logging import get_payment_logger
+from odoo.addons.payment_paymongo import const
+
+_logger = get_payment_logger(__name__)
+
+
+class PaymongoRefundBatch(models.Model):
+    """A batch of PayMongo refunds, sent in the background and confirmed by webhooks.
+
+    Each line refunds one transaction through a refund child transaction. Once the batch is
+    started, a cron sends the queued lines in chunks of `const.REFUND_BATCH_SIZE` through the
+    concurrent request pool of the provider, which bounds the concurrency and takes background
+    rate-limit tokens. Refunds PayMongo does not settle right away stay pending until their
+    `refund.*` or `payment.refunded` webhook is processed.
+    """
+    _name = 'paymongo.refund.batch'
+    _description = "PayMongo Refund Batch"
+    _order = 'id desc'
+
+    name = fields.Char(required=True, default=lambda self: _("PayMongo Refunds"))
+    reason = fields.Selection(
+        selection=[
+            ('requested_by_customer', "Requested by Customer"),
+            ('duplicate', "Duplicate"),
+            ('fraudulent', "Fraudulent"),
+            ('others', "Others"),
+        ],
+        default='requested_by_customer',
+        required=True,
+    )
+    state = fields.Selection(
+        selection=[
+            ('draft', "Draft"),
+            ('running', "Sending"),
+            ('sent', "Sent"),
+        ],
+        default='draft',
+        required=True,
+        readonly=True,
+        index=True,
+    )
+    line_ids = fields.One2many(
+        string="Refunds", comodel_name='paymongo.refund.batch.line', inverse_name='batch_id'
+    )
+    line_count = fields.Integer(string="Refund Count", compute='_compute_counts')
+    queued_count = fields.Integer(string="Queued", compute='_compute_counts')
+    sending_count = fields.Integer(string="Sending", compute='_compute_counts')
+    pending_count = fields.Integer(string="Pending", compute='_compute_counts')
+    done_count = fields.Integer(string="Refunded", compute='_compute_counts')
+    failed_count = fields.Integer(string="Failed", compute='_compute_counts')
+    progress = fields.Float(
+        help="The share of refunds that reached a final state.", compute='_compute_counts'
+    )
+
+    @api.depends('line_ids.state')
+    def _compute_counts(self):
+        counts = defaultdict(dict)
+        for batch, state, count in self.env['paymongo.refund.batch.line']._read_group(
+            [('batch_id', 'in', self.ids)], ['batch_id', 'state'], ['__count'],
+        ):
+            counts[batch.id][state] = count
+        for batch in self:
+            batch_counts = counts[batch.id]
+            batch.line_count = sum(batch_counts.values())
+            batch.queued_count = batch_counts.get('queued', 0)
+            batch.sending_count = batch_counts.get('sending', 0)
+            batch.pending_count = batch_counts.get('pending', 0)
+            batch.done_count = batch_counts.get('done', 0)
+            batch.failed_count = batch_counts.get('failed', 0)
+            final_count = batch.done_count + batch.failed_count
+            batch.progress = 100 * final_count / batch.line_count if batch.line_count else 0
+
+    # === ACTION METHODS === #
+
+    def action_start(self):
+        """Queue the refunds of these batches for the background sending."""
+        if self.filtered(lambda batch: batch.state != 'draft'):
+            raise ValidationError(_("Only draft refund batches can be started."))
+        if any(not batch.line_ids for batch in self):
+            raise ValidationError(_("A refund batch needs at least one refund."))
+        self.state = 'running'
+        self.env.ref('payment_paymongo.cron_send_refund_batches')._trigger()
+
+    def action_retry_failed(self):
+        """Queue the failed refunds of these batches again, as new refund transactions."""
+        failed_lines = self.line_ids.filtered(lambda line: line.state == 'failed')
+        if not failed_lines:
+            raise ValidationError(_("There are no failed refunds to retry."))
+        failed_lines.write({'refund_transaction_id': False, 'error': False, 'sent_at': False})
+        failed_lines.batch_id.state = 'running'
+        self.env.ref('payment_paymongo.cron_send_refund_batches')._trigger()
+
+    def action_view_refund_transactions(self):
+        """Open the refund transactions of this batch."""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Refund Transactions"),
+            'res_model': 'payment.transaction',
+            'view_mode': 'list,form',
+            'domain': [('id', 'in', self.line_ids.refund_transaction_id.ids)],
+        }
+
+    # === BUSINESS METHODS === #
+
+    @api.model
+    def _create_from_transactions(self, transactions):
+        """Create a draft batch refunding the amount still refundable of each transaction.
+
+        :param payment.transaction transactions: The PayMongo transactions to refund.
+        :return: The action opening the batch.
+        :rtype: dict
+        """
+        invalid_txs = transactions.filtered(lambda tx: (
+            tx.provider_code != 'paymongo'
+            or tx.state != 'done'
+            or tx.operation == 'refund'
+            or not tx.paymongo_payment_id
+        ))
+        if invalid_txs:
+            raise ValidationError(_(
+                "Only confirmed PayMongo payments can be refunded. Invalid transactions: %s",
+                ', '.join(invalid_txs.mapped('reference')),
+            ))
+
+        line_vals = []
+        for tx in transactions:
+            refunded = -sum(tx.child_transaction_ids.filtered(
+                lambda child: child.operation == 'refund' and child.state not in ('cancel', 'error')
+            ).mapped('amount'))
+            amount = tx.currency_id.round(tx.amount - refunded)
+            if amount > 0:
+                line_vals.append({'transaction_id': tx.id, 'amount': amount})
+        if not line_vals:
+            raise ValidationError(_("The selected transactions are already refunded."))
+
+        batch = self.create({'line_ids': [fields.Command.create(vals) for vals in line_vals]})
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': batch.id,
+            'view_mode': 'form',
+        }
+
+    @api.model
+    def _cron_send_refunds(self, batch_size=None, auto_commit=True):
+        """Send the queued refunds of the running batches, chunk by chunk.
+
+        Lines are claimed with `FOR UPDATE SKIP LOCKED`, so that concurrent runs never send a
+        refund twice. Their refund transactions are created and committed, with the lines marked
+        as `sending`, before any request goes out; the refund requests of a chunk are then sent
+        concurrently, per provider, and the chunk is committed again with their results. If the
+        circuit of a provider is open or its rate limit holds requests back, its unsent lines stay
+        queued for the next run.
+
+        Lines still `sending` long after they were sent belong to an interrupted run, or to a
+        request whose outcome is unknown: they are resolved against the refunds listed on PayMongo
+        instead of being sent again.
+
+        :param int batch_size: The number of refunds sent per chunk.
+        :param bool auto_commit: Whether to commit after each chunk.
+        :return: None
+        """
+        batch_size = batch_size or const.REFUND_BATCH_SIZE
+        Line = self.env['paymongo.refund.batch.line']
+
+        self.env.cr.execute(SQL(
+            """
+            SELECT id
+              FROM paymongo_refund_batch_line
+             WHERE state = 'sending'
+               AND sent_at < %s
+          ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+            """,
+            fields.Datetime.now() - timedelta(minutes=const.REFUND_RESOLVE_DELAY), batch_size,
+        ))
+        interrupted_lines = Line.browse(row[0] for row in self.env.cr.fetchall())
+        for provider_lines in interrupted_lines.grouped(
+            lambda line: line.transaction_id.provider_id
+        ).values():
+            provider_lines._resolve_refunds()
+        if auto_commit:
+            self.env.cr.commit()
+
+        skipped_provider_ids = set()
+        while True:
+            self.env.cr.execute(SQL(
+                """
+                SELECT line.id
+                  FROM paymongo_refund_batch_line line
+                  JOIN paymongo_refund_batch batch ON batch.id = line.batch_id
+                  JOIN payment_transaction tx ON tx.id = line.transaction_id
+                 WHERE line.state = 'queued'
+                   AND batch.state = 'running'
+                   AND tx.provider_id NOT IN %s
+              ORDER BY line.id
+                 LIMIT %s
+                   FOR UPDATE OF line SKIP LOCKED
+                """,
+                tuple(skipped_provider_ids) or (0,), batch_size,
+            ))
+            lines = Line.browse(row[0] for row in self.env.cr.fetchall())
+            if not lines:
+                break
+            lines = lines._prepare_refunds()
+            if auto_commit:
+                self.env.cr.commit()  # The refunds are recorded as being sent before any call.
+            for provider, provider_lines in lines.grouped(
+                lambda line: line.transaction_id.provider_id
+            ).items():
+                if not provider_lines._send_refunds():
+                    skipped_provider_ids.add(provider.id)
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()  # Keep the cache from growing with the batches.
+
+        # Batches without queued lines are fully sent; their webhooks confirm the pending lines.
+        running_batches = self.search([('state', '=', 'running')])
+        running_batches.filtered(
+            lambda batch: not batch.queued_count and not batch.sending_count
+        ).state = 'sent'
+        if auto_commit:
+            self.env.cr.commit()
@@ -0,0 +1,217 @@
+# payment_paymongo/models/paymongo_refund_batch_line.py
+from urllib.parse import urlencode
+
+from odoo import api, fields, models
+from odoo.exceptions import ValidationError
+
+from odoo.addons.payment.logging import get_payment_logger
+from odoo.addons.payment_paymongo import metrics
+
+_logger = get_payment_logger(__name__)
+
+
+class PaymongoRefundBatchLine(models.Model):
+    _name = 'paymongo.refund.batch.line'
+    _description = "PayMongo Refund Batch Line"
+    _order = 'batch_id, id'
+
+    batch_id = fields.Many2one(
+        comodel_name='paymongo.refund.batch', required=True, index=True, ondelete='cascade'
+    )
+    transaction_id = fields.Many2one(
+        string="Transaction",
+        comodel_name='payment.transaction',
+        required=True,
+        domain="[('provider_code', '=', 'paymongo'), ('state', '=', 'done'), "
+               "('operation', '!=', 'refund')]",
+        ondelete='restrict',
+    )
+    currency_id = fields.Many2one(related='transaction_id.currency_id')
+    partner_id = fields.Many2one(related='transaction_id.partner_id')
+    amount = fields.Monetary(currency_field='currency_id', required=True)
+    refund_transaction_id = fields.Many2one(
+        string="Refund Transaction", comodel_name='payment.transaction', readonly=True
+    )
+    refund_state = fields.Selection(related='refund_transaction_id.state')
+    error = fields.Text(readonly=True)
+    sent_at = fields.Datetime(
+        string="Sent At",
+        help="When the refund was recorded as being sent, just before calling PayMongo.",
+        readonly=True,
+    )
+    state = fields.Selection(
+        selection=[
+            ('queued', "Queued"),
+            ('sending', "Sending"),
+            ('pending', "Pending"),
+            ('done', "Refunded"),
+            ('failed', "Failed"),
+        ],
+        compute='_compute_state',
+        store=True,
+        index=True,
+    )
+
+    _amount_positive = models.Constraint(
+        'CHECK(amount > 0)', "The amount of a refund must be positive."
+    )
+
+    @api.depends(
+        'refund_transaction_id.state', 'refund_transaction_id.paymongo_refund_id', 'error'
+    )
+    def _compute_state(self):
+        for line in self:
+            refund_tx = line.refund_transaction_id
+            if line.error or refund_tx.state in ('error', 'cancel'):
+                line.state = 'failed'
+            elif refund_tx.state == 'done':
+                line.state = 'done'
+            elif refund_tx.state == 'draft' and not refund_tx.paymongo_refund_id:
+                # Possibly sent: PayMongo has not answered, or its answer was not saved.
+                line.state = 'sending'
+            elif refund_tx:
+                line.state = 'pending'
+            else:
+                line.state = 'queued'
+
+    def _prepare_refunds(self):
+        """Create the refund transactions of these lines and mark them as being sent.
+
+        Each line is prepared on its own: a line whose refund cannot be sent (e.g. its payment is
+        unknown to PayMongo) is marked as failed without affecting the others. The caller must
+        commit before sending the refunds, so that a refund is never sent without a trace.
+
+        :return: The lines ready to be sent.
+        :rtype: paymongo.refund.batch.line
+        """
+        ready_lines = self.browse()
+        for line in self:
+            try:
+                with self.env.cr.savepoint():
+                    refund_tx = line.transaction_id._create_child_transaction(
+                        line.amount, is_refund=True
+                    )
+                    refund_tx._paymongo_prepare_refund_payload(line.batch_id.reason)
+            except ValidationError as error:
+                line.error = str(error)
+                metrics.inc('paymongo_refunds_total', outcome='failed')
+                continue
+            line.write({'refund_transaction_id': refund_tx.id, 'sent_at': fields.Datetime.now()})
+            ready_lines |= line
+        return ready_lines
+
+    def _send_refunds(self):
+        """Send the refunds of these prepared lines to PayMongo concurrently.
+
+        All lines must belong to transactions of the same provider. Lines whose request PayMongo
+        rejected are marked as failed with the error; their refund transaction is set in error.
+        Lines whose request was not sent, because of the rate limit, are queued again. Lines whose
+        request may have been processed (connection error, 5xx) are left `sending`, so that
+        `_resolve_refunds` checks PayMongo before they are ever sent again.
+
+        :return: Whether all the requests were sent; False if the circuit of the provider is open
+                 or the rate limit held some back.
+        :rtype: bool
+        """
+        provider = self.transaction_id.provider_id.ensure_one()
+        try:
+            results = provider._paymongo_send_concurrent_requests([
+                (
+                    'POST',
+                    'v1/refunds',
+                    line.refund_transaction_id._paymongo_prepare_refund_payload(
+                        line.batch_id.reason
+                    ),
+                )
+                for line in self
+            ], with_outcome=True)
+        except ValidationError as error:
+            # The circuit is open and nothing was sent: queue the lines again.
+            _logger.warning("PayMongo refunds of provider %s postponed: %s", provider.id, error)
+            self._requeue()
+            return False
+
+        unsent_lines = unknown_lines = self.browse()
+        for line, (content, error, outcome) in zip(self, results):
+            refund_tx = line.refund_transaction_id
+            if outcome == 'unsent':
+                unsent_lines |= line
+            elif outcome == 'unknown':
+                _logger.warning(
+                    "Outcome of PayMongo refund %s unknown, to be resolved: %s",
+                    refund_tx.reference, error,
+                )
+                unknown_lines |= line
+                metrics.inc('paymongo_refunds_total', outcome='unknown')
+            elif error:
+                refund_tx._set_error(error)
+                line.error = error
+                metrics.inc('paymongo_refunds_total', outcome='failed')
+            else:
+                refund_tx._paymongo_apply_refund_response(content)
+                metrics.inc('paymongo_refunds_total', outcome=refund_tx.state)
+        unsent_lines._requeue()
+        _logger.info(
+            "Sent %s PayMongo refunds of provider %s, %s failed, %s unknown, %s queued again.",
+            len(self) - len(unsent_lines), provider.id, len(self.filtered('error')),
+            len(unknown_lines), len(unsent_lines),
+        )
+        return not unsent_lines
+
+    def _resolve_refunds(self):
+        """Settle the lines left in `sending`, without sending them again.
+
+        Lines are left in `sending` by an interrupted run, or when the outcome of their request is
+        unknown (connection error, 5xx).
+
+        The refunds of each payment are listed on PayMongo and matched with the refund
+        transactions through the Odoo reference of their metadata. Refunds found are saved as if
+        their request had just been answered; lines whose refund is not found were never sent and
+        are queued again. Lines whose payment could not be listed are left for a later run.
+
+        All lines must belong to transactions of the same provider.
+
+        :return: None
+        """
+        provider = self.transaction_id.provider_id.ensure_one()
+        payment_ids = list(set(self.transaction_id.mapped('paymongo_payment_id')))
+        try:
+            results = provider._paymongo_send_concurrent_requests([
+                ('GET', f'v1/refunds?{urlencode({"payment_id": payment_id, "limit": 100})}', None)
+                for payment_id in payment_ids
+            ])
+        except ValidationError as error:  # The circuit is open.
+            _logger.warning("PayMongo refunds of provider %s not resolved: %s", provider.id, error)
+            return
+
+        refunds_by_payment = {}
+        for payment_id, (content, error) in zip(payment_ids, results):
+            if error:
+                _logger.warning("Could not list the PayMongo refunds of %s: %s", payment_id, error)
+                continue
+            refunds_by_payment[payment_id] = {
+                ((refund.get('attributes') or {}).get('metadata') or {}).get('odoo_tx_ref'): refund
+                for refund in (content or {}).get('data') or []
+            }
+
+        unsent_lines = self.browse()
+        for line in self:
+            refunds = refunds_by_payment.get(line.transaction_id.paymongo_payment_id)
+            if refunds is None:
+                continue
+            refund_tx = line.refund_transaction_id
+            if refund := refunds.get(refund_tx.reference):
+                refund_tx._paymongo_apply_refund_response({'data': refund})
+                metrics.inc('paymongo_refunds_total', outcome=refund_tx.state)
+            else:
+                unsent_lines |= line
+        unsent_lines._requeue()
+        _logger.info(
+            "Resolved %s interrupted PayMongo refunds of provider %s, %s queued again.",
+            len(self), provider.id, len(unsent_lines),
+        )
+
+    def _requeue(self):
+        """Queue these lines again after their refund was found not to have been sent."""
+        self.refund_transaction_id._set_canceled()
+        self.write({'refund_transaction_id': False, 'sent_at': False})
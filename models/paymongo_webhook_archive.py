@@ -0,0 +1,212 @@
+# payment_paymongo/models/paymongo_webhook_archive.py
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+from odoo.tools import SQL, sql
+
+from odoo.addons.payment.logging import get_payment_logger
+from odoo.addons.payment_paymongo import const
+from odoo.addons.payment_paymongo.utils import compress_body, decompress_body, get_config_param
+
+_logger = get_payment_logger(__name__)
+
+
+class PaymongoWebhookArchive(models.Model):
+    """Audit archive of the PayMongo notifications, one row per delivery.
+
+    Unlike the inbox, which only keeps events for the retention window of redeliveries, the archive
+    keeps every delivery for `const.WEBHOOK_ARCHIVE_RETENTION_DAYS`. Bodies are stored compressed;
+    the metadata needed to find an event (id, type, reference, reception time and verification
+    result) is kept in indexed columns so that audits never have to decompress anything. Archived
+    events can be replayed through the inbox.
+
+    The compressed bodies are kept as raw bytes in the `compressed_body` column, which the ORM does
+    not manage: a `Binary` field would store them base64-encoded, a third larger.
+    """
+    _name = 'paymongo.webhook.archive'
+    _description = "PayMongo Webhook Archive"
+    _order = 'received_at desc, id desc'
+    _rec_name = 'event_id'
+
+    provider_id = fields.Many2one(
+        string="Provider", comodel_name='payment.provider', readonly=True, ondelete='set null'
+    )
+    event_id = fields.Char(string="Event ID", index='btree_not_null', readonly=True)
+    event_type = fields.Char(string="Event Type", readonly=True)
+    reference = fields.Char(index='btree_not_null', readonly=True)
+    livemode = fields.Boolean(readonly=True)
+    received_at = fields.Datetime(
+        string="Received At", default=fields.Datetime.now, required=True, index=True, readonly=True
+    )
+    verification = fields.Selection(
+        selection=[
+            ('valid', "Valid Signature"),
+            ('invalid', "Invalid Signature"),
+            ('malformed', "Malformed Event"),
+        ],
+        required=True,
+        readonly=True,
+    )
+    codec = fields.Selection(
+        selection=[('zstd', "zstd"), ('zlib', "zlib"), ('none', "None")],
+        required=True,
+        readonly=True,
+    )
+    body_size = fields.Integer(string="Body Size", help="The uncompressed size, in bytes.")
+    raw_body = fields.Text(string="Raw Body", compute='_compute_raw_body')
+
+    def _auto_init(self):
+        super()._auto_init()
+        if not sql.column_exists(self.env.cr, self._table, 'compressed_body'):
+            sql.create_column(self.env.cr, self._table, 'compressed_body', 'bytea')
+
+    def _compute_raw_body(self):
+        raw_bodies = self._get_raw_bodies()
+        for archive in self:
+            raw_body = raw_bodies.get(archive.id, b'')
+            archive.raw_body = raw_body.decode('utf-8', errors='replace')
+
+    # === BUSINESS METHODS === #
+
+    @api.model
+    def _archive(self, raw_body, verification, provider_id=None, event=None):
+        """Store a notification in the archive.
+
+        :param bytes raw_body: The raw request body.
+        :param str verification: The verification result, see the `verification` field.
+        :param int provider_id: The id of the provider whose webhook secret signed the event.
+        :param PaymongoEvent event: The parsed event, if the body could be parsed.
+        :return: The archived notification.
+        :rtype: paymongo.webhook.archive
+        """
+        codec, data = compress_body(raw_body or b'')
+        archive = self.create({
+            'provider_id': provider_id,
+            'event_id': event and event.event_id,
+            'event_type': event and event.event_type,
+            'reference': event and (event.reference or event.paymongo_reference),
+            'livemode': bool(event and event.livemode),
+            'verification': verification,
+            'codec': codec,
+            'body_size': len(raw_body or b''),
+        })
+        self.env.cr.execute(SQL(
+            "UPDATE paymongo_webhook_archive SET compressed_body = %s WHERE id = %s",
+            data, archive.id,
+        ))
+        return archive
+
+    def _get_raw_bodies(self):
+        """Return the decompressed bodies of these notifications, read in a single query.
+
+        :return: The raw request bodies, by archive id.
+        :rtype: dict
+        """
+        ids = tuple(id_ for id_ in self.ids if id_)
+        if not ids:
+            return {}
+        self.env.cr.execute(SQL(
+            "SELECT id, compressed_body FROM paymongo_webhook_archive WHERE id IN %s", ids
+        ))
+        compressed_bodies = dict(self.env.cr.fetchall())
+        return {
+            archive.id: decompress_body(archive.codec, bytes(compressed_bodies[archive.id] or b''))
+            for archive in self.browse(ids)
+        }
+
+    def action_replay(self):
+        """Send the selected notifications through the processing pipeline again."""
+        replayed = self._replay([('id', 'in', self.ids)], auto_commit=False)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'success',
+                'message': _("%s PayMongo events queued for processing.", replayed),
+            },
+        }
+
+    @api.model
+    def _replay(self, domain, batch_size=None, auto_commit=True):
+        """Stream the archived events matching the domain back into the inbox, in batches.
+
+        Only events with a valid signature are replayed, in the order they were archived. Events
+        still in the inbox are reset to pending; the others are stored again. The inbox cron then
+        processes them as usual, including the coalescing of events of the same transaction.
+
+        :param list domain: The domain of the archived events to replay, e.g. a time window.
+        :param int batch_size: The number of events replayed per batch.
+        :param bool auto_commit: Whether to commit after each batch.
+        :return: The number of replayed events.
+        :rtype: int
+        """
+        batch_size = batch_size or const.WEBHOOK_ARCHIVE_REPLAY_BATCH_SIZE
+        Event = self.env['paymongo.webhook.event'].sudo()
+        domain = [*domain, ('verification', '=', 'valid'), ('provider_id', '!=', False)]
+        replayed = last_id = 0
+        # Walk the matching rows by id rather than loading them all, however large the window.
+        while archives := self.search(
+            [*domain, ('id', '>', last_id)], order='id', limit=batch_size
+        ):
+            last_id = archives[-1].id
+            # Events are unique in the inbox: a redelivery archived twice is only replayed once.
+            archives_by_event_id = {archive.event_id: archive for archive in archives}
+            existing_events = Event.search([('event_id', 'in', list(archives_by_event_id))])
+            existing_events.write({
+                'state': 'pending',
+                'attempts': 0,
+                'last_error': False,
+                'next_attempt_at': fields.Datetime.now(),
+                'processed_at': False,
+                'coalesced_into_id': False,
+            })
+            existing_event_ids = set(existing_events.mapped('event_id'))
+            raw_bodies = archives._get_raw_bodies()
+            Event.create([{
+                'provider_id': archive.provider_id.id,
+                'event_id': event_id,
+                'event_type': archive.event_type,
+                'livemode': archive.livemode,
+                'raw_body': raw_bodies[archive.id].decode('utf-8'),
+            } for event_id, archive in archives_by_event_id.items()
+                if event_id not in existing_event_ids])
+            replayed += len(archives_by_event_id)
+            _logger.info("Replayed %s archived PayMongo events.", len(archives_by_event_id))
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()  # Keep the cache from growing with the window.
+        if replayed:
+            self.env.ref('payment_paymongo.cron_process_webhook_events')._trigger()
+        return replayed
+
+    @api.model
+    def _cron_prune_archive(self, chunk_size=5000, auto_commit=True):
+        """Delete archived notifications older than the retention window, in chunks.
+
+        :param int chunk_size: The number of rows deleted per statement.
+        :param bool auto_commit: Whether to commit after each chunk.
+        :return: None
+        """
+        retention_days = get_config_param(
+            self.env, 'archive_retention_days', const.WEBHOOK_ARCHIVE_RETENTION_DAYS
+        )
+        limit_date = fields.Datetime.now() - timedelta(days=retention_days)
+        while True:
+            self.env.cr.execute(SQL(
+                """
+                DELETE FROM paymongo_webhook_archive
+                 WHERE id IN (
+                    SELECT id
+                      FROM paymongo_webhook_archive
+                     WHERE received_at < %s
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED
+                 )
+                """,
+                limit_date, chunk_size,
+            ))
+            deleted = self.env.cr.rowcount
+            if auto_commit:
+                self.env.cr.commit()
+            if deleted < chunk_size:
+                break
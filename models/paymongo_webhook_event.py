@@ -0,0 +1,362 @@
+# payment_paymongo/models/paymongo_webhook_event.py
+import json
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from psycopg2.errors import UniqueViolation
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+from odoo.addons.payment.logging import get_payment_logger
+from odoo.addons.payment_paymongo import const, metrics
+from odoo.addons.payment_paymongo.utils import PaymongoEvent, get_config_param
+
+_logger = get_payment_logger(__name__)
+
+
+class PaymongoWebhookEvent(models.Model):
+    """Inbox of verified PayMongo notifications.
+
+    The webhook endpoint only stores the raw event and acknowledges it; the heavy processing
+    (transaction lookup, `_process`, invoice confirmation) is done by a cron that drains the inbox
+    in batches. Rows are claimed with `FOR UPDATE SKIP LOCKED` so several workers can drain the
+    inbox concurrently without processing the same event twice.
+
+    Events targeting the same transaction are processed together: the transaction is row-locked
+    while its events are processed, so that PayMongo's bursts of events for one payment do not race
+    each other in `_process`, and the events driving the same state transition are coalesced.
+
+    The inbox doubles as the record of processed event ids: `event_id` is unique so redeliveries
+    are acknowledged after a single indexed lookup, and handled rows are pruned after a retention
+    window to keep the index small.
+    """
+    _name = 'paymongo.webhook.event'
+    _description = "PayMongo Webhook Event"
+    _order = 'id desc'
+    _rec_name = 'event_id'
+
+    provider_id = fields.Many2one(
+        string="Provider", comodel_name='payment.provider', required=True, ondelete='cascade'
+    )
+    event_id = fields.Char(string="Event ID", index=True, readonly=True)
+    event_type = fields.Char(string="Event Type", readonly=True)
+    livemode = fields.Boolean(readonly=True)
+    raw_body = fields.Text(string="Raw Body", required=True, readonly=True)
+    headers = fields.Json(readonly=True)
+    state = fields.Selection(
+        selection=[
+            ('pending', "Pending"),
+            ('done', "Done"),
+            ('failed', "Failed"),
+        ],
+        default='pending',
+        required=True,
+        readonly=True,
+    )
+    attempts = fields.Integer(default=0, readonly=True)
+    next_attempt_at = fields.Datetime(
+        string="Next Attempt", default=fields.Datetime.now, required=True, readonly=True
+    )
+    last_error = fields.Text(string="Last Error", readonly=True)
+    processed_at = fields.Datetime(string="Processed At", readonly=True)
+    coalesced_into_id = fields.Many2one(
+        string="Coalesced Into",
+        help="The event of the same transaction and state transition that was processed instead"
+             " of this one.",
+        comodel_name='paymongo.webhook.event',
+        readonly=True,
+        ondelete='set null',
+    )
+
+    _event_id_uniq = models.Constraint(
+        'UNIQUE(event_id)', "A PayMongo event can only be stored once."
+    )
+    _pending_idx = models.Index("(next_attempt_at, id) WHERE state = 'pending'")
+    _processed_idx = models.Index("(processed_at) WHERE state != 'pending'")
+
+    # === BUSINESS METHODS === #
+
+    @api.model
+    def _is_known_event(self, event_id):
+        """Return whether an event with this id was already received.
+
+        :param str event_id: The PayMongo event id (`data.id` of the envelope).
+        :return: Whether the event is a redelivery.
+        :rtype: bool
+        """
+        return bool(event_id) and bool(self.search_count([('event_id', '=', event_id)], limit=1))
+
+    @api.model
+    def _enqueue(self, provider, raw_body, headers, event):
+        """Store a verified notification and wake up the inbox cron.
+
+        A concurrent delivery of the same event loses the race on the unique index and is
+        silently dropped.
+
+        :param payment.provider provider: The provider whose webhook secret signed the event.
+        :param bytes raw_body: The raw request body.
+        :param dict headers: The request headers.
+        :param PaymongoEvent event: The parsed event.
+        :return: The created event, or an empty recordset if it was a duplicate.
+        :rtype: paymongo.webhook.event
+        """
+        try:
+            with self.env.cr.savepoint():
+                record = self.create({
+                    'provider_id': provider.id,
+                    'event_id': event.event_id,
+                    'event_type': event.event_type,
+                    'livemode': event.livemode,
+                    'raw_body': raw_body.decode('utf-8'),
+                    'headers': {
+                        name: headers[name]
+                        for name in const.WEBHOOK_STORED_HEADERS if name in headers
+                    },
+                })
+        except UniqueViolation:
+            _logger.info("Ignored concurrent redelivery of PayMongo event %s.", event.event_id)
+            return self.browse()
+        self.env.ref('payment_paymongo.cron_process_webhook_events')._trigger()
+        return record
+
+    @api.model
+    def _cron_process_pending(self, batch_size=None, auto_commit=True):
+        """Drain the inbox in batches until no due event is left.
+
+        :param int batch_size: The number of events claimed per batch.
+        :param bool auto_commit: Whether to commit after each batch to release the row locks.
+        :return: None
+        """
+        batch_size = batch_size or get_config_param(
+            self.env, 'webhook_batch_size', const.WEBHOOK_BATCH_SIZE
+        )
+        while True:
+            events = self._claim_batch(batch_size)
+            if not events:
+                break
+            events._process_batch()
+            if not auto_commit:
+                break
+            self.env.cr.commit()
+
+    @api.model
+    def _claim_batch(self, limit):
+        """Lock and return the next due events, skipping those claimed by other workers.
+
+        :param int limit: The maximum number of events to claim.
+        :return: The claimed events.
+        :rtype: paymongo.webhook.event
+        """
+        self.env.cr.execute(SQL(
+            """
+            SELECT id
+              FROM paymongo_webhook_event
+             WHERE state = 'pending'
+               AND next_attempt_at <= (NOW() AT TIME ZONE 'UTC')
+          ORDER BY next_attempt_at, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+            """,
+            limit,
+        ))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _process_batch(self):
+        """Run the payment processing of these events, one transaction at a time.
+
+        Events are first resolved to their transaction. Each transaction is then locked with
+        `FOR UPDATE SKIP LOCKED` for the time its events are processed; the events of a transaction
+        that is busy in another worker are postponed shortly instead of racing it. The events of a
+        transaction are processed in the units returned by `_group_by_transition`: of the events
+        driving the same state transition, only the latest one is processed, the identifiers of
+        the others are saved on the transaction and they are marked as coalesced into it.
+
+        Errors are caught in a savepoint so that one broken unit does not roll back the rest of the
+        batch; its events are rescheduled with an exponential backoff instead.
+
+        :return: None
+        """
+        tx_model_sudo = self.env['payment.transaction'].sudo()
+        events_by_tx = defaultdict(list)  # {tx: [(event, payment_data)]}
+        for event in self:
+            start = time.perf_counter()
+            try:
+                with self.env.cr.savepoint():
+                    # Parsed once, then read by every hook of `_process`.
+                    payment_data = PaymongoEvent.parse(json.loads(event.raw_body))
+                    with metrics.timer('reference_lookup', **event._get_metric_labels()) as stage:
+                        tx_sudo = tx_model_sudo._search_by_reference('paymongo', payment_data)
+                        stage['outcome'] = 'found' if tx_sudo else 'missing'
+            except Exception as error:  # noqa: BLE001
+                event._schedule_retry(error)
+                continue
+            if tx_sudo:
+                events_by_tx[tx_sudo].append((event, payment_data))
+            else:
+                event._mark_done(tx_sudo, start)
+
+        for tx_sudo, tx_events in events_by_tx.items():
+            events = self.browse([event.id for event, _payment_data in tx_events])
+            if not tx_sudo._paymongo_lock('webhook'):
+                events._postpone()
+                continue
+
+            for group in self._group_by_transition(tx_events):
+                start = time.perf_counter()
+                event, payment_data = group[-1]
+                try:
+                    with self.env.cr.savepoint():
+                        with metrics.timer('process', **event._get_metric_labels()):
+                            tx_sudo._process('paymongo', payment_data)
+                            for _coalesced_event, coalesced_data in group[:-1]:
+                                tx_sudo._paymongo_save_identifiers(coalesced_data)
+                except Exception as error:  # noqa: BLE001
+                    for group_event, _payment_data in group:
+                        group_event._schedule_retry(error)
+                    continue
+                event._mark_done(tx_sudo, start)
+                if len(group) > 1:
+                    metrics.inc('paymongo_webhook_events_coalesced_total', len(group) - 1)
+                    for coalesced_event, _payment_data in group[:-1]:
+                        coalesced_event._mark_done(tx_sudo, start, coalesced_into=event)
+
+    @api.model
+    def _group_by_transition(self, tx_events):
+        """Split the events of one transaction into the units processed by `_process_batch`.
+
+        Events listed in `const.WEBHOOK_EVENT_PRECEDENCE` drive the state of the transaction: those
+        driving the same transition are coalesced into a single unit, and the units are ordered by
+        increasing precedence so that the most advanced state is applied last. Any other event
+        (refunds, intermediate statuses) is a unit of its own and comes first, in id order.
+
+        :param list tx_events: The `(event, payment_data)` pairs of one transaction.
+        :return: The units to process, each a list of pairs whose last one is processed.
+        :rtype: list
+        """
+        tx_events = sorted(tx_events, key=lambda entry: entry[0].id)
+        groups = []
+        events_by_precedence = defaultdict(list)
+        for event, payment_data in tx_events:
+            precedence = const.WEBHOOK_EVENT_PRECEDENCE.get(payment_data.event_type)
+            if precedence:
+                events_by_precedence[precedence].append((event, payment_data))
+            else:
+                groups.append([(event, payment_data)])
+        groups.extend(
+            events_by_precedence[precedence] for precedence in sorted(events_by_precedence)
+        )
+        return groups
+
+    def _get_metric_labels(self):
+        return {'provider': self.provider_id.id, 'event_type': self.event_type}
+
+    def _mark_done(self, tx_sudo, start, coalesced_into=None):
+        """Record that this event was handled.
+
+        :param payment.transaction tx_sudo: The transaction of the event, if any.
+        :param float start: The `perf_counter` value when the processing started.
+        :param paymongo.webhook.event coalesced_into: The event processed in place of this one.
+        :return: None
+        """
+        self.ensure_one()
+        if coalesced_into:
+            _logger.info(
+                "PayMongo event %s type=%s ref=%s coalesced into %s",
+                self.event_id, self.event_type, tx_sudo.reference, coalesced_into.event_id,
+            )
+        else:
+            _logger.info(
+                "PayMongo event %s type=%s ref=%s livemode=%s processed in %.1fms",
+                self.event_id, self.event_type, tx_sudo.reference, self.livemode,
+                (time.perf_counter() - start) * 1000,
+            )
+        self.write({
+            'state': 'done',
+            'attempts': self.attempts + 1,
+            'last_error': False,
+            'processed_at': fields.Datetime.now(),
+            'coalesced_into_id': coalesced_into and coalesced_into.id,
+        })
+
+    def _postpone(self):
+        """Retry these events shortly, without counting an attempt, as their transaction is busy.
+
+        :return: None
+        """
+        next_attempt_at = fields.Datetime.now() + timedelta(seconds=const.WEBHOOK_LOCK_RETRY_DELAY)
+        self.write({'next_attempt_at': next_attempt_at})
+        self.env.ref('payment_paymongo.cron_process_webhook_events')._trigger(at=next_attempt_at)
+
+    def _schedule_retry(self, error):
+        """Reschedule this event after a processing error, or give up after too many attempts.
+
+        :param Exception error: The error raised while processing the event.
+        :return: None
+        """
+        self.ensure_one()
+        attempts = self.attempts + 1
+        max_attempts = get_config_param(
+            self.env, 'webhook_max_attempts', const.WEBHOOK_MAX_ATTEMPTS
+        )
+        if attempts >= max_attempts:
+            _logger.error(
+                "Giving up on PayMongo event %s after %s attempts: %s", self.event_id, attempts, error
+            )
+            self.write({
+                'state': 'failed',
+                'attempts': attempts,
+                'last_error': str(error),
+                'processed_at': fields.Datetime.now(),
+            })
+            return
+
+        delay = min(
+            const.WEBHOOK_RETRY_BASE_DELAY * 2 ** (attempts - 1), const.WEBHOOK_RETRY_MAX_DELAY
+        )
+        _logger.warning(
+            "Processing of PayMongo event %s failed (attempt %s), retrying in %ss: %s",
+            self.event_id, attempts, delay, error,
+        )
+        self.write({
+            'attempts': attempts,
+            'last_error': str(error),
+            'next_attempt_at': fields.Datetime.now() + timedelta(seconds=delay),
+        })
+
+    @api.model
+    def _cron_prune_processed(self, chunk_size=5000, auto_commit=True):
+        """Delete handled events older than the retention window, in chunks.
+
+        Once pruned, a redelivery of the same event would be processed again; the retention
+        window must therefore exceed PayMongo's retry period.
+
+        :param int chunk_size: The number of rows deleted per statement.
+        :param bool auto_commit: Whether to commit after each chunk.
+        :return: None
+        """
+        retention_days = get_config_param(
+            self.env, 'event_retention_days', const.WEBHOOK_EVENT_RETENTION_DAYS
+        )
+        limit_date = fields.Datetime.now() - timedelta(days=retention_days)
+        while True:
+            self.env.cr.execute(SQL(
+                """
+                DELETE FROM paymongo_webhook_event
+                 WHERE id IN (
+                    SELECT id
+                      FROM paymongo_webhook_event
+                     WHERE state != 'pending'
+                       AND processed_at < %s
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED
+                 )
+                """,
+                limit_date, chunk_size,
+            ))
+            deleted = self.env.cr.rowcount
+            if auto_commit:
+                self.env.cr.commit()
+            if deleted < chunk_size:
+                break
@@ -0,0 +1,44 @@
+/* payment_paymongo/static/src/js/paymongo_status.js
+ *
+ * Poll the JSON status endpoint of a PayMongo transaction and move on to the generic payment
+ * status page as soon as the webhook has confirmed the final state. The endpoint answers at once
+ * rather than long-polling (see `paymongo_status`), so polls are spaced out, and more so once the
+ * customer has been waiting for a while.
+ */
+(function () {
+    "use strict";
+
+    const MAX_DURATION = 15 * 60 * 1000; // Stop waiting after 15 minutes.
+    const POLL_INTERVAL = 3000;
+    const SLOW_POLL_INTERVAL = 10000; // After SLOW_POLL_AFTER.
+    const SLOW_POLL_AFTER = 2 * 60 * 1000;
+
+    const root = document.getElementById("paymongo_status");
+    const statusUrl = root.dataset.statusUrl;
+    const doneUrl = root.dataset.doneUrl;
+    const startedAt = Date.now();
+
+    const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+    async function poll() {
+        while (Date.now() - startedAt < MAX_DURATION) {
+            try {
+                const response = await fetch(statusUrl, {
+                    credentials: "same-origin",
+                    cache: "no-store",
+                });
+                if (response.ok && (await response.json()).final) {
+                    break;
+                }
+            } catch {
+                // Network hiccup: try again at the next interval.
+            }
+            await sleep(
+                Date.now() - startedAt < SLOW_POLL_AFTER ? POLL_INTERVAL : SLOW_POLL_INTERVAL
+            );
+        }
+        window.location.assign(doneUrl);
+    }
+
+    poll();
+})();
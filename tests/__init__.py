@@ -0,0 +1,15 @@
+from . import test_circuit_breaker
+from . import test_expire_stale
+from . import test_http_session
+from . import test_line_items
+from . import test_metrics
+from . import test_paymongo_event
+from . import test_payout_import
+from . import test_precreate_checkout
+from . import test_provisioning
+from . import test_rate_bucket
+from . import test_refund_batch
+from . import test_search_by_reference
+from . import test_webhook_archive
+from . import test_webhook_inbox
+from . import test_webhook_secrets
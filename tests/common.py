@@ -0,0 +1,38 @@
+# payment_paymongo/tests/common.py
+from odoo.addons.account_payment.tests.common import AccountPaymentCommon
+from odoo.addons.payment.tests.common import PaymentCommon
+from odoo.addons.payment_paymongo.benchmarks.paymongo_bench import MockPaymongoServer
+
+
+class PaymongoCommon(PaymentCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.paymongo = cls._prepare_provider('paymongo', update_values={
+            'paymongo_secret_key': 'sk_test_paymongo',
+            'paymongo_webhook_secret': 'whsk_test_paymongo',
+        })
+        cls.provider = cls.paymongo
+        # The rate limiter commits its buckets in its own cursor; keep it out of the tests.
+        cls.env['ir.config_parameter'].set_param('payment_paymongo.rate_limit_per_second', '0')
+
+    def setUp(self):
+        super().setUp()
+        self.server = self.enterContext(MockPaymongoServer())
+        self.env['ir.config_parameter'].set_param('payment_paymongo.api_url', self.server.url)
+
+
+class PaymongoAccountCommon(PaymongoCommon, AccountPaymentCommon):
+    """PayMongo tests involving invoices and payments, on a company with a chart of accounts."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.bank_journal = cls.company_data['default_journal_bank']
+        cls.paymongo.journal_id = cls.bank_journal
+
+    def _create_invoice(self, amount=100.0, **kwargs):
+        return self.init_invoice(
+            'out_invoice', partner=self.partner, amounts=[amount], post=True, **kwargs
+        )
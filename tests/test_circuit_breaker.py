@@ -0,0 +1,35 @@
+# payment_paymongo/tests/test_circuit_breaker.py
+from odoo.tests import tagged
+
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCircuitBreaker(PaymongoCommon):
+
+    def setUp(self):
+        super().setUp()
+        # A lock conflict must fail the test rather than hang it.
+        self.env.cr.execute("SET LOCAL lock_timeout = '5s'")
+
+    def test_failure_recorded_after_creating_a_transaction(self):
+        """ Test that recording a failure does not wait on the lock taken by inserting a
+        transaction of the provider in the same request. """
+        self._create_transaction('redirect', reference='CB0001')
+        self.paymongo._paymongo_circuit_record(failures=1)
+        self.assertEqual(self.paymongo.paymongo_circuit_failures, 1)
+        self.assertEqual(self.paymongo.paymongo_circuit_state, 'closed')
+
+    def test_circuit_opens_then_closes_after_a_successful_probe(self):
+        self.env['ir.config_parameter'].set_param('payment_paymongo.circuit_failure_threshold', '3')
+        self._create_transaction('redirect', reference='CB0002')
+        self.paymongo._paymongo_circuit_record(successes=1, failures=2)
+        self.assertEqual(self.paymongo.paymongo_circuit_state, 'closed')
+        self.paymongo._paymongo_circuit_record(failures=1)
+        self.assertEqual(self.paymongo.paymongo_circuit_state, 'open')
+        self.assertTrue(self.paymongo.paymongo_circuit_opened_at)
+
+        self.paymongo.sudo().paymongo_circuit_state = 'half_open'
+        self.paymongo._paymongo_circuit_record(successes=1)
+        self.assertEqual(self.paymongo.paymongo_circuit_state, 'closed')
+        self.assertEqual(self.paymongo.paymongo_circuit_failures, 0)
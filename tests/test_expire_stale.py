@@ -0,0 +1,107 @@
+# payment_paymongo/tests/test_expire_stale.py
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tools import SQL
+
+from odoo.addons.payment import utils as payment_utils
+from odoo.addons.payment_paymongo import const
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestExpireStale(PaymongoCommon):
+
+    def _age(self, txs, hours):
+        """ Backdate the creation of the transactions, as the sweep reads it from the database. """
+        txs.flush_recordset()
+        self.env.cr.execute(SQL(
+            "UPDATE payment_transaction SET create_date = %s WHERE id IN %s",
+            fields.Datetime.now() - timedelta(hours=hours), tuple(txs.ids),
+        ))
+
+    def _make_session(self, tx, status, paid=False):
+        payments = [{'id': f'pay_{tx.reference}', 'attributes': {
+            'status': 'paid',
+            'amount': payment_utils.to_minor_currency_units(tx.amount, tx.currency_id),
+            'currency': tx.currency_id.name,
+        }}] if paid else []
+        return {'data': {'id': tx.paymongo_checkout_session_id, 'attributes': {
+            'status': status,
+            'metadata': {'odoo_tx_ref': tx.reference},
+            'payments': payments,
+        }}}
+
+    def test_stale_transactions_are_canceled_by_chunks(self):
+        """ Test that only the transactions that never reached PayMongo are canceled, whatever the
+        number of chunks. """
+        stale_txs = self._create_transaction('redirect', reference='X0001') \
+            + self._create_transaction('redirect', reference='X0002', state='pending')
+        session_tx = self._create_transaction(
+            'redirect', reference='X0003', paymongo_checkout_session_id='cs_x0003'
+        )
+        intent_tx = self._create_transaction(
+            'direct', reference='X0004', paymongo_payment_intent_id='pi_x0004'
+        )
+        refund_tx = self._create_transaction('redirect', reference='X0005', state='done') \
+            ._create_child_transaction(1.0, is_refund=True)
+        recent_tx = self._create_transaction('redirect', reference='X0006')
+        self._age(stale_txs + session_tx + intent_tx + refund_tx, const.SWEEP_MAX_AGE + 1)
+
+        self.env['payment.transaction']._cron_paymongo_expire_stale(
+            chunk_size=1, auto_commit=False
+        )
+
+        self.assertEqual(set(stale_txs.mapped('state')), {'cancel'})
+        self.assertTrue(all(stale_txs.mapped('state_message')))
+        self.assertEqual(session_tx.state, 'draft')
+        self.assertEqual(intent_tx.state, 'draft')
+        self.assertEqual(refund_tx.state, 'draft')
+        self.assertEqual(recent_tx.state, 'draft')
+        self.assertEqual(self.server.requests, 0, "No session expired, nothing is checked.")
+
+    def test_expired_sessions_are_settled_from_paymongo(self):
+        """ Test that a paid session whose webhook was lost is confirmed rather than canceled,
+        and that sessions still open on PayMongo's side are left untouched. """
+        expired_at = fields.Datetime.now() - timedelta(minutes=const.SWEEP_GRACE_PERIOD + 60)
+        paid_tx, expired_tx, open_tx = (
+            self._create_transaction(
+                'redirect',
+                reference=reference,
+                state='pending',
+                paymongo_checkout_session_id=f'cs_{reference.lower()}',
+                paymongo_checkout_expires_at=expired_at,
+            )
+            for reference in ('Y0001', 'Y0002', 'Y0003')
+        )
+        sessions = {
+            paid_tx.paymongo_checkout_session_id: self._make_session(paid_tx, 'active', paid=True),
+            expired_tx.paymongo_checkout_session_id: self._make_session(expired_tx, 'expired'),
+            open_tx.paymongo_checkout_session_id: self._make_session(open_tx, 'active'),
+        }
+        requests = []
+
+        def send_concurrent_requests(_provider, request_args, with_outcome=False):
+            requests.extend(request_args)
+            return [(sessions[path.split('/')[-1]], None) for _method, path, _data in request_args]
+
+        with patch.object(
+            type(self.provider), '_paymongo_send_concurrent_requests',
+            autospec=True, side_effect=send_concurrent_requests,
+        ):
+            self.env['payment.transaction']._cron_paymongo_expire_stale(auto_commit=False)
+
+        self.assertEqual(paid_tx.state, 'done')
+        self.assertEqual(paid_tx.paymongo_payment_id, f'pay_{paid_tx.reference}')
+        self.assertEqual(expired_tx.state, 'cancel')
+        self.assertEqual(open_tx.state, 'pending')
+        self.assertEqual(
+            [method for method, _path, _data in requests], ['GET'] * 3,
+            "Open sessions are not expired on PayMongo unless configured to.",
+        )
+        self.assertEqual(
+            self.env['ir.config_parameter'].get_param('payment_paymongo.sweep_cursor'), '0',
+            "The cursor wraps around once all the expired sessions were checked.",
+        )
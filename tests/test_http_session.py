@@ -0,0 +1,52 @@
+# payment_paymongo/tests/test_http_session.py
+import time
+from unittest.mock import patch
+
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from odoo.addons.payment_paymongo.models.payment_provider import PaymentProvider
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestHttpSession(PaymongoCommon):
+
+    def setUp(self):
+        super().setUp()
+        # Keep the retries of the tests fast; `Retry-After` is still honoured.
+        self.env['ir.config_parameter'].set_param('payment_paymongo.http_backoff_factor', '0.01')
+
+    def test_connections_are_reused(self):
+        """ Test that consecutive API calls share the keep-alive connections of the worker. """
+        for _i in range(20):
+            self.paymongo._send_api_request('GET', 'v1/checkout_sessions/cs_test')
+        self.assertEqual(self.server.requests, 20)
+        self.assertLess(len(self.server.connections), 20)
+
+    def test_server_errors_are_retried(self):
+        """ Test that 5xx responses of idempotent calls are retried until they succeed. """
+        self.server.fail_next(503, count=2)
+        response = self.paymongo._send_api_request('GET', 'v1/checkout_sessions/cs_test')
+        self.assertTrue(response['data']['id'])
+        self.assertEqual(self.server.requests, 3)
+
+    def test_retry_after_is_honoured(self):
+        """ Test that a 429 is retried once the delay of its `Retry-After` header has elapsed. """
+        self.server.fail_next(429, retry_after=1)
+        start = time.monotonic()
+        response = self.paymongo._send_api_request('GET', 'v1/checkout_sessions/cs_test')
+        self.assertGreaterEqual(time.monotonic() - start, 1)
+        self.assertTrue(response['data']['id'])
+        self.assertEqual(self.server.requests, 2)
+
+    def test_post_is_not_retried_on_server_error(self):
+        """ Test that a POST answered with a 5xx is not sent again, since it may have been applied.
+        """
+        self.server.fail_next(503)
+        with (
+            patch.object(PaymentProvider, '_paymongo_circuit_record'),
+            self.assertRaises(ValidationError),
+        ):
+            self.paymongo._send_api_request('POST', 'v1/checkout_sessions', json={})
+        self.assertEqual(self.server.requests, 1)
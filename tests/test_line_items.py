@@ -0,0 +1,64 @@
+# payment_paymongo/tests/test_line_items.py
+from odoo.fields import Command
+from odoo.tests import tagged
+
+from odoo.addons.payment_paymongo.tests.common import PaymongoAccountCommon, PaymongoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestLineItems(PaymongoCommon):
+
+    def setUp(self):
+        super().setUp()
+        currency_php = self.env.ref('base.PHP')
+        currency_php.active = True
+        self.tx = self._create_transaction('redirect', amount=112.0, currency_id=currency_php.id)
+
+    def _item(self, amount, quantity=1):
+        return {'name': "Item", 'quantity': quantity, 'amount': amount, 'currency': 'PHP'}
+
+    def test_items_matching_the_amount_are_kept(self):
+        items = [self._item(5000, quantity=2), self._item(1200)]
+        self.assertEqual(self.tx._paymongo_check_line_items_total(items), items)
+
+    def test_items_not_matching_the_amount_fall_back_to_the_total(self):
+        """ Test that untaxed or partially paid items are replaced by one item of the amount. """
+        for items in (
+            [self._item(10000)],
+            [self._item(20000)],
+            [self._item(12200), self._item(-1000)],
+        ):
+            checked = self.tx._paymongo_check_line_items_total(items)
+            self.assertEqual(len(checked), 1)
+            self.assertEqual(checked[0]['amount'], 11200)
+            self.assertEqual(checked[0]['quantity'], 1)
+
+
+@tagged('post_install', '-at_install')
+class TestInvoiceLineItems(PaymongoAccountCommon):
+
+    def test_invoices_beyond_the_limit_are_folded_by_amount_due(self):
+        """ Test that the largest amounts due of partially paid invoices keep their own item. """
+        self.env['ir.config_parameter'].set_param('payment_paymongo.line_item_limit', '3')
+        currency_php = self.env.ref('base.PHP')
+        currency_php.active = True
+        invoices = self.env['account.move'].concat(*(
+            self._create_invoice(amount=amount, currency=currency_php)
+            for amount in (10.0, 50.0, 20.0, 40.0, 30.0)
+        ))
+        self.env['account.payment.register'].with_context(
+            active_model='account.move', active_ids=invoices[1].ids
+        ).create({'amount': 15.0})._create_payments()
+        self.assertEqual(invoices[1].amount_residual, 35.0)
+
+        tx = self._create_transaction(
+            'redirect',
+            amount=sum(invoices.mapped('amount_residual')),
+            currency_id=currency_php.id,
+            invoice_ids=[Command.set(invoices.ids)],
+        )
+        items = tx._paymongo_build_line_items()
+        self.assertEqual(
+            [(item['name'], item['amount']) for item in items],
+            [(invoices[1].name, 3500), (invoices[3].name, 4000), ("Other invoices", 6000)],
+        )
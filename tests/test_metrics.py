@@ -0,0 +1,30 @@
+# payment_paymongo/tests/test_metrics.py
+from odoo.tests import tagged
+
+from odoo.addons.payment_paymongo import metrics
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestMetrics(PaymongoCommon):
+
+    def test_flushed_samples_add_up_across_workers(self):
+        Metric = self.env['paymongo.metric']
+        metrics.inc('paymongo_test_total', 2, source='cron')
+        Metric._flush()
+        metrics.inc('paymongo_test_total', 3, source='cron')  # Another flush, e.g. another worker.
+        metrics.observe('paymongo_test_seconds', 0.2, stage='test')
+
+        rendered = Metric._render()
+        self.assertIn('# TYPE paymongo_test_total counter', rendered)
+        self.assertIn('paymongo_test_total{source="cron"} 5.0', rendered)
+        self.assertIn('paymongo_test_seconds_bucket{stage="test",le="0.1"} 0.0', rendered)
+        self.assertIn('paymongo_test_seconds_bucket{stage="test",le="0.25"} 1.0', rendered)
+        self.assertIn('paymongo_test_seconds_count{stage="test"} 1.0', rendered)
+
+    def test_circuit_state_is_read_from_the_provider(self):
+        self.provider.paymongo_circuit_state = 'open'
+        self.assertIn(
+            f'paymongo_circuit_state{{provider="{self.provider.id}"}} 2',
+            self.env['paymongo.metric']._render(),
+        )
@@ -0,0 +1,115 @@
+# payment_paymongo/tests/test_paymongo_event.py
+from odoo.tests import tagged
+
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+from odoo.addons.payment_paymongo.utils import PaymongoEvent
+
+
+@tagged('post_install', '-at_install')
+class TestPaymongoEvent(PaymongoCommon):
+
+    def _make_envelope(self, resource_id, event_type='checkout_session.payment.paid', **attributes):
+        return {'data': {'id': 'evt_1', 'type': 'event', 'attributes': {
+            'type': event_type,
+            'livemode': False,
+            'data': {'id': resource_id, 'attributes': attributes},
+        }}}
+
+    def test_strict_parsing_rejects_malformed_envelopes(self):
+        envelope = self._make_envelope('cs_1')
+        no_id = self._make_envelope('cs_1')
+        del no_id['data']['id']
+        no_type = self._make_envelope('cs_1')
+        del no_type['data']['attributes']['type']
+        malformed_payloads = [
+            ['not', 'an', 'object'],
+            {},
+            {'data': 'evt_1'},
+            no_id,
+            no_type,
+            self._make_envelope(None),
+            self._make_envelope('cs_1', payments='pay_1'),
+        ]
+        for payload in malformed_payloads:
+            with self.subTest(payload=payload), self.assertRaises(ValueError):
+                PaymongoEvent.parse(payload, strict=True)
+        self.assertEqual(PaymongoEvent.parse(envelope, strict=True).event_id, 'evt_1')
+
+    def test_lenient_parsing_leaves_malformed_fields_empty(self):
+        event = PaymongoEvent.parse({'data': 'evt_1'})
+        self.assertEqual(event, {'data': 'evt_1'}, "The original payload is kept.")
+        self.assertTrue(all(getattr(event, name) is None for name in PaymongoEvent.__slots__))
+
+    def test_identifiers_of_a_checkout_session(self):
+        event = PaymongoEvent.parse(self._make_envelope(
+            'cs_1',
+            reference_number='PM-1',
+            metadata={'odoo_tx_ref': 'S0001'},
+            payment_intent={'id': 'pi_1'},
+            payments=[{'id': 'pay_1'}, {'id': 'pay_2'}],
+        ))
+        self.assertEqual(event.event_type, 'checkout_session.payment.paid')
+        self.assertEqual(event.reference, 'S0001')
+        self.assertEqual(event.paymongo_reference, 'PM-1')
+        self.assertEqual(event.session_id, 'cs_1')
+        self.assertEqual(event.payment_intent_id, 'pi_1')
+        self.assertEqual(event.payment_id, 'pay_1', "The first payment is the one of the session.")
+        self.assertIsNone(event.refund_id)
+
+    def test_identifiers_of_other_resources(self):
+        payment = PaymongoEvent.parse(self._make_envelope(
+            'pay_1', 'payment.paid', payment_intent_id='pi_1', metadata={'paymongo_ref': 'PM-1'}
+        ))
+        self.assertEqual(
+            (payment.session_id, payment.payment_intent_id, payment.payment_id),
+            (None, 'pi_1', 'pay_1'),
+        )
+        self.assertEqual(payment.paymongo_reference, 'PM-1')
+
+        intent = PaymongoEvent.parse(self._make_envelope('pi_1', 'payment_intent.succeeded'))
+        self.assertEqual((intent.payment_intent_id, intent.payment_id), ('pi_1', None))
+
+        refund = PaymongoEvent.parse(self._make_envelope(
+            'pay_1', 'payment.refunded',
+            refunds=[{'id': 'ref_1', 'attributes': {'status': 'succeeded'}}, {'id': 'ref_2'}],
+        ))
+        self.assertEqual(refund.refund_statuses, {'ref_1': 'succeeded', 'ref_2': None})
+        refund = PaymongoEvent.parse(self._make_envelope('ref_1', 'refund.updated'))
+        self.assertEqual((refund.refund_id, refund.payment_id), ('ref_1', None))
+
+    def test_amount_by_order_of_preference(self):
+        payment = {'id': 'pay_1', 'attributes': {'amount': 1000, 'currency': 'PHP'}}
+        intent = {'id': 'pi_1', 'attributes': {'amount': 2000, 'currency': 'USD'}}
+        line_items = [
+            {'quantity': 2, 'amount': 1500, 'currency': 'PHP'},
+            {'amount': 500},
+        ]
+
+        event = PaymongoEvent.parse(self._make_envelope(
+            'pay_2', 'payment.paid', amount='3000', currency='EUR', payments=[payment]
+        ))
+        self.assertEqual((event.amount_minor, event.currency), (3000, 'EUR'))
+        event = PaymongoEvent.parse(self._make_envelope(
+            'cs_1', amount=3000, payments=[payment], payment_intent=intent, line_items=line_items
+        ))
+        self.assertEqual(
+            (event.amount_minor, event.currency), (1000, 'PHP'),
+            "The amount of a session is not its own, but the one of its payment.",
+        )
+        event = PaymongoEvent.parse(self._make_envelope(
+            'cs_1', payment_intent=intent, line_items=line_items
+        ))
+        self.assertEqual((event.amount_minor, event.currency), (2000, 'USD'))
+        event = PaymongoEvent.parse(self._make_envelope('cs_1', line_items=line_items))
+        self.assertEqual((event.amount_minor, event.currency), (3500, 'PHP'))
+        event = PaymongoEvent.parse(self._make_envelope('cs_1'))
+        self.assertEqual((event.amount_minor, event.currency), (None, None))
+
+    def test_parsed_events_are_not_parsed_again(self):
+        event = PaymongoEvent.parse(self._make_envelope('cs_1', metadata={'odoo_tx_ref': 'S1'}))
+        event['data']['attributes']['data']['id'] = 'pay_1'
+        for strict in (False, True):
+            reparsed = PaymongoEvent.parse(event, strict=strict)
+            self.assertIs(reparsed, event)
+            self.assertEqual(reparsed.session_id, 'cs_1')
+            self.assertEqual(reparsed.reference, 'S1')
@@ -0,0 +1,108 @@
+# payment_paymongo/tests/test_payout_import.py
+import base64
+import io
+import json
+from datetime import date
+
+from odoo.exceptions import ValidationError
+from odoo.fields import Command
+from odoo.tests import tagged
+
+from odoo.addons.payment import utils as payment_utils
+from odoo.addons.payment_paymongo.tests.common import PaymongoAccountCommon
+from odoo.addons.payment_paymongo.wizard.paymongo_payout_import_wizard import (
+    _iter_json_rows,
+    _normalize_row,
+)
+
+
+@tagged('post_install', '-at_install')
+class TestPayoutImport(PaymongoAccountCommon):
+
+    def test_json_array_is_read_across_buffer_boundaries(self):
+        rows = [{'id': f'bal_{index}', 'description': 'x' * 20} for index in range(5)]
+        stream = io.StringIO(json.dumps(rows))
+        self.assertEqual(list(_iter_json_rows(stream, chunk_size=8)), rows)
+
+    def test_json_lines_are_read_one_by_one(self):
+        rows = [{'id': f'bal_{index}'} for index in range(3)]
+        stream = io.StringIO('\n'.join(json.dumps(row) for row in rows) + '\n\n')
+        self.assertEqual(list(_iter_json_rows(stream, chunk_size=5)), rows)
+
+    def test_invalid_json_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            list(_iter_json_rows(io.StringIO('[{"id": "bal_1"}, {"id": }]'), chunk_size=8))
+
+    def test_normalize_api_object_in_minor_units(self):
+        entry = _normalize_row({'id': 'bal_1', 'attributes': {
+            'net_amount': 125050,
+            'amount': 130000,
+            'created_at': 1700000000,
+            'source': {'id': 'pay_1', 'type': 'payment'},
+            'metadata': {'odoo_tx_ref': 'S0001'},
+            'description': 'Payment',
+        }}, minor_units=True, digits=2)
+        self.assertEqual(entry, {
+            'id': 'bal_1',
+            'date': date(2023, 11, 14),
+            'amount': 1250.5,
+            'payment_id': 'pay_1',
+            'payment_intent_id': None,
+            'reference': 'S0001',
+            'label': 'Payment',
+        })
+
+    def test_normalize_csv_row(self):
+        entry = _normalize_row({
+            'Transaction ID': 'bal_2',
+            'Net Amount': '1,250.50',
+            'Date': '2024-01-31 10:00:00',
+            'Reference Number': 'S0002',
+        }, minor_units=False, digits=2)
+        self.assertEqual(entry['id'], 'bal_2')
+        self.assertEqual(entry['amount'], 1250.5)
+        self.assertEqual(entry['date'], date(2024, 1, 31))
+        self.assertEqual(entry['reference'], 'S0002')
+        self.assertIsNone(_normalize_row(
+            {'Transaction ID': 'bal_3', 'Net Amount': '1.00'}, minor_units=False, digits=2
+        ), "Rows without a date are skipped.")
+
+    def _import(self, rows):
+        wizard = self.env['paymongo.payout.import.wizard'].create({
+            'journal_id': self.bank_journal.id,
+            'data_file': base64.b64encode('\n'.join(json.dumps(row) for row in rows).encode()),
+            'filename': 'payouts.jsonl',
+        })
+        wizard.action_import()
+
+    def test_matched_row_is_reconciled_and_imported_once(self):
+        invoice = self._create_invoice(amount=100.0)
+        tx = self._create_transaction(
+            'redirect',
+            reference='P0001',
+            amount=invoice.amount_total,
+            currency_id=invoice.currency_id.id,
+            partner_id=invoice.partner_id.id,
+            invoice_ids=[Command.set(invoice.ids)],
+            paymongo_payment_id='pay_p0001',
+        )
+        tx._set_done()
+        tx._post_process()
+        self.assertTrue(tx.payment_id)
+        row = {'id': 'bal_p0001', 'attributes': {
+            'amount': payment_utils.to_minor_currency_units(tx.amount, tx.currency_id),
+            'created_at': '2026-01-15',
+            'source': {'id': 'pay_p0001'},
+        }}
+
+        self._import([row])
+        statement_line = self.env['account.bank.statement.line'].search(
+            [('unique_import_id', '=', f'paymongo-{self.bank_journal.id}-bal_p0001')]
+        )
+        self.assertEqual(statement_line.partner_id, tx.partner_id)
+        self.assertTrue(statement_line.is_reconciled)
+
+        self._import([row])
+        self.assertEqual(self.env['account.bank.statement.line'].search_count(
+            [('unique_import_id', '=', f'paymongo-{self.bank_journal.id}-bal_p0001')]
+        ), 1)
@@ -0,0 +1,116 @@
+# payment_paymongo/tests/test_precreate_checkout.py
+from contextlib import closing
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from odoo import SUPERUSER_ID, api, sql_db
+from odoo.tests import tagged
+
+from odoo.addons.payment.tests.http_common import PaymentHttpCommon
+from odoo.addons.payment_paymongo.tests.common import PaymongoAccountCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPrecreateCheckout(PaymongoAccountCommon, PaymentHttpCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.paymongo.write({
+            'paymongo_precreate_checkout': True,
+            'paymongo_checkout_mode': 'hosted',
+        })
+        cls.currency_php = cls.env.ref('base.PHP')
+        cls.currency_php.active = True
+
+    def _get_pay_path(self, invoice):
+        url = urlsplit(invoice._paymongo_get_pay_url())
+        return f'{url.path}?{url.query}'
+
+    def test_posting_queues_the_checkout_of_php_invoices(self):
+        invoice = self._create_invoice(amount=100.0, currency=self.currency_php)
+        other_invoice = self._create_invoice(amount=100.0)
+        self.assertTrue(invoice.paymongo_checkout_queued_at)
+        self.assertFalse(other_invoice.paymongo_checkout_queued_at, "PayMongo only takes PHP.")
+        self.assertEqual(self.server.requests, 0, "Posting never waits on PayMongo.")
+
+        self.env['account.move']._cron_paymongo_precreate_checkouts(auto_commit=False)
+
+        self.assertFalse(invoice.paymongo_checkout_queued_at)
+        tx = invoice.paymongo_transaction_id
+        self.assertEqual(tx.invoice_ids, invoice)
+        self.assertEqual(tx.amount, invoice.amount_residual)
+        self.assertTrue(tx.paymongo_checkout_session_id)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_claim_skips_invoices_locked_by_another_worker(self):
+        """ Test that an invoice locked by a worker is skipped, not waited for, by the others. """
+        # Concurrent workers need committed rows and their own connections.
+        dbname = self.env.cr.dbname
+        with closing(sql_db.db_connect(dbname).cursor()) as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            journal = env['account.journal'].create({
+                'name': "PayMongo Claims",
+                'code': 'PMCLM',
+                'type': 'general',
+                'company_id': env.ref('base.main_company').id,
+            })
+            moves = env['account.move'].create([{
+                'journal_id': journal.id,
+                'paymongo_checkout_queued_at': datetime(2000, 1, 1),
+            } for _i in range(2)])
+            journal_id, move_ids = journal.id, moves.ids
+            cr.commit()
+
+        def cleanup():
+            with closing(sql_db.db_connect(dbname).cursor()) as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                env['account.move'].browse(move_ids).unlink()
+                env['account.journal'].browse(journal_id).unlink()
+                cr.commit()
+        self.addCleanup(cleanup)
+
+        with closing(sql_db.db_connect(dbname).cursor()) as busy_cr, \
+                closing(sql_db.db_connect(dbname).cursor()) as claim_cr:
+            busy_cr.execute("SET LOCAL lock_timeout = '5s'")
+            busy_cr.execute("SELECT id FROM account_move WHERE id = %s FOR UPDATE", [move_ids[0]])
+            claim_cr.execute("SET LOCAL lock_timeout = '5s'")
+            claimed = api.Environment(claim_cr, SUPERUSER_ID, {})[
+                'account.move'
+            ]._paymongo_claim_queued_checkouts(100)
+            self.assertEqual(set(claimed.ids) & set(move_ids), {move_ids[1]})
+            busy_cr.rollback()
+            claim_cr.rollback()
+
+    def test_pay_link_rejects_a_bad_access_token(self):
+        invoice = self._create_invoice(amount=100.0, currency=self.currency_php)
+        for query in ('', '?access_token=bad'):
+            response = self.url_open(
+                f'/payment/paymongo/pay/{invoice.id}{query}', allow_redirects=False
+            )
+            self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.server.requests, 0)
+
+    def test_pay_link_replaces_the_checkout_when_the_amount_due_changed(self):
+        invoice = self._create_invoice(amount=100.0, currency=self.currency_php)
+        self.env['account.move']._cron_paymongo_precreate_checkouts(auto_commit=False)
+        precreated_tx = invoice.paymongo_transaction_id
+
+        response = self.url_open(self._get_pay_path(invoice), allow_redirects=False)
+        self.assertEqual(response.status_code, 303)
+        self.assertEqual(response.headers['Location'], precreated_tx.paymongo_checkout_url)
+        self.assertEqual(self.server.requests, 1, "The pre-created checkout is reused.")
+
+        self.env['account.payment.register'].with_context(
+            active_model='account.move', active_ids=invoice.ids
+        ).create({'amount': 40.0})._create_payments()
+        self.assertEqual(invoice.amount_residual, 60.0)
+
+        response = self.url_open(self._get_pay_path(invoice), allow_redirects=False)
+        invoice.invalidate_recordset()
+        tx = invoice.paymongo_transaction_id
+        self.assertNotEqual(tx, precreated_tx)
+        self.assertEqual(tx.amount, 60.0)
+        self.assertEqual(response.status_code, 303)
+        self.assertEqual(response.headers['Location'], tx.paymongo_checkout_url)
+        self.assertEqual(self.server.requests, 2)
@@ -0,0 +1,38 @@
+# payment_paymongo/tests/test_provisioning.py
+from odoo.fields import Command
+from odoo.tests import tagged
+
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestProvisioning(PaymongoCommon):
+
+    def test_provision_sets_the_secrets_of_each_company(self):
+        companies = self.env['res.company'].create([
+            {'name': "PayMongo Company A"}, {'name': "PayMongo Company B"},
+        ])
+        wizard = self.env['paymongo.provisioning.wizard'].create({'line_ids': [
+            Command.create({
+                'company_id': company.id,
+                'paymongo_secret_key': f'sk_test_{company.id}',
+                'paymongo_webhook_secret': f'whsk_test_{company.id}',
+            }) for company in companies
+        ]})
+        providers = self.env['payment.provider'].search(wizard.action_provision()['domain'])
+        self.assertEqual(providers.company_id, companies)
+
+        # Provisioning again updates the existing providers with their own secrets.
+        self.env['payment.provider']._paymongo_provision([{
+            'company_id': company.id,
+            'paymongo_secret_key': f'sk_live_{company.id}',
+            'paymongo_webhook_secret': f'whsk_live_{company.id}',
+            'state': 'enabled',
+        } for company in companies])
+        for provider in providers:
+            self.assertEqual(provider.state, 'enabled')
+            self.assertEqual(provider.paymongo_secret_key, f'sk_live_{provider.company_id.id}')
+            self.assertEqual(
+                provider.paymongo_webhook_secret, f'whsk_live_{provider.company_id.id}'
+            )
+            self.assertTrue(provider.journal_id)
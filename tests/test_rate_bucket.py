@@ -0,0 +1,91 @@
+# payment_paymongo/tests/test_rate_bucket.py
+import hashlib
+
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+from odoo.tools import SQL
+
+from odoo.addons.payment_paymongo import const
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRateBucket(PaymongoCommon):
+
+    def setUp(self):
+        super().setUp()
+        # The limiter is disabled for the rest of the suite, see `PaymongoCommon`.
+        for key, value in (('rate_limit_per_second', '10'), ('rate_limit_burst', '20')):
+            self.env['ir.config_parameter'].set_param(f'payment_paymongo.{key}', value)
+        self.Bucket = self.env['paymongo.rate.bucket']
+
+    def _set_bucket(self, secret_key, tokens, age=0.0):
+        """ Fill the bucket of the secret key as of `age` seconds ago.
+
+        NOW() does not move within the test transaction, so refills are simulated by aging the
+        bucket instead of waiting.
+        """
+        key = hashlib.sha256(secret_key.encode()).hexdigest()
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO paymongo_rate_bucket (key, tokens, updated_at)
+                 VALUES (%(key)s, %(tokens)s,
+                         (NOW() AT TIME ZONE 'UTC') - %(age)s * INTERVAL '1 second')
+            ON CONFLICT (key) DO UPDATE
+                    SET tokens = EXCLUDED.tokens, updated_at = EXCLUDED.updated_at
+            """,
+            key=key, tokens=tokens, age=age,
+        ))
+        return key
+
+    def _get_tokens(self, key):
+        self.env.cr.execute(SQL("SELECT tokens FROM paymongo_rate_bucket WHERE key = %s", key))
+        return self.env.cr.fetchone()[0]
+
+    def test_bucket_refills_with_elapsed_time(self):
+        key = self._set_bucket('sk_refill', tokens=0.0, age=0.5)
+        self.assertIsNone(self.Bucket._take_token(key, 10.0, 20.0, 0.0))
+        self.assertAlmostEqual(self._get_tokens(key), 4.0)
+
+        # The refill is capped at the capacity of the bucket.
+        key = self._set_bucket('sk_refill', tokens=0.0, age=3600)
+        self.assertIsNone(self.Bucket._take_token(key, 10.0, 20.0, 0.0))
+        self.assertAlmostEqual(self._get_tokens(key), 19.0)
+
+    def test_background_calls_leave_the_interactive_reserve(self):
+        floor = 20.0 * const.RATE_LIMIT_INTERACTIVE_RESERVE
+        key = self._set_bucket('sk_reserve', tokens=floor + 0.5)
+        self.assertAlmostEqual(
+            self.Bucket._take_token(key, 10.0, 20.0, floor), floor + 0.5,
+            msg="A background call cannot take the tokens of the reserve.",
+        )
+        self.assertIsNone(
+            self.Bucket._take_token(key, 10.0, 20.0, 0.0),
+            "An interactive call can take the tokens of the reserve.",
+        )
+        self.assertAlmostEqual(self._get_tokens(key), floor - 0.5)
+
+    def test_acquire_gives_up_at_the_deadline(self):
+        self.env['ir.config_parameter'].set_param(
+            'payment_paymongo.rate_limit_interactive_wait', '0'
+        )
+        self._set_bucket('sk_empty', tokens=0.0)
+        with self.assertRaises(ValidationError):
+            self.Bucket._acquire('sk_empty', priority='interactive')
+
+    def test_concurrent_sender_reports_the_requests_it_did_not_send(self):
+        self.env['ir.config_parameter'].set_param(
+            'payment_paymongo.rate_limit_background_wait', '0'
+        )
+        floor = 20.0 * const.RATE_LIMIT_INTERACTIVE_RESERVE
+        self._set_bucket(self.provider.paymongo_secret_key, tokens=floor + 1.5)
+
+        results = self.provider._paymongo_send_concurrent_requests(
+            [('GET', f'v1/checkout_sessions/cs_{index}', None) for index in range(3)],
+            with_outcome=True,
+        )
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(
+            [outcome for _content, _error, outcome in results], ['ok', 'unsent', 'unsent']
+        )
+        self.assertTrue(all(error for _content, error, _outcome in results[1:]))
@@ -0,0 +1,68 @@
+# payment_paymongo/tests/test_refund_batch.py
+from odoo.exceptions import ValidationError
+from odoo.fields import Command
+from odoo.tests import tagged
+
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRefundBatch(PaymongoCommon):
+
+    def test_unrefundable_line_fails_alone(self):
+        """ Test that a line whose payment is unknown to PayMongo does not hold back the others.
+        """
+        tx = self._create_transaction(
+            'redirect', reference='R0001', state='done', paymongo_payment_id='pay_test'
+        )
+        unknown_tx = self._create_transaction('redirect', reference='R0002', state='done')
+        batch = self.env['paymongo.refund.batch'].create({'line_ids': [
+            Command.create({'transaction_id': tx.id, 'amount': tx.amount}),
+            Command.create({'transaction_id': unknown_tx.id, 'amount': unknown_tx.amount}),
+        ]})
+        batch.action_start()
+        self.env['paymongo.refund.batch']._cron_send_refunds(auto_commit=False)
+
+        line, unknown_line = batch.line_ids
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(line.state, 'pending')
+        self.assertTrue(line.sent_at)
+        self.assertEqual(unknown_line.state, 'failed')
+        self.assertFalse(unknown_line.refund_transaction_id)
+        self.assertEqual(batch.state, 'sent')
+
+    def _start_batch(self, reference):
+        tx = self._create_transaction(
+            'redirect', reference=reference, state='done', paymongo_payment_id=f'pay_{reference}'
+        )
+        batch = self.env['paymongo.refund.batch'].create({'line_ids': [
+            Command.create({'transaction_id': tx.id, 'amount': tx.amount}),
+        ]})
+        batch.action_start()
+        return batch
+
+    def test_refund_of_unknown_outcome_is_left_sending(self):
+        """ Test that a refund answered with a 5xx is resolved on PayMongo, not failed and retried.
+        """
+        batch = self._start_batch('R0003')
+        self.server.fail_next(503)
+        self.env['paymongo.refund.batch']._cron_send_refunds(auto_commit=False)
+
+        self.assertEqual(batch.line_ids.state, 'sending')
+        self.assertEqual(batch.line_ids.refund_transaction_id.state, 'draft')
+        self.assertEqual(batch.state, 'running')
+        with self.assertRaises(ValidationError):
+            batch.action_retry_failed()
+
+    def test_rate_limited_refund_is_queued_again(self):
+        """ Test that a refund turned away with a 429 is queued again instead of failed. """
+        batch = self._start_batch('R0004')
+        self.server.fail_next(429)
+        self.env['paymongo.refund.batch']._cron_send_refunds(auto_commit=False)
+
+        line = batch.line_ids
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(line.state, 'queued')
+        self.assertFalse(line.error)
+        self.assertFalse(line.refund_transaction_id)
+        self.assertEqual(batch.state, 'running')
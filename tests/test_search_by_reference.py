@@ -0,0 +1,38 @@
+# payment_paymongo/tests/test_search_by_reference.py
+import json
+
+from odoo.tests import tagged
+
+from odoo.addons.payment_paymongo.benchmarks.paymongo_bench import make_event
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestSearchByReference(PaymongoCommon):
+
+    def _make_payment_data(self, reference, reference_number):
+        payment_data = json.loads(make_event('whsk_test_paymongo', reference)[0])
+        attributes = payment_data['data']['attributes']['data']['attributes']
+        attributes['reference_number'] = reference_number
+        attributes['metadata'] = {'odoo_tx_ref': reference, 'paymongo_ref': reference_number}
+        return payment_data
+
+    def _search(self, payment_data):
+        return self.env['payment.transaction']._search_by_reference('paymongo', payment_data)
+
+    def test_exact_reference_wins_over_colliding_sanitized_reference(self):
+        tx = self._create_transaction('redirect', reference='S0001/1')
+        other_tx = self._create_transaction('redirect', reference='S0001 1')
+        (tx + other_tx).paymongo_reference = 'S0001-1'
+        self.assertEqual(self._search(self._make_payment_data('S0001/1', 'S0001-1')), tx)
+
+    def test_sanitized_reference_is_a_fallback(self):
+        tx = self._create_transaction('redirect', reference='S0002/1')
+        tx.paymongo_reference = 'S0002-1'
+        self.assertEqual(self._search(self._make_payment_data(None, 'S0002-1')), tx)
+
+    def test_ambiguous_sanitized_reference_matches_nothing(self):
+        txs = self._create_transaction('redirect', reference='S0003/1') \
+            + self._create_transaction('redirect', reference='S0003 1')
+        txs.paymongo_reference = 'S0003-1'
+        self.assertFalse(self._search(self._make_payment_data(None, 'S0003-1')))
@@ -0,0 +1,63 @@
+# payment_paymongo/tests/test_webhook_archive.py
+import json
+
+from odoo.tests import tagged
+from odoo.tools import SQL
+
+from odoo.addons.payment_paymongo.benchmarks.paymongo_bench import make_event
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+from odoo.addons.payment_paymongo.utils import PaymongoEvent, decompress_body
+
+
+@tagged('post_install', '-at_install')
+class TestWebhookArchive(PaymongoCommon):
+
+    def _archive(self, reference):
+        raw_body, _header = make_event(self.provider.paymongo_webhook_secret, reference)
+        event = PaymongoEvent.parse(json.loads(raw_body))
+        archive = self.env['paymongo.webhook.archive']._archive(
+            raw_body, 'valid', self.provider.id, event
+        )
+        return archive, raw_body
+
+    def test_bodies_are_stored_as_raw_bytes(self):
+        archive, raw_body = self._archive('A0001')
+        self.env.cr.execute(SQL(
+            "SELECT compressed_body FROM paymongo_webhook_archive WHERE id = %s", archive.id
+        ))
+        compressed_body = bytes(self.env.cr.fetchone()[0])
+        self.assertEqual(decompress_body(archive.codec, compressed_body), raw_body)
+        self.assertEqual(archive.reference, 'A0001')
+        self.assertEqual(archive.raw_body, raw_body.decode())
+
+    def test_replay_round_trips_archived_events_through_the_inbox(self):
+        """ Test that replayed events are stored again if they left the inbox, and reset to
+        pending, without duplicate, if they are still in it. """
+        archives, raw_bodies = zip(*(self._archive(f'A000{index}') for index in range(3)))
+        archives = self.env['paymongo.webhook.archive'].concat(*archives)
+        Event = self.env['paymongo.webhook.event']
+        kept_event = Event.create({
+            'provider_id': self.provider.id,
+            'event_id': archives[0].event_id,
+            'event_type': archives[0].event_type,
+            'raw_body': raw_bodies[0].decode(),
+            'state': 'failed',
+            'attempts': 5,
+            'last_error': "Boom",
+        })
+
+        replayed = self.env['paymongo.webhook.archive']._replay(
+            [('id', 'in', archives.ids)], batch_size=2, auto_commit=False
+        )
+
+        self.assertEqual(replayed, 3)
+        events = Event.search([('event_id', 'in', archives.mapped('event_id'))], order='id')
+        self.assertEqual(len(events), 3)
+        self.assertEqual(events[0], kept_event)
+        self.assertEqual(set(events.mapped('state')), {'pending'})
+        self.assertEqual(kept_event.attempts, 0)
+        self.assertFalse(kept_event.last_error)
+        self.assertEqual(
+            {event.event_id: event.raw_body.encode() for event in events},
+            {archive.event_id: raw_body for archive, raw_body in zip(archives, raw_bodies)},
+        )
@@ -0,0 +1,165 @@
+# payment_paymongo/tests/test_webhook_inbox.py
+import json
+import uuid
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from odoo import SUPERUSER_ID, api, sql_db
+from odoo.tests import freeze_time, tagged
+
+from odoo.addons.payment import utils as payment_utils
+from odoo.addons.payment_paymongo import const
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+from odoo.addons.payment_paymongo.utils import PaymongoEvent
+
+
+@tagged('post_install', '-at_install')
+class TestWebhookInbox(PaymongoCommon):
+
+    def _make_payload(self, event_type, resource_id, **attributes):
+        return {'data': {
+            'id': f'evt_{uuid.uuid4().hex[:24]}',
+            'type': 'event',
+            'attributes': {
+                'type': event_type,
+                'livemode': False,
+                'data': {'id': resource_id, 'attributes': attributes},
+            },
+        }}
+
+    def _make_payment_payload(self, tx, event_type, payment_id, **attributes):
+        return self._make_payload(
+            event_type,
+            payment_id,
+            amount=payment_utils.to_minor_currency_units(tx.amount, tx.currency_id),
+            currency=tx.currency_id.name,
+            metadata={'odoo_tx_ref': tx.reference},
+            **attributes,
+        )
+
+    def _enqueue(self, payload):
+        return self.env['paymongo.webhook.event']._enqueue(
+            self.provider, json.dumps(payload).encode(), {}, PaymongoEvent.parse(payload)
+        )
+
+    def test_only_events_of_the_same_transition_are_coalesced(self):
+        """ Test that refund events are not dropped in favour of the payment event, and that the
+        identifiers of a coalesced event are kept. """
+        tx = self._create_transaction('redirect', reference='W0001')
+        refund_tx = tx._create_child_transaction(tx.amount, is_refund=True)
+        refund_tx.paymongo_refund_id = 'ref_w0001'
+        payment_paid = self._enqueue(
+            self._make_payment_payload(tx, 'payment.paid', 'pay_w0001', status='paid')
+        )
+        payment_refunded = self._enqueue(self._make_payment_payload(
+            tx, 'payment.refunded', 'pay_w0001', status='refunded',
+            refunds=[{'id': 'ref_w0001', 'attributes': {'status': 'succeeded'}}],
+        ))
+        session_paid = self._enqueue(self._make_payload(
+            'checkout_session.payment.paid', 'cs_w0001', metadata={'odoo_tx_ref': tx.reference}
+        ))
+
+        self.env['paymongo.webhook.event']._cron_process_pending(auto_commit=False)
+
+        self.assertEqual(tx.state, 'done')
+        self.assertEqual(tx.paymongo_payment_id, 'pay_w0001')
+        self.assertEqual(refund_tx.state, 'done')
+        events = payment_paid + payment_refunded + session_paid
+        self.assertEqual(set(events.mapped('state')), {'done'})
+        self.assertEqual(payment_paid.coalesced_into_id, session_paid)
+        self.assertFalse(payment_refunded.coalesced_into_id)
+        self.assertFalse(session_paid.coalesced_into_id)
+
+    def test_claim_skips_events_locked_by_another_worker(self):
+        """ Test that an event locked by a worker is skipped, not waited for, by the others. """
+        # Concurrent workers need committed rows and their own connections.
+        dbname = self.env.cr.dbname
+        with closing(sql_db.db_connect(dbname).cursor()) as cr:
+            events = api.Environment(cr, SUPERUSER_ID, {})['paymongo.webhook.event'].create([{
+                'provider_id': self.env.ref('payment_paymongo.payment_provider_paymongo').id,
+                'event_id': f'evt_{uuid.uuid4().hex[:24]}',
+                'raw_body': '{}',
+                'next_attempt_at': datetime(2000, 1, 1),
+            } for _i in range(2)])
+            event_ids = events.ids
+            cr.commit()
+
+        def cleanup():
+            with closing(sql_db.db_connect(dbname).cursor()) as cr:
+                cr.execute("DELETE FROM paymongo_webhook_event WHERE id IN %s", [tuple(event_ids)])
+                cr.commit()
+        self.addCleanup(cleanup)
+
+        with closing(sql_db.db_connect(dbname).cursor()) as busy_cr, \
+                closing(sql_db.db_connect(dbname).cursor()) as claim_cr:
+            busy_cr.execute("SET LOCAL lock_timeout = '5s'")
+            busy_cr.execute(
+                "SELECT id FROM paymongo_webhook_event WHERE id = %s FOR UPDATE", [event_ids[0]]
+            )
+            claim_cr.execute("SET LOCAL lock_timeout = '5s'")
+            claimed = api.Environment(claim_cr, SUPERUSER_ID, {})[
+                'paymongo.webhook.event'
+            ]._claim_batch(100)
+            self.assertEqual(set(claimed.ids) & set(event_ids), {event_ids[1]})
+            busy_cr.rollback()
+            claim_cr.rollback()
+
+    @freeze_time('2026-01-01 12:00:00')
+    def test_failed_event_backs_off_then_gives_up(self):
+        self.env['ir.config_parameter'].set_param('payment_paymongo.webhook_max_attempts', '3')
+        event = self.env['paymongo.webhook.event'].create({
+            'provider_id': self.provider.id,
+            'event_id': 'evt_backoff',
+            'raw_body': 'not json',
+        })
+        now = datetime(2026, 1, 1, 12)
+
+        event._process_batch()
+        self.assertEqual(event.state, 'pending')
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(
+            event.next_attempt_at, now + timedelta(seconds=const.WEBHOOK_RETRY_BASE_DELAY)
+        )
+
+        event._process_batch()
+        self.assertEqual(event.attempts, 2)
+        self.assertEqual(
+            event.next_attempt_at, now + timedelta(seconds=2 * const.WEBHOOK_RETRY_BASE_DELAY)
+        )
+
+        event._process_batch()
+        self.assertEqual(event.state, 'failed')
+        self.assertEqual(event.attempts, 3)
+        self.assertTrue(event.last_error)
+        self.assertEqual(event.processed_at, now)
+
+    def test_duplicate_event_is_dropped_without_breaking_the_transaction(self):
+        payload = self._make_payload('checkout_session.payment.paid', 'cs_duplicate')
+        event = self._enqueue(payload)
+        self.assertTrue(event)
+        self.assertTrue(self.env['paymongo.webhook.event']._is_known_event(event.event_id))
+
+        # A concurrent delivery that passed the lookup loses the race on the unique index.
+        self.assertFalse(self._enqueue(payload))
+        self.assertEqual(self.env['paymongo.webhook.event'].search_count(
+            [('event_id', '=', event.event_id)]
+        ), 1, "The duplicate was rolled back to its savepoint; the cursor is still usable.")
+
+    def test_prune_keeps_pending_and_recent_events(self):
+        Event = self.env['paymongo.webhook.event']
+        retention = timedelta(days=const.WEBHOOK_EVENT_RETENTION_DAYS)
+        old, recent = datetime.now() - retention - timedelta(days=1), datetime.now()
+        old_event, recent_event, pending_event = Event.create([{
+            'provider_id': self.provider.id,
+            'event_id': f'evt_prune_{index}',
+            'raw_body': '{}',
+            'state': state,
+            'processed_at': processed_at,
+        } for index, (state, processed_at) in enumerate((
+            ('done', old), ('failed', recent), ('pending', False),
+        ))])
+        Event.flush_model()
+        Event._cron_prune_processed(chunk_size=1, auto_commit=False)
+        self.assertFalse(old_event.exists())
+        self.assertTrue(recent_event.exists())
+        self.assertTrue(pending_event.exists())
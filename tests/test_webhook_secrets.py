@@ -0,0 +1,29 @@
+# payment_paymongo/tests/test_webhook_secrets.py
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from odoo.addons.payment_paymongo.tests.common import PaymongoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestWebhookSecrets(PaymongoCommon):
+
+    def test_secrets_are_split_by_mode(self):
+        """ Test that test events are only checked against providers in test mode and vice versa.
+        """
+        Provider = self.env['payment.provider']
+        self.paymongo.state = 'test'
+        self.assertIn(self.paymongo.id, dict(Provider._paymongo_get_webhook_secrets(False)))
+        self.assertNotIn(self.paymongo.id, dict(Provider._paymongo_get_webhook_secrets(True)))
+        self.paymongo.state = 'enabled'
+        self.assertIn(self.paymongo.id, dict(Provider._paymongo_get_webhook_secrets(True)))
+        self.assertNotIn(self.paymongo.id, dict(Provider._paymongo_get_webhook_secrets(False)))
+
+    def test_other_providers_keep_the_cache(self):
+        other_provider = self.env['payment.provider'].create({'name': "Other", 'code': 'none'})
+        with patch.object(type(self.env.registry), 'clear_cache') as clear_cache:
+            other_provider.state = 'test'
+            clear_cache.assert_not_called()
+            self.paymongo.state = 'disabled'
+            clear_cache.assert_called()
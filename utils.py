@@ -0,0 +1,290 @@
+# payment_paymongo/utils.py
+import hashlib
+import hmac
+import os
+import pprint
+import random
+import threading
+import zlib
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from odoo.addons.payment_paymongo import const
+
+try:
+    import zstandard  # Optional: archived webhook bodies fall back to zlib without it.
+except ImportError:
+    zstandard = None
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_config_param(env, key, default):
+    """Read a `payment_paymongo.<key>` system parameter, cast to the type of `default`.
+
+    :param env: The environment used to read the parameter.
+    :param str key: The parameter key, without the module prefix.
+    :param default: The value returned when the parameter is unset or invalid.
+    :return: The parameter value.
+    """
+    value = env['ir.config_parameter'].sudo().get_param(f'payment_paymongo.{key}')
+    if value in (None, False, ''):
+        return default
+    if isinstance(default, bool):
+        return str(value).strip().lower() in ('1', 'true', 'yes')
+    try:
+        return type(default)(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def compute_signature(webhook_secret, timestamp, raw_body):
+    """Compute the PayMongo webhook signature of a payload.
+
+    :param str webhook_secret: The webhook secret of the provider.
+    :param str timestamp: The `t` part of the `Paymongo-Signature` header.
+    :param bytes raw_body: The raw request body.
+    :return: The hexadecimal HMAC-SHA256 of `"{t}.{raw_body}"`.
+    :rtype: str
+    """
+    signed_payload = (str(timestamp) + ".").encode("utf-8") + (raw_body or b"")
+    return hmac.new(webhook_secret.encode("utf-8"), signed_payload, hashlib.sha256).hexdigest()
+
+
+class PaymongoEvent(dict):
+    """PayMongo event envelope, with the fields used by the processing pipeline parsed once.
+
+    The event is still the original dict, so it can be passed wherever `payment_data` is expected,
+    but the provider hooks read the parsed attributes instead of walking the envelope again.
+    """
+
+    __slots__ = (
+        'event_id', 'event_type', 'livemode', 'resource_id', 'resource_type', 'reference',
+        'paymongo_reference', 'description', 'session_id', 'payment_intent_id', 'payment_id',
+        'refund_id', 'status', 'refund_statuses', 'amount_minor', 'currency',
+    )
+
+    @classmethod
+    def parse(cls, payload, strict=False):
+        """Build the event from a decoded envelope; parsed events are returned as is.
+
+        :param dict payload: The decoded event envelope.
+        :param bool strict: Whether to raise on malformed envelopes instead of leaving the missing
+                            fields empty.
+        :return: The parsed event.
+        :rtype: PaymongoEvent
+        :raise ValueError: If `strict` is set and the envelope is malformed.
+        """
+        if isinstance(payload, cls):
+            return payload
+        if not isinstance(payload, dict):
+            if strict:
+                raise ValueError("The PayMongo event is not a JSON object.")
+            payload = {}
+        event = cls(payload)
+        try:
+            event._parse()
+        except (AttributeError, TypeError, ValueError, IndexError) as error:
+            if strict:
+                raise ValueError(f"Malformed PayMongo event: {error}") from error
+            for name in cls.__slots__:
+                if not hasattr(event, name):
+                    setattr(event, name, None)
+        if strict:
+            event._validate()
+        return event
+
+    def _parse(self):
+        envelope = self.get('data') or {}
+        event_attrs = envelope.get('attributes') or {}
+        resource = event_attrs.get('data') or {}
+        resource_attrs = resource.get('attributes') or {}
+        metadata = resource_attrs.get('metadata') or {}
+        payments = resource_attrs.get('payments') or []
+        payment = payments[0] if payments else {}
+        payment_attrs = payment.get('attributes') or {}
+        payment_intent = resource_attrs.get('payment_intent') or {}
+        intent_attrs = payment_intent.get('attributes') or {}
+
+        self.event_id = envelope.get('id')
+        self.event_type = event_attrs.get('type')
+        self.livemode = bool(event_attrs.get('livemode'))
+        resource_id = self.resource_id = resource.get('id') or ''
+        self.resource_type = resource.get('type')
+
+        self.reference = metadata.get('odoo_tx_ref')
+        self.paymongo_reference = (
+            resource_attrs.get('reference_number') or metadata.get('paymongo_ref')
+        )
+        self.description = resource_attrs.get('description')
+        self.session_id = resource_id.startswith('cs_') and resource_id or None
+        self.payment_intent_id = (
+            (resource_id.startswith('pi_') and resource_id)
+            or payment_intent.get('id')
+            or resource_attrs.get('payment_intent_id')
+            or None
+        )
+        self.payment_id = (resource_id.startswith('pay_') and resource_id) or payment.get('id')
+        self.refund_id = resource_id.startswith('ref_') and resource_id or None
+        self.status = resource_attrs.get('status')
+        # Refunds of a payment, as carried by `payment.refunded` events: {refund id: status}.
+        self.refund_statuses = {
+            refund.get('id'): (refund.get('attributes') or {}).get('status')
+            for refund in resource_attrs.get('refunds') or []
+        }
+        self.amount_minor = self.currency = None
+
+        # Amount, by order of preference: the resource itself when it is a payment, a payment
+        # intent or a refund, then the first payment, the payment intent and the sum of the line
+        # items.
+        if (
+            resource_id.startswith(('pay_', 'pi_', 'ref_'))
+            and resource_attrs.get('amount') is not None
+        ):
+            self.amount_minor = int(resource_attrs['amount'])
+            self.currency = resource_attrs.get('currency')
+        elif payment_attrs.get('amount') is not None:
+            self.amount_minor = int(payment_attrs['amount'])
+            self.currency = payment_attrs.get('currency')
+        elif intent_attrs.get('amount') is not None:
+            self.amount_minor = int(intent_attrs['amount'])
+            self.currency = intent_attrs.get('currency')
+        elif line_items := resource_attrs.get('line_items'):
+            self.amount_minor = sum(
+                int(item.get('quantity') or 1) * int(item.get('amount') or 0)
+                for item in line_items
+            )
+            self.currency = next(
+                (item['currency'] for item in reversed(line_items) if item.get('currency')), None
+            )
+
+    def _validate(self):
+        if not isinstance(self.get('data'), dict):
+            raise ValueError("The PayMongo event has no `data` object.")
+        if not self.event_id or not isinstance(self.event_id, str):
+            raise ValueError("The PayMongo event has no id.")
+        if not self.event_type or not isinstance(self.event_type, str):
+            raise ValueError(f"The PayMongo event {self.event_id} has no type.")
+        if not self.resource_id or not isinstance(self.resource_id, str):
+            raise ValueError(f"The PayMongo event {self.event_id} has no resource.")
+
+
+def compress_body(raw_body):
+    """Compress a raw webhook body, with zstd if available and zlib otherwise.
+
+    :param bytes raw_body: The raw request body.
+    :return: The codec used and the compressed body.
+    :rtype: tuple
+    """
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=const.WEBHOOK_ARCHIVE_ZSTD_LEVEL).compress(
+            raw_body
+        )
+    return 'zlib', zlib.compress(raw_body, const.WEBHOOK_ARCHIVE_ZLIB_LEVEL)
+
+
+def decompress_body(codec, data):
+    """Decompress a webhook body compressed by `compress_body`.
+
+    :param str codec: The codec the body was compressed with.
+    :param bytes data: The compressed body.
+    :return: The raw request body.
+    :rtype: bytes
+    :raise ValueError: If the codec is not available.
+    """
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("The zstandard library is required to read this archived body.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    return data
+
+
+def redact(data):
+    """Return a copy of the payload with personal data replaced by a placeholder.
+
+    :param data: The payload, or a part of it.
+    :return: The redacted copy.
+    """
+    if isinstance(data, dict):
+        return {
+            key: '[redacted]' if key in const.LOG_REDACTED_KEYS else redact(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [redact(value) for value in data]
+    return data
+
+
+class LazyPayload:
+    """Defer the redaction and pretty-printing of a payload until the log record is emitted."""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return pprint.pformat(redact(self.data))
+
+
+class JitteredRetry(Retry):
+    """`Retry` policy adding random jitter to the exponential backoff and capping `Retry-After`.
+
+    Without jitter, every worker that failed at the same time retries at the same time too, which
+    is exactly what turns a burst of 429s into a second burst.
+    """
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(backoff / 2, backoff) if backoff else 0
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, const.HTTP_MAX_RETRY_AFTER)
+
+
+def get_http_session(pool_size, max_retries, backoff_factor):
+    """Return the keep-alive HTTP session of the current worker for the given pool settings.
+
+    Sessions are keyed by process id so that forked workers never share the sockets of their
+    parent. Connect errors are retried for every method since the request never left; 429 and 5xx
+    responses are only retried for idempotent methods, honouring `Retry-After`.
+
+    :param int pool_size: The maximum number of connections kept alive per host.
+    :param int max_retries: The maximum number of retries per request.
+    :param float backoff_factor: The base of the exponential backoff, in seconds.
+    :return: The pooled session.
+    :rtype: requests.Session
+    """
+    key = (os.getpid(), pool_size, max_retries, backoff_factor)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                retry = JitteredRetry(
+                    total=max_retries,
+                    connect=max_retries,
+                    read=max_retries,
+                    status=max_retries,
+                    backoff_factor=backoff_factor,
+                    status_forcelist=const.HTTP_RETRY_STATUSES,
+                    allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _sessions[key] = session
+    return session
@@ -0,0 +1,3 @@
+from . import paymongo_provisioning_wizard
+from . import paymongo_payout_import_wizard
+from . import payment_link_wizard
@@ -0,0 +1,18 @@
+# payment_paymongo/wizard/payment_link_wizard.py
+from odoo import models
+
+
+class PaymentLinkWizard(models.TransientModel):
+    _inherit = 'payment.link.wizard'
+
+    def _compute_link(self):
+        """Link invoices paid in full to their pre-created PayMongo checkout, when available."""
+        super()._compute_link()
+        for wizard in self.filtered(lambda w: w.res_model == 'account.move' and w.res_id):
+            invoice = self.env['account.move'].browse(wizard.res_id)
+            if (
+                invoice.currency_id == wizard.currency_id
+                and invoice.currency_id.compare_amounts(wizard.amount, invoice.amount_residual) == 0
+                and invoice._paymongo_get_precreate_providers().get(invoice.company_id)
+            ):
+                wizard.link = invoice._paymongo_get_pay_url()
@@ -0,0 +1,351 @@
+# payment_paymongo/wizard/paymongo_payout_import_wizard.py
+import csv
+import io
+import itertools
+import json
+from datetime import datetime, timezone
+
+from odoo import _, api, fields, models
+from odoo.exceptions import ValidationError
+from odoo.fields import Domain
+
+from odoo.addons.payment.logging import get_payment_logger
+from odoo.addons.payment_paymongo import const
+
+_logger = get_payment_logger(__name__)
+
+
+class PaymongoPayoutImportWizard(models.TransientModel):
+    """Import PayMongo payout or balance transaction reports as bank statement lines.
+
+    Reports are read as a stream, straight from the filestore when possible, and their rows are
+    created and matched in chunks of `const.PAYOUT_IMPORT_CHUNK_SIZE`, so that memory use does not
+    depend on the size of the file. Each chunk costs one search for the rows already imported, one
+    search for the matching transactions and one `create`.
+
+    Rows matched to a transaction with a payment are booked against the outstanding lines of that
+    payment and reconciled with them.
+    """
+    _name = 'paymongo.payout.import.wizard'
+    _description = "PayMongo Payout Import Wizard"
+
+    journal_id = fields.Many2one(
+        string="Journal",
+        comodel_name='account.journal',
+        required=True,
+        domain="[('type', 'in', ('bank', 'cash'))]",
+    )
+    data_file = fields.Binary(string="Report", required=True, attachment=True)
+    filename = fields.Char()
+    file_format = fields.Selection(
+        string="Format",
+        help="CSV amounts are read in major units (e.g. 1,250.50); JSON amounts are read in minor "
+             "units (e.g. 125050), as returned by the PayMongo API.",
+        selection=[('csv', "CSV"), ('json', "JSON (array or one object per line)")],
+        compute='_compute_file_format',
+        store=True,
+        readonly=False,
+        required=True,
+    )
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        context = self.env.context
+        if 'journal_id' in fields_list and context.get('active_model') == 'account.journal':
+            res['journal_id'] = context.get('active_id')
+        return res
+
+    @api.depends('filename')
+    def _compute_file_format(self):
+        for wizard in self:
+            if (wizard.filename or '').lower().endswith(('.json', '.jsonl', '.ndjson')):
+                wizard.file_format = 'json'
+            else:
+                wizard.file_format = 'csv'
+
+    def action_import(self):
+        """Import the report and notify the number of created and matched lines."""
+        self.ensure_one()
+        with self._open_data_file() as binary_stream:
+            stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+            rows = _iter_csv_rows(stream) if self.file_format == 'csv' else _iter_json_rows(stream)
+            counts = self._import_rows(rows)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'success',
+                'message': _(
+                    "%(created)s statement lines created, %(matched)s matched to a transaction, "
+                    "%(reconciled)s reconciled with its payment, %(duplicates)s already imported, "
+                    "%(skipped)s skipped.",
+                    **counts,
+                ),
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
+
+    def _open_data_file(self):
+        """Open the uploaded report in binary mode, from the filestore if it is stored there.
+
+        :return: The binary stream of the report.
+        :rtype: io.BufferedIOBase
+        """
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'data_file'),
+        ], limit=1)
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')  # noqa: SIM115
+        return io.BytesIO(attachment.raw or b'')
+
+    def _import_rows(self, rows):
+        """Create the statement lines of the report rows, chunk by chunk.
+
+        :param iterator rows: The raw report rows, as dicts.
+        :return: The number of `created`, `matched`, `reconciled`, `duplicates` and `skipped` rows.
+        :rtype: dict
+        """
+        self.ensure_one()
+        journal = self.journal_id
+        digits = (journal.currency_id or journal.company_id.currency_id).decimal_places
+        minor_units = self.file_format == 'json'
+        counts = dict.fromkeys(('created', 'matched', 'reconciled', 'duplicates', 'skipped'), 0)
+        chunk_size = const.PAYOUT_IMPORT_CHUNK_SIZE
+        rows = iter(rows)
+        while chunk := list(itertools.islice(rows, chunk_size)):
+            entries = []
+            for row in chunk:
+                entry = _normalize_row(row, minor_units, digits)
+                if entry:
+                    entries.append(entry)
+                else:
+                    counts['skipped'] += 1
+            self._import_chunk(journal, entries, counts)
+            # Keep the cache from growing with the file.
+            self.env.invalidate_all()
+        _logger.info(
+            "Imported PayMongo report %s into journal %s: %s", self.filename, journal.id, counts
+        )
+        return counts
+
+    def _import_chunk(self, journal, entries, counts):
+        """Create, match and reconcile the statement lines of a chunk of normalized rows.
+
+        The counterpart of a line matched to a paid transaction is booked on the account of the
+        outstanding lines of its payment, instead of the suspense account, and reconciled with
+        them.
+
+        :param account.journal journal: The journal of the statement lines.
+        :param list entries: The normalized rows, see `_normalize_row`.
+        :param dict counts: The counters to update.
+        :return: None
+        """
+        StatementLine = self.env['account.bank.statement.line']
+        import_ids = [f"paymongo-{journal.id}-{entry['id']}" for entry in entries]
+        existing_import_ids = set(StatementLine.search_fetch(
+            [('unique_import_id', 'in', import_ids)], ['unique_import_id']
+        ).mapped('unique_import_id'))
+        txs_by_key = self._match_transactions(entries)
+
+        vals_list = []
+        counterpart_lines_list = []  # The lines to reconcile with each statement line.
+        settled_payments = self.env['account.payment']
+        seen_import_ids = set()
+        for entry, import_id in zip(entries, import_ids):
+            if import_id in existing_import_ids or import_id in seen_import_ids:
+                counts['duplicates'] += 1
+                continue
+            seen_import_ids.add(import_id)
+            tx = next((
+                txs_by_key[key] for key in (
+                    ('paymongo_payment_id', entry['payment_id']),
+                    ('paymongo_payment_intent_id', entry['payment_intent_id']),
+                    ('reference', entry['reference']),
+                    ('paymongo_reference', entry['reference']),
+                ) if key in txs_by_key
+            ), None)
+            label = ' '.join(filter(None, (entry['label'], entry['reference'] or entry['id'])))
+            vals = {
+                'journal_id': journal.id,
+                'date': entry['date'],
+                'amount': entry['amount'],
+                'payment_ref': label,
+                'unique_import_id': import_id,
+            }
+            counterpart_lines = self.env['account.move.line']
+            if tx:
+                counts['matched'] += 1
+                vals['partner_id'] = tx.partner_id.id
+                vals['payment_ref'] = f"{tx.reference} {label}"
+                if tx.payment_id not in settled_payments:  # Only one row settles a payment.
+                    counterpart_lines = self._get_outstanding_lines(tx.payment_id)
+                    settled_payments |= tx.payment_id
+                if counterpart_lines:
+                    vals['counterpart_account_id'] = counterpart_lines[0].account_id.id
+            vals_list.append(vals)
+            counterpart_lines_list.append(counterpart_lines)
+        statement_lines = StatementLine.create(vals_list)
+        counts['created'] += len(vals_list)
+
+        for statement_line, counterpart_lines in zip(statement_lines, counterpart_lines_list):
+            if not counterpart_lines:
+                continue
+            _liquidity_lines, _suspense_lines, other_lines = statement_line._seek_for_lines()
+            (other_lines + counterpart_lines).reconcile()
+            counts['reconciled'] += 1
+
+    @api.model
+    def _get_outstanding_lines(self, payment):
+        """Return the open lines of a payment that the bank statement line settles.
+
+        These are the outstanding (liquidity) lines of the payment's journal entry or, for a
+        payment without journal entry, the receivable lines of the invoices it pays.
+
+        :param account.payment payment: The payment of a matched transaction.
+        :return: The open lines, all on the same account.
+        :rtype: account.move.line
+        """
+        if not payment:
+            return self.env['account.move.line']
+        if payment.move_id:
+            lines, _counterpart_lines, _writeoff_lines = payment._seek_for_lines()
+        else:
+            lines = payment.invoice_ids.line_ids.filtered(
+                lambda line: line.account_type in ('asset_receivable', 'liability_payable')
+            )
+        lines = lines.filtered(lambda line: line.account_id.reconcile and not line.reconciled)
+        return lines.filtered(lambda line: line.account_id == lines[:1].account_id)
+
+    def _match_transactions(self, entries):
+        """Find the PayMongo transactions of a chunk of rows with a single indexed search.
+
+        :param list entries: The normalized rows, see `_normalize_row`.
+        :return: The transactions, keyed by `(field name, value)` for each identifier they carry.
+        :rtype: dict
+        """
+        values = {
+            field_name: {entry[key] for entry in entries} - {None}
+            for field_name, key in (
+                ('paymongo_payment_id', 'payment_id'),
+                ('paymongo_payment_intent_id', 'payment_intent_id'),
+                ('reference', 'reference'),
+            )
+        }
+        values['paymongo_reference'] = values['reference']
+        domains = [[(field_name, 'in', list(ids))] for field_name, ids in values.items() if ids]
+        if not domains:
+            return {}
+        txs = self.env['payment.transaction'].sudo().search_fetch(
+            Domain('provider_id.code', '=', 'paymongo') & Domain.OR(domains),
+            ['partner_id', 'payment_id', *values],
+        )
+        txs_by_key = {}
+        for tx in txs:
+            for field_name in values:
+                if tx[field_name]:
+                    txs_by_key.setdefault((field_name, tx[field_name]), tx)
+        return txs_by_key
+
+
+def _iter_csv_rows(stream):
+    """Yield the rows of a CSV report as dicts, one line at a time."""
+    yield from csv.DictReader(stream)
+
+
+def _iter_json_rows(stream, chunk_size=65536):
+    """Yield the objects of a JSON array, or of a file with one JSON object per line.
+
+    Arrays are decoded incrementally, one element at a time, so that the whole document is never
+    held in memory.
+    """
+    buffer = stream.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        # One object per line. The first read may have stopped in the middle of a line.
+        for line in itertools.chain((buffer + stream.readline()).splitlines(), stream):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as error:
+                    raise ValidationError(_("The report is not valid JSON: %s", error)) from error
+        return
+
+    decoder = json.JSONDecoder()
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        buffer = buffer.lstrip().removeprefix(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            row, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as error:
+            # Most likely an element cut at the end of the buffer: read more and try again.
+            if eof:
+                raise ValidationError(_("The report is not valid JSON: %s", error)) from error
+            more = stream.read(chunk_size)
+            eof = not more
+            buffer += more
+            continue
+        yield row
+        buffer = buffer[end:]
+
+
+def _normalize_row(row, minor_units, digits):
+    """Extract the fields of a payout or balance transaction row, whatever its layout.
+
+    API objects (`{'id': ..., 'attributes': {...}}`) are flattened and CSV headers are matched
+    case-insensitively, with spaces read as underscores.
+
+    :param dict row: The raw row.
+    :param bool minor_units: Whether amounts are expressed in minor units.
+    :param int digits: The number of decimal places of the journal currency.
+    :return: The `id`, `date`, `amount`, `payment_id`, `payment_intent_id`, `reference` and `label`
+             of the row, or None if it lacks an id, a date or an amount.
+    :rtype: dict
+    """
+    if not isinstance(row, dict):
+        return None
+    if isinstance(row.get('attributes'), dict):
+        row = {'id': row.get('id'), **row['attributes']}
+    row = {str(key).strip().lower().replace(' ', '_'): value for key, value in row.items()}
+
+    def first(*keys):
+        return next((row[key] for key in keys if row.get(key) not in (None, '')), None)
+
+    row_id = first('id', 'transaction_id', 'balance_transaction_id', 'payout_id')
+    source = row.get('source') if isinstance(row.get('source'), dict) else {}
+    metadata = row.get('metadata') if isinstance(row.get('metadata'), dict) else {}
+    payment_id = first('payment_id', 'source_id') or source.get('id')
+    if not payment_id and str(row_id or '').startswith('pay_'):
+        payment_id = row_id
+
+    amount = first('net_amount', 'net', 'amount')
+    date = first('created_at', 'date', 'paid_at', 'arrival_date', 'available_at')
+    try:
+        if isinstance(amount, str):
+            amount = float(amount.replace(',', ''))
+        amount = amount / 10 ** digits if minor_units else float(amount)
+        if isinstance(date, (int, float)) or str(date).isdigit():
+            date = datetime.fromtimestamp(int(date), tz=timezone.utc).date()
+        else:
+            date = fields.Date.to_date(str(date)[:10])
+    except (TypeError, ValueError):
+        return None
+    if not row_id or not date:
+        return None
+
+    return {
+        'id': str(row_id),
+        'date': date,
+        'amount': round(amount, digits),
+        'payment_id': payment_id or None,
+        'payment_intent_id': first('payment_intent_id') or None,
+        'reference': (
+            metadata.get('odoo_tx_ref')
+            or first('reference_number', 'external_reference_number', 'reference')
+        ),
+        'label': first('description', 'type', 'source_type'),
+    }
@@ -0,0 +1,70 @@
+# payment_paymongo/wizard/paymongo_provisioning_wizard.py
+from odoo import _, api, fields, models
+from odoo.exceptions import ValidationError
+
+
+class PaymongoProvisioningWizard(models.TransientModel):
+    _name = 'paymongo.provisioning.wizard'
+    _description = "PayMongo Provider Provisioning Wizard"
+
+    line_ids = fields.One2many(
+        string="Credentials",
+        help="The PayMongo account of each company to provision.",
+        comodel_name='paymongo.provisioning.wizard.line',
+        inverse_name='wizard_id',
+    )
+    state = fields.Selection(
+        string="State",
+        selection=[('test', "Test Mode"), ('enabled', "Enabled")],
+        default='test',
+        required=True,
+    )
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        if 'line_ids' in fields_list and self.env.context.get('active_model') == 'res.company':
+            res['line_ids'] = [
+                fields.Command.create({'company_id': company_id})
+                for company_id in self.env.context.get('active_ids', [])
+            ]
+        return res
+
+    def action_provision(self):
+        """Provision a PayMongo provider for the company of every line and show them."""
+        self.ensure_one()
+        if not self.line_ids:
+            raise ValidationError(_("Add the credentials of at least one company."))
+        duplicate_companies = [
+            company.name
+            for company, lines in self.line_ids.grouped('company_id').items() if len(lines) > 1
+        ]
+        if duplicate_companies:
+            raise ValidationError(_(
+                "Each company can only be provisioned once: %s", ', '.join(duplicate_companies)
+            ))
+        providers = self.env['payment.provider']._paymongo_provision([{
+            'company_id': line.company_id.id,
+            'paymongo_secret_key': line.paymongo_secret_key,
+            'paymongo_webhook_secret': line.paymongo_webhook_secret,
+            'state': self.state,
+        } for line in self.line_ids])
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("PayMongo Providers"),
+            'res_model': 'payment.provider',
+            'view_mode': 'list,form',
+            'domain': [('id', 'in', providers.ids)],
+        }
+
+
+class PaymongoProvisioningWizardLine(models.TransientModel):
+    _name = 'paymongo.provisioning.wizard.line'
+    _description = "PayMongo Provider Provisioning Credentials"
+
+    wizard_id = fields.Many2one(
+        comodel_name='paymongo.provisioning.wizard', required=True, ondelete='cascade'
+    )
+    company_id = fields.Many2one(string="Company", comodel_name='res.company', required=True)
+    paymongo_secret_key = fields.Char(string="Secret Key", required=True)
+    paymongo_webhook_secret = fields.Char(string="Webhook Secret", required=True)